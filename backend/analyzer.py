@@ -3,22 +3,31 @@
 Person B: PageSpeed Insights integration (robust)
 - Requests ALL Lighthouse categories
 - Longer read timeout + retries with backoff
-- Caches raw PSI JSON in data/psi/
+- Caches PSI results in data/psi/, keyed on the full URL (path + query), strategy
+  and category set; entries older than PSI_CACHE_MAX_AGE seconds are refetched
+- PSI_CACHE_COMPACT=1 (default) stores only the extracted block, gzipped;
+  PSI_CACHE_COMPACT=0 keeps the raw Lighthouse JSON
+- `python -m backend.analyzer --migrate-cache` converts old host-only cache files
+- Mobile and desktop are fetched concurrently through the process-wide PSI client
+  (backend/psi_client.py: token bucket, daily quota, priorities, Retry-After)
 - Returns partial results when one strategy fails (adds `errors`)
 """
 
 from __future__ import annotations
-import os, sys, json, time, datetime, pathlib, urllib.parse
-from typing import Any, Dict, List, Optional
-import requests
+import os, sys, gzip, json, time, hashlib, datetime, pathlib, urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
 from dotenv import load_dotenv
+from backend.cache import normalize_url
+from backend.psi_client import client as psi_client, PRIORITIES, PRIORITY_INTERACTIVE
 load_dotenv()
 
-PSI_BASE = "https://www.googleapis.com/pagespeedonline/v5/runPagespeed"
-API_KEY = os.getenv("GOOGLE_API_KEY")
+CATEGORIES = ("performance", "seo", "accessibility", "best-practices")
 
 CACHE_DIR = pathlib.Path(__file__).resolve().parent.parent / "data" / "psi"
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
+CACHE_MAX_AGE = int(os.getenv("PSI_CACHE_MAX_AGE", "86400"))  # seconds; 0 = never expire
+CACHE_COMPACT = os.getenv("PSI_CACHE_COMPACT", "1") != "0"
 
 
 def _slug(url: str) -> str:
@@ -27,50 +36,115 @@ def _slug(url: str) -> str:
     return host or "unknown"
 
 
-def _cache_path(url: str, strategy: str) -> pathlib.Path:
-    return CACHE_DIR / f"{_slug(url)}__{strategy}.json"
-
+def _cache_id(url: str, categories: Sequence[str]) -> str:
+    raw = json.dumps([normalize_url(url), sorted(categories)])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
 
-def _fetch_pagespeed(url: str, strategy: str, retries: int = 5, refresh: bool = False) -> Dict[str, Any]:
-    if not API_KEY:
-        raise RuntimeError('GOOGLE_API_KEY not set. Run: export GOOGLE_API_KEY="YOUR_KEY"')
 
-    cp = _cache_path(url, strategy)
-    if cp.exists() and not refresh:
-        return json.loads(cp.read_text())
+def _cache_path(url: str, strategy: str, categories: Sequence[str] = CATEGORIES, compact: bool = True) -> pathlib.Path:
+    suffix = "block.json.gz" if compact else "json"
+    return CACHE_DIR / f"{_slug(url)}__{_cache_id(url, categories)}__{strategy}.{suffix}"
 
-    params = {
-        "url": url,
-        "strategy": strategy,
-        "key": API_KEY,
-        "category": ["performance", "seo", "accessibility", "best-practices"],
-    }
 
-    backoff = 1.0
-    last_err = None
-    for _ in range(retries):
-        r = requests.get(PSI_BASE, params=params, timeout=(10, 180))
-        if r.status_code == 200:
-            data = r.json()
-            cp.write_text(json.dumps(data, ensure_ascii=False))
-            return data
+def _legacy_cache_path(url: str, strategy: str) -> pathlib.Path:
+    """Pre-migration layout: one file per host, whatever the path or categories."""
+    return CACHE_DIR / f"{_slug(url)}__{strategy}.json"
 
-        try:
-            err = r.json()
-        except Exception:
-            err = {"text": r.text}
-        last_err = f"HTTP {r.status_code}: {err}"
 
-        # retry on throttling / transient errors
-        if r.status_code in (408, 429, 500, 502, 503, 504):
-            time.sleep(backoff)
-            backoff = min(backoff * 2, 16)
-            continue
+def _is_fresh(fetched_at: float) -> bool:
+    return CACHE_MAX_AGE <= 0 or (time.time() - fetched_at) < CACHE_MAX_AGE
 
-        # non-retriable
-        raise RuntimeError(f"PSI {strategy} {last_err}")
 
-    raise RuntimeError(f"PSI {strategy} failed after retries: {last_err}")
+def _psi_fetched_at(psi_json: Dict[str, Any], fallback: float) -> float:
+    stamp = psi_json.get("analysisUTCTimestamp") or (psi_json.get("lighthouseResult") or {}).get("fetchTime")
+    try:
+        return datetime.datetime.fromisoformat(stamp.replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return fallback
+
+
+def _store_block(url: str, strategy: str, categories: Sequence[str], psi_json: Dict[str, Any],
+                 fetched_at: float, compact: bool = CACHE_COMPACT) -> Dict[str, Any]:
+    """Write one PSI result to the cache and return its extracted block."""
+    block = _extract_block(psi_json)
+    path = _cache_path(url, strategy, categories, compact)
+    if compact:
+        record = {"url": normalize_url(url), "strategy": strategy, "categories": sorted(categories),
+                  "fetched_at": fetched_at, "block": block}
+        path.write_bytes(gzip.compress(json.dumps(record, separators=(",", ":")).encode("utf-8")))
+    else:
+        path.write_text(json.dumps(psi_json, ensure_ascii=False))
+        os.utime(path, (fetched_at, fetched_at))
+    return block
+
+
+def _load_block(url: str, strategy: str, categories: Sequence[str]) -> Optional[Dict[str, Any]]:
+    """Fresh cached block for this exact URL/strategy/categories, if any."""
+    compact = _cache_path(url, strategy, categories, compact=True)
+    if compact.exists():
+        record = json.loads(gzip.decompress(compact.read_bytes()))
+        if _is_fresh(record.get("fetched_at", 0)):
+            return record["block"]
+    raw = _cache_path(url, strategy, categories, compact=False)
+    if raw.exists() and _is_fresh(raw.stat().st_mtime):
+        return _extract_block(json.loads(raw.read_text()))
+    legacy = _legacy_cache_path(url, strategy)
+    if legacy.exists():
+        migrated = _migrate_file(legacy)
+        if migrated and migrated[0] == normalize_url(url) and set(categories) <= set(migrated[1]):
+            return _load_block(url, strategy, migrated[1])
+    return None
+
+
+def _migrate_file(path: pathlib.Path, compact: bool = CACHE_COMPACT) -> Optional[tuple]:
+    """Re-key one legacy host-only cache file by its real requested URL and category set.
+
+    Returns (normalized_url, categories) or None when the file can't be read.
+    """
+    try:
+        psi_json = json.loads(path.read_text())
+        host, strategy = path.name[:-len(".json")].rsplit("__", 1)
+    except Exception:
+        return None
+    lhr = psi_json.get("lighthouseResult") or {}
+    requested = lhr.get("requestedUrl") or psi_json.get("id")
+    categories = sorted((lhr.get("categories") or {}).keys())
+    if not requested or strategy not in ("mobile", "desktop"):
+        return None
+    fetched_at = _psi_fetched_at(psi_json, path.stat().st_mtime)
+    _store_block(requested, strategy, categories, psi_json, fetched_at, compact)
+    path.unlink()
+    return normalize_url(requested), categories
+
+
+def migrate_legacy_cache(compact: bool = CACHE_COMPACT) -> Dict[str, Any]:
+    """Convert every `<host>__<strategy>.json` file in CACHE_DIR to the keyed layout."""
+    before = sum(p.stat().st_size for p in CACHE_DIR.iterdir() if p.is_file())
+    migrated, skipped = [], []
+    for path in sorted(CACHE_DIR.glob("*.json")):
+        if path.name.count("__") != 1:
+            continue  # already in the new layout
+        result = _migrate_file(path, compact)
+        (migrated if result else skipped).append(path.name)
+    after = sum(p.stat().st_size for p in CACHE_DIR.iterdir() if p.is_file())
+    return {"migrated": migrated, "skipped": skipped, "bytes_before": before, "bytes_after": after}
+
+
+def _fetch_pagespeed(url: str, strategy: str, retries: int = 5, categories: Sequence[str] = CATEGORIES,
+                     priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+    # rate limiting, priority and Retry-After handling live in the shared client
+    return psi_client.run_pagespeed(url, strategy, categories, priority=priority, retries=retries)
+
+
+def _pagespeed_block(url: str, strategy: str, refresh: bool = False,
+                     categories: Sequence[str] = CATEGORIES, priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+    """Extracted PSI block for one strategy, from cache when fresh."""
+    if not refresh:
+        block = _load_block(url, strategy, categories)
+        if block is not None:
+            return block
+    data = _fetch_pagespeed(url, strategy, categories=categories, priority=priority)
+    return _store_block(url, strategy, categories, data, time.time())
 
 
 def _safe_score(cats: Dict[str, Any], key: str) -> int:
@@ -124,8 +198,13 @@ def _extract_block(psi_json: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def analyze(url: str, refresh: bool = False, tolerate_failures: bool = True) -> Dict[str, Any]:
-    """Return mobile & desktop results; keep going even if one side fails."""
+def analyze(url: str, refresh: bool = False, tolerate_failures: bool = True,
+            priority: str = "interactive") -> Dict[str, Any]:
+    """Return mobile & desktop results; keep going even if one side fails.
+
+    `priority` is "interactive" (user waiting) or "batch" (queued behind interactive calls).
+    """
+    level = PRIORITIES.get(priority, PRIORITY_INTERACTIVE)
     if not (url.startswith("http://") or url.startswith("https://")):
         url = "https://" + url
 
@@ -135,20 +214,24 @@ def analyze(url: str, refresh: bool = False, tolerate_failures: bool = True) ->
         "fetched_at": datetime.datetime.utcnow().isoformat() + "Z",
     }
     errors: Dict[str, str] = {}
+    timings: Dict[str, int] = {}
 
-    # mobile
-    try:
-        m = _fetch_pagespeed(url, "mobile", refresh=refresh)
-        result["pagespeed"]["mobile"] = _extract_block(m)
-    except Exception as e:
-        errors["mobile"] = str(e)
-
-    # desktop
-    try:
-        d = _fetch_pagespeed(url, "desktop", refresh=refresh)
-        result["pagespeed"]["desktop"] = _extract_block(d)
-    except Exception as e:
-        errors["desktop"] = str(e)
+    def run(strategy: str):
+        t0 = time.perf_counter()
+        try:
+            return _pagespeed_block(url, strategy, refresh=refresh, priority=level)
+        finally:
+            timings[strategy] = int((time.perf_counter() - t0) * 1000)
+
+    # mobile + desktop in parallel
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="psi") as ex:
+        futures = {strategy: ex.submit(run, strategy) for strategy in ("mobile", "desktop")}
+    for strategy, fut in futures.items():
+        try:
+            result["pagespeed"][strategy] = fut.result()
+        except Exception as e:
+            errors[strategy] = str(e)
+    result["timings_ms"] = timings
 
     if errors:
         result["errors"] = errors
@@ -159,6 +242,9 @@ def analyze(url: str, refresh: bool = False, tolerate_failures: bool = True) ->
 
 
 if __name__ == "__main__":
+    if "--migrate-cache" in sys.argv:
+        print(json.dumps(migrate_legacy_cache(), indent=2))
+        sys.exit(0)
     test_url = sys.argv[1] if len(sys.argv) > 1 else "https://example.com"
     force = ("--refresh" in sys.argv)
     print(json.dumps(analyze(test_url, refresh=force), indent=2))
\ No newline at end of file
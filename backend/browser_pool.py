@@ -0,0 +1,279 @@
+# backend/browser_pool.py
+"""
+Shared headless Chromium for on-page rendering
+- One long-lived browser, driven from a background event-loop thread
+- Every render gets its own isolated browser context (cookies, storage, cache)
+- Bounded concurrency (BROWSER_MAX_CONCURRENCY)
+- Sync callers use render(); async routes await render_async()
+- Browser is recycled after BROWSER_RECYCLE_AFTER pages to cap memory growth
+- Images/fonts/media and known trackers are aborted via request routing
+  (the audit only reads the DOM); wait strategy is selectable per render
+- Started/stopped with the FastAPI app lifespan (see backend/main.py)
+"""
+
+from __future__ import annotations
+import os, time, asyncio, threading, urllib.parse
+from typing import Any, Dict, List, Optional
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+
+MAX_CONCURRENCY = int(os.getenv("BROWSER_MAX_CONCURRENCY", "4"))
+RECYCLE_AFTER = int(os.getenv("BROWSER_RECYCLE_AFTER", "100"))
+
+# --- Resource blocking policy ---
+BLOCK_RESOURCE_TYPES = frozenset(
+    t.strip() for t in os.getenv("BROWSER_BLOCK_TYPES", "image,font,media").split(",") if t.strip()
+)
+TRACKER_HOSTS = tuple(
+    h.strip().lower() for h in os.getenv(
+        "BROWSER_BLOCK_HOSTS",
+        "google-analytics.com,googletagmanager.com,doubleclick.net,googlesyndication.com,"
+        "facebook.net,connect.facebook.net,hotjar.com,segment.io,segment.com,mixpanel.com,"
+        "clarity.ms,newrelic.com,nr-data.net,fullstory.com,intercom.io,optimizely.com",
+    ).split(",") if h.strip()
+)
+
+# --- Wait strategies ---
+# networkidle waits for DOMContentLoaded, then for the network to go quiet, but
+# never longer than NETWORKIDLE_CAP_MS (long-polling pages never go idle).
+WAIT_STRATEGIES = ("domcontentloaded", "load", "networkidle")
+NETWORKIDLE_CAP_MS = int(os.getenv("BROWSER_NETWORKIDLE_CAP_MS", "5000"))
+
+
+def _block_category(resource_type: str, url: str) -> Optional[str]:
+    """Return the bucket a request is blocked under, or None to let it through."""
+    if resource_type in BLOCK_RESOURCE_TYPES:
+        return resource_type
+    host = (urllib.parse.urlparse(url).hostname or "").lower()
+    if any(host == h or host.endswith("." + h) for h in TRACKER_HOSTS):
+        return "tracker"
+    return None
+
+
+class _BrowserSlot:
+    """A launched browser plus the bookkeeping needed to retire it safely."""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.served = 0
+        self.active = 0
+        self.retired = False
+
+
+class BrowserPool:
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, recycle_after: int = RECYCLE_AFTER):
+        self.max_concurrency = max(1, max_concurrency)
+        self.recycle_after = max(1, recycle_after)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._playwright = None
+        self._slot: Optional[_BrowserSlot] = None
+        self._slot_lock: Optional[asyncio.Lock] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._stats = {"launches": 0, "pages_served": 0, "recycled": 0}
+
+    # --- lifecycle (called from any thread) ---
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None and self._loop.is_running()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self.running:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="browser-pool", daemon=True)
+            thread.start()
+            self._loop, self._thread = loop, thread
+            self._call(self._astart())
+
+    def stop(self) -> None:
+        with self._start_lock:
+            if not self.running:
+                return
+            try:
+                self._call(self._astop())
+            finally:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=10)
+                self._loop.close()
+                self._loop, self._thread = None, None
+
+    def stats(self) -> Dict[str, Any]:
+        slot = self._slot
+        return {
+            **self._stats,
+            "running": self.running,
+            "max_concurrency": self.max_concurrency,
+            "recycle_after": self.recycle_after,
+            "current_browser_pages": slot.served if slot else 0,
+        }
+
+    # --- rendering ---
+
+    def render(self, url: str, timeout_ms: int = 60000, wait_until: str = "load",
+               block_resources: bool = True, debug: Optional[Dict[str, Any]] = None) -> str:
+        """Render `url` in a fresh context and return the page HTML (blocks the caller).
+
+        Pass a dict as `debug` to have it filled with blocked-request counts and
+        the bytes/time saved versus an unblocked render (costs a second render).
+        """
+        if not self.running:
+            raise RuntimeError("BrowserPool is not running; call start() first")
+        return self._call(self._render(url, timeout_ms, wait_until, block_resources, debug))
+
+    async def render_async(self, url: str, timeout_ms: int = 60000, wait_until: str = "load",
+                           block_resources: bool = True, debug: Optional[Dict[str, Any]] = None) -> str:
+        """Awaitable render usable from any event loop (e.g. uvicorn's).
+
+        Cancelling the awaiting task cancels the render on the pool loop, which
+        closes its browser context straight away.
+        """
+        if not self.running:
+            raise RuntimeError("BrowserPool is not running; call start() first")
+        coro = self._render(url, timeout_ms, wait_until, block_resources, debug)
+        fut = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        return await asyncio.wrap_future(fut)
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    # --- everything below runs on the pool's event loop ---
+
+    async def _astart(self) -> None:
+        self._playwright = await async_playwright().start()
+        self._slot_lock = asyncio.Lock()
+        self._sem = asyncio.Semaphore(self.max_concurrency)
+
+    async def _astop(self) -> None:
+        if self._slot:
+            await self._slot.browser.close()
+            self._slot = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def _acquire(self) -> _BrowserSlot:
+        async with self._slot_lock:
+            slot = self._slot
+            if slot and (slot.served >= self.recycle_after or not slot.browser.is_connected()):
+                slot.retired = True
+                self._stats["recycled"] += 1
+                if slot.active == 0:
+                    await slot.browser.close()
+                slot = self._slot = None
+            if slot is None:
+                browser = await self._playwright.chromium.launch(headless=True)
+                slot = self._slot = _BrowserSlot(browser)
+                self._stats["launches"] += 1
+            slot.served += 1
+            slot.active += 1
+            return slot
+
+    async def _release(self, slot: _BrowserSlot) -> None:
+        slot.active -= 1
+        if slot.retired and slot.active == 0:
+            await slot.browser.close()
+
+    async def _render(self, url: str, timeout_ms: int, wait_until: str, block_resources: bool,
+                      debug: Optional[Dict[str, Any]]) -> str:
+        if wait_until not in WAIT_STRATEGIES:
+            raise ValueError(f"wait_until must be one of {WAIT_STRATEGIES}")
+        async with self._sem:
+            slot = await self._acquire()
+            try:
+                blocked: Dict[str, int] = {}
+                t0 = time.perf_counter()
+                content = await self._load(slot.browser, url, timeout_ms, wait_until,
+                                           blocked=blocked if block_resources else None)
+                render_ms = (time.perf_counter() - t0) * 1000
+                self._stats["pages_served"] += 1
+                if debug is not None:
+                    debug.update(await self._debug_block(slot.browser, url, timeout_ms, wait_until,
+                                                         block_resources, blocked, render_ms))
+                return content
+            finally:
+                await self._release(slot)
+
+    async def _load(self, browser, url: str, timeout_ms: int, wait_until: str,
+                    blocked: Optional[Dict[str, int]] = None, sizes: Optional[List] = None) -> str:
+        """Load `url` in a throwaway context. Blocks subresources when `blocked` is given
+        (filled with per-category counts); collects (category, bytes) of would-be-blocked
+        responses into `sizes` when given."""
+        context = await browser.new_context(service_workers="block" if blocked is not None else "allow")
+        try:
+            if blocked is not None:
+                async def _route(route):
+                    req = route.request
+                    category = _block_category(req.resource_type, req.url)
+                    if category:
+                        blocked[category] = blocked.get(category, 0) + 1
+                        await route.abort()
+                    else:
+                        await route.continue_()
+                await context.route("**/*", _route)
+
+            pending = []
+            if sizes is not None:
+                async def _measure(req, category):
+                    try:
+                        sizes.append((category, (await req.sizes()).get("responseBodySize", 0)))
+                    except Exception:
+                        pass
+
+                def _on_finished(req):
+                    category = _block_category(req.resource_type, req.url)
+                    if category:
+                        pending.append(asyncio.ensure_future(_measure(req, category)))
+                context.on("requestfinished", _on_finished)
+
+            page = await context.new_page()
+            if wait_until == "networkidle":
+                await page.goto(url, timeout=timeout_ms, wait_until="domcontentloaded")
+                try:
+                    await page.wait_for_load_state("networkidle", timeout=NETWORKIDLE_CAP_MS)
+                except PlaywrightTimeoutError:
+                    pass
+            else:
+                await page.goto(url, timeout=timeout_ms, wait_until=wait_until)
+            content = await page.content()
+            if pending:
+                await asyncio.gather(*pending)
+            return content
+        finally:
+            await context.close()
+
+    async def _debug_block(self, browser, url: str, timeout_ms: int, wait_until: str,
+                           block_resources: bool, blocked: Dict[str, int], render_ms: float) -> Dict[str, Any]:
+        info: Dict[str, Any] = {
+            "wait_until": wait_until,
+            "block_resources": block_resources,
+            "blocked_requests": blocked,
+            "render_ms": round(render_ms, 1),
+        }
+        if not block_resources:
+            return info
+        # Baseline: same page without blocking, measuring what the blocked requests would have cost.
+        sizes: List = []
+        t0 = time.perf_counter()
+        try:
+            await self._load(browser, url, timeout_ms, wait_until, sizes=sizes)
+        except Exception as e:
+            info["baseline_error"] = str(e)
+            return info
+        baseline_ms = (time.perf_counter() - t0) * 1000
+        bytes_saved: Dict[str, int] = {}
+        for category, n in sizes:
+            bytes_saved[category] = bytes_saved.get(category, 0) + max(n or 0, 0)
+        info.update({
+            "baseline_render_ms": round(baseline_ms, 1),
+            "time_saved_ms": round(baseline_ms - render_ms, 1),
+            "bytes_saved": bytes_saved,
+            "bytes_saved_total": sum(bytes_saved.values()),
+        })
+        return info
+
+
+# Process-wide pool; main.py starts it on app startup and stops it on shutdown.
+pool = BrowserPool()
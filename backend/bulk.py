@@ -0,0 +1,252 @@
+# backend/bulk.py
+"""
+Bulk audits: many sites in one batch (POST /bulk-audit, `python -m backend.bulk`)
+- Input is a list of URLs, or a file with one URL or one JSON object with a
+  "url" key per line (the requests.jsonl layout); duplicates are dropped
+- fetch_all() per URL on BULK_WORKERS threads, PSI at batch priority so
+  interactive /performance calls and report jobs go first
+- Per-domain fairness: URLs wait in one queue per domain and are handed out
+  round-robin, at most BULK_PER_DOMAIN per domain at once, so a domain with
+  500 URLs neither starves the others nor gets hammered
+- Results stream out as NDJSON while they complete: a "batch" line, one
+  "result" line per URL, a closing "summary" line
+- Every finished URL is appended to the batch checkpoint
+  (BULK_DIR/<batch_id>.ndjson); running the same batch again (same batch_id,
+  which defaults to a hash of the URL list) only audits the URLs that have
+  not succeeded yet
+"""
+
+from __future__ import annotations
+import os, re, sys, json, time, hashlib, pathlib, argparse
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+from backend.cache import normalize_url
+from backend.workflow import fetch_all
+
+BULK_DIR = pathlib.Path(os.getenv("BULK_DIR", pathlib.Path(__file__).resolve().parent.parent / "data" / "bulk"))
+WORKERS = int(os.getenv("BULK_WORKERS", "4"))
+PER_DOMAIN = int(os.getenv("BULK_PER_DOMAIN", "1"))
+PSI_PRIORITY = os.getenv("BULK_PSI_PRIORITY", "batch")
+_BATCH_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def read_urls(lines: Iterable[str]) -> List[str]:
+    """URLs from plain-URL or JSON-object lines; blank lines and # comments are skipped."""
+    urls = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            url = (json.loads(line).get("url") or "").strip()
+            if url:
+                urls.append(url)
+        else:
+            urls.append(line)
+    return urls
+
+
+def batch_id_for(urls: Iterable[str]) -> str:
+    """Stable id for a URL list, so re-submitting the same batch resumes it."""
+    raw = "\n".join(sorted({normalize_url(u) for u in urls}))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def check_batch_id(batch_id: Optional[str]) -> None:
+    """Batch ids name checkpoint files: letters, digits, '-' and '_' only."""
+    if batch_id is not None and not _BATCH_ID.match(batch_id):
+        raise ValueError(f"invalid batch_id {batch_id!r}")
+
+
+def _domain(url: str) -> str:
+    host = (urlsplit(url if "://" in url else "https://" + url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _audit(url: str) -> Tuple[Optional[Dict[str, Any]], Dict[str, int]]:
+    timings: Dict[str, int] = {}
+    return fetch_all(url, timings, priority=PSI_PRIORITY), timings
+
+
+class _FairQueue:
+    """Pending URLs per domain, handed out round-robin with a per-domain in-flight cap."""
+
+    def __init__(self, per_domain: int):
+        self.per_domain = max(per_domain, 1)
+        self._pending: "OrderedDict[str, deque]" = OrderedDict()
+        self.in_flight: Counter = Counter()
+
+    def put(self, domain: str, url: str) -> None:
+        self._pending.setdefault(domain, deque()).append(url)
+
+    def take(self) -> Optional[Tuple[str, str]]:
+        """Next (domain, url) from the next domain below its cap, or None."""
+        for _ in range(len(self._pending)):
+            domain, urls = next(iter(self._pending.items()))
+            self._pending.move_to_end(domain)
+            if self.in_flight[domain] < self.per_domain:
+                url = urls.popleft()
+                if not urls:
+                    del self._pending[domain]
+                self.in_flight[domain] += 1
+                return domain, url
+        return None
+
+    def done(self, domain: str) -> None:
+        self.in_flight[domain] -= 1
+
+    def __len__(self) -> int:
+        return sum(len(urls) for urls in self._pending.values())
+
+
+class BulkRunner:
+    def __init__(self, workers: int = WORKERS, per_domain: int = PER_DOMAIN, directory: pathlib.Path = BULK_DIR,
+                 audit: Optional[Callable[[str], Tuple[Optional[Dict[str, Any]], Dict[str, int]]]] = None):
+        self.workers = max(workers, 1)
+        self.per_domain = per_domain
+        self.dir = pathlib.Path(directory)
+        self.audit = audit or _audit
+
+    def checkpoint_path(self, batch_id: str) -> pathlib.Path:
+        return self.dir / f"{batch_id}.ndjson"
+
+    def completed(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        """Successful results already in the checkpoint, by normalized URL."""
+        done = {}
+        try:
+            with open(self.checkpoint_path(batch_id), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from a crash: that URL runs again
+                    if record.get("status") == "ok":  # partial / failed URLs are retried
+                        done[normalize_url(record["url"])] = record
+        except FileNotFoundError:
+            pass
+        return done
+
+    def _run_one(self, url: str, domain: str) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        record: Dict[str, Any] = {"type": "result", "url": url, "domain": domain}
+        try:
+            result, timings = self.audit(url)
+        except Exception as e:
+            result, timings, record["error"] = None, {}, str(e)[:200]
+        if result:
+            # a section that errored (e.g. PSI down) makes it "partial", retried on resume
+            failed = [name for name, section in result.items()
+                      if isinstance(section, dict) and (section.get("error") or section.get("errors"))]
+            record["status"] = "partial" if failed else "ok"
+            if failed:
+                record["failed_sections"] = failed
+            record["result"] = result
+        else:
+            record["status"] = "failed"
+            record.setdefault("error", "Failed to fetch SEO data.")
+        record["timings_ms"] = timings
+        record["elapsed_ms"] = int((time.perf_counter() - t0) * 1000)
+        return record
+
+    def run(self, urls: Iterable[str], batch_id: Optional[str] = None, resume: bool = True) -> Iterator[Dict[str, Any]]:
+        """Audit `urls`, yielding batch / result / summary records as they happen.
+
+        Stopping early (the client went away, Ctrl-C) leaves the checkpoint
+        with every finished URL; the next run of the batch picks up from there.
+        """
+        check_batch_id(batch_id)
+        unique: Dict[str, str] = {}
+        for url in urls:
+            url = url.strip()
+            if url:
+                unique.setdefault(normalize_url(url), url)
+        batch_id = batch_id or batch_id_for(unique.values())
+        self.dir.mkdir(parents=True, exist_ok=True)
+        if not resume:
+            self.checkpoint_path(batch_id).unlink(missing_ok=True)
+        done = self.completed(batch_id)
+
+        queue = _FairQueue(self.per_domain)
+        for key, url in unique.items():
+            if key not in done:
+                queue.put(_domain(url), url)
+        total, skipped = len(unique), sum(1 for key in unique if key in done)
+        yield {"type": "batch", "batch_id": batch_id, "total": total, "resumed": skipped, "pending": len(queue)}
+
+        t0 = time.perf_counter()
+        statuses = Counter(done[key]["status"] for key in unique if key in done)
+        ex = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bulk")
+        running: Dict[Any, str] = {}
+        try:
+            with open(self.checkpoint_path(batch_id), "a", encoding="utf-8") as checkpoint:
+                while running or len(queue):
+                    while len(running) < self.workers:
+                        nxt = queue.take()
+                        if nxt is None:
+                            break
+                        domain, url = nxt
+                        running[ex.submit(self._run_one, url, domain)] = domain
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        queue.done(running.pop(fut))
+                        record = fut.result()
+                        checkpoint.write(json.dumps(record, ensure_ascii=False) + "\n")
+                        checkpoint.flush()
+                        statuses[record["status"]] += 1
+                        yield record
+        finally:
+            ex.shutdown(wait=False, cancel_futures=True)
+        yield {"type": "summary", "batch_id": batch_id, "total": total, "resumed": skipped,
+               "ok": statuses["ok"], "partial": statuses["partial"], "failed": statuses["failed"],
+               "elapsed_ms": int((time.perf_counter() - t0) * 1000)}
+
+
+# Shared by the /bulk-audit endpoint.
+runner = BulkRunner()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Audit many sites; results are printed as NDJSON.")
+    parser.add_argument("inputs", nargs="+", help="URLs, or files with one URL / JSON object per line ('-' = stdin)")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="audits run at once")
+    parser.add_argument("--per-domain", type=int, default=PER_DOMAIN, help="audits per domain at once")
+    parser.add_argument("--batch-id", help="checkpoint name (default: hash of the URL list)")
+    parser.add_argument("--fresh", action="store_true", help="ignore the checkpoint and audit every URL again")
+    parser.add_argument("--output", "-o", help="write NDJSON here instead of stdout")
+    args = parser.parse_args(argv)
+    try:
+        check_batch_id(args.batch_id)
+    except ValueError as e:
+        parser.error(str(e))
+
+    urls: List[str] = []
+    for item in args.inputs:
+        if item == "-":
+            urls += read_urls(sys.stdin)
+        elif "://" not in item and os.path.isfile(item):
+            with open(item, encoding="utf-8") as f:
+                urls += read_urls(f)
+        else:
+            urls.append(item)
+
+    bulk = BulkRunner(workers=args.workers, per_domain=args.per_domain)
+    out = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for record in bulk.run(urls, batch_id=args.batch_id, resume=not args.fresh):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if record["type"] != "result":
+                print(f"--- {record['type']}: {json.dumps(record)} ---", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("--- Interrupted; run the same batch again to resume ---", file=sys.stderr)
+        return 130
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
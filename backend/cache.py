@@ -0,0 +1,244 @@
+# backend/cache.py
+"""
+Content-addressed result cache shared by /onpage, /crawl, /performance and the report LLM step
+- On-disk SQLite store (CACHE_DB, default data/cache/results.sqlite3)
+- Key = sha256(source + normalized URL + request params)
+- Per-source TTLs (CACHE_TTL_ONPAGE / CACHE_TTL_CRAWL / CACHE_TTL_PERFORMANCE / CACHE_TTL_LLM /
+  CACHE_TTL_LINKS, seconds)
+- get_many()/put_many() batch lookups in one transaction (per-link statuses)
+- Size-bounded LRU eviction (CACHE_MAX_BYTES); writes keep a running size
+  total, and the table is only scanned (expired rows dropped, then LRU rows
+  when over budget) every CACHE_SWEEP_INTERVAL s or when that total is over
+- refresh=True skips the read and overwrites the entry
+- Hit/miss counters per source (per process), exposed on /cache/stats
+"""
+
+from __future__ import annotations
+import os, json, time, sqlite3, hashlib, pathlib, threading, urllib.parse
+from collections import Counter
+from typing import Any, Callable, Dict, Optional, Sequence
+
+DB_PATH = pathlib.Path(os.getenv("CACHE_DB", pathlib.Path(__file__).resolve().parent.parent / "data" / "cache" / "results.sqlite3"))
+MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+DEFAULT_TTLS = {
+    "onpage": int(os.getenv("CACHE_TTL_ONPAGE", "3600")),
+    "crawl": int(os.getenv("CACHE_TTL_CRAWL", "21600")),
+    "performance": int(os.getenv("CACHE_TTL_PERFORMANCE", "86400")),
+    "llm": int(os.getenv("CACHE_TTL_LLM", str(7 * 86400))),
+    "links": int(os.getenv("CACHE_TTL_LINKS", "21600")),
+}
+DEFAULT_TTL = int(os.getenv("CACHE_TTL_DEFAULT", "3600"))
+SWEEP_INTERVAL = float(os.getenv("CACHE_SWEEP_INTERVAL", "60"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key         TEXT PRIMARY KEY,
+    source      TEXT NOT NULL,
+    value       TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at);
+CREATE INDEX IF NOT EXISTS results_expires ON results (expires_at);
+"""
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form for cache keys: scheme/host lowercased, default port, fragment and
+    query order dropped, empty path -> '/'."""
+    url = url.strip()
+    if not url.lower().startswith(("http://", "https://")):
+        url = "https://" + url
+    p = urllib.parse.urlsplit(url)
+    scheme = p.scheme.lower()
+    host = (p.hostname or "").lower()
+    port = p.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(p.query, keep_blank_values=True)))
+    return urllib.parse.urlunsplit((scheme, host, p.path or "/", query, ""))
+
+
+def cache_key(source: str, url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    raw = json.dumps([source, normalize_url(url), params or {}], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, path: pathlib.Path = DB_PATH, max_bytes: int = MAX_BYTES,
+                 ttls: Optional[Dict[str, int]] = None, sweep_interval: float = SWEEP_INTERVAL):
+        self.path = pathlib.Path(path)
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits: Counter = Counter()
+        self._misses: Counter = Counter()
+        self._evicted = 0
+        self._approx_bytes: Optional[int] = None  # exact after a sweep, plus bytes written since
+        self._swept_at = 0.0
+
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def ttl_for(self, source: str) -> int:
+        return self.ttls.get(source, DEFAULT_TTL)
+
+    # --- raw get/put ---
+
+    def get(self, source: str, key: str) -> Optional[Any]:
+        now = time.time()
+        db = self._db()
+        row = db.execute("SELECT value, expires_at FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] <= now:
+            if row is not None:
+                db.execute("DELETE FROM results WHERE key = ?", (key,))
+            with self._lock:
+                self._misses[source] += 1
+            return None
+        db.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+        with self._lock:
+            self._hits[source] += 1
+        return json.loads(row[0])
+
+    def put(self, source: str, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        now = time.time()
+        blob = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        ttl = self.ttl_for(source) if ttl is None else ttl
+        self._db().execute(
+            "INSERT OR REPLACE INTO results (key, source, value, size, created_at, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, source, blob, len(blob), now, now + ttl, now),
+        )
+        self._written(len(blob))
+
+    def get_many(self, source: str, keys: Sequence[str]) -> Dict[str, Any]:
+        """Fresh entries among `keys` ({key: value}); expired ones count as misses."""
+        now = time.time()
+        db = self._db()
+        found: Dict[str, Any] = {}
+        for i in range(0, len(keys), 500):  # stay under SQLite's bound-parameter limit
+            chunk = keys[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for key, value, expires_at in db.execute(
+                    f"SELECT key, value, expires_at FROM results WHERE key IN ({marks})", chunk):
+                if expires_at > now:
+                    found[key] = json.loads(value)
+        if found:
+            db.executemany("UPDATE results SET accessed_at = ? WHERE key = ?", [(now, k) for k in found])
+        with self._lock:
+            self._hits[source] += len(found)
+            self._misses[source] += len(keys) - len(found)
+        return found
+
+    def put_many(self, source: str, items: Dict[str, Any], ttls: Optional[Dict[str, int]] = None) -> None:
+        """Store several entries in one transaction; `ttls` overrides the source TTL per key."""
+        if not items:
+            return
+        now = time.time()
+        default = self.ttl_for(source)
+        rows = []
+        for key, value in items.items():
+            blob = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+            ttl = (ttls or {}).get(key, default)
+            rows.append((key, source, blob, len(blob), now, now + ttl, now))
+        db = self._db()
+        with db:  # explicit transaction: one commit for the batch
+            db.execute("BEGIN")
+            db.executemany(
+                "INSERT OR REPLACE INTO results (key, source, value, size, created_at, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        self._written(sum(row[3] for row in rows))
+
+    def _written(self, size: int) -> None:
+        """Count a write; sweep when the running total may be over budget or the last sweep is old.
+
+        Replaced rows and other processes' writes make the total approximate;
+        each sweep resets it to the table's real size.
+        """
+        with self._lock:
+            if self._approx_bytes is not None:
+                self._approx_bytes += size
+            now = time.monotonic()
+            due = (self._approx_bytes is None or self._approx_bytes > self.max_bytes
+                   or now - self._swept_at >= self.sweep_interval)
+            if due:
+                self._swept_at = now  # the other writers don't sweep too
+        if due:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop expired rows, then least-recently-used rows until under 90% of max_bytes."""
+        db = self._db()
+        db.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            with self._lock:
+                self._approx_bytes = total
+            return
+        target = int(self.max_bytes * 0.9)
+        freed, victims = 0, []
+        for key, size in db.execute("SELECT key, size FROM results ORDER BY accessed_at"):
+            victims.append((key,))
+            freed += size
+            if total - freed <= target:
+                break
+        db.executemany("DELETE FROM results WHERE key = ?", victims)
+        with self._lock:
+            self._evicted += len(victims)
+            self._approx_bytes = total - freed
+
+    # --- helpers ---
+
+    def cached(self, source: str, url: str, params: Optional[Dict[str, Any]], compute: Callable[[], Any],
+               refresh: bool = False, cacheable: Callable[[Any], bool] = lambda v: True) -> Any:
+        """Return the cached result for (source, url, params) or compute and store it."""
+        key = cache_key(source, url, params)
+        if not refresh:
+            hit = self.get(source, key)
+            if hit is not None:
+                return hit
+        value = compute()
+        if cacheable(value):
+            self.put(source, key, value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        db = self._db()
+        rows = db.execute("SELECT source, COUNT(*), COALESCE(SUM(size), 0) FROM results GROUP BY source").fetchall()
+        with self._lock:
+            sources = sorted(set(self._hits) | set(self._misses) | {r[0] for r in rows})
+            per_source = {}
+            for s in sources:
+                hits, misses = self._hits[s], self._misses[s]
+                per_source[s] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+                    "ttl_seconds": self.ttl_for(s),
+                }
+            evicted = self._evicted
+        for s, count, size in rows:
+            per_source[s].update({"entries": count, "bytes": size})
+        return {
+            "path": str(self.path),
+            "max_bytes": self.max_bytes,
+            "total_bytes": sum(r[2] for r in rows),
+            "evicted": evicted,
+            "sources": per_source,
+        }
+
+
+# Process-wide cache used by the API routes and the workflow.
+results_cache = ResultCache()
@@ -1,5 +1,5 @@
 # backend/combine_results.py
-import os, json, subprocess, requests, pathlib
+import os, json, requests, pathlib
 import time
 
 # --- CONFIGURATION ---
@@ -12,6 +12,8 @@ OUT_DIR.mkdir(parents=True, exist_ok=True)
 # This is the only secret you need.
 from dotenv import load_dotenv
 load_dotenv()
+from backend.llm import client as llm_client, LLMError
+from backend.summarizer import summarize
 GAMMA_API_KEY = os.getenv("GAMMA_API_KEY")
 
 if not GAMMA_API_KEY:
@@ -37,11 +39,11 @@ def fetch_all(url: str):
     return data
 
 def run_ollama(summary: dict) -> str:
-    """Send combined JSON to Ollama and return raw output"""
+    """Send the compacted analyzer results to Ollama and return raw output"""
     # This prompt is working well, so we'll keep it.
     prompt = f"""
 # ROLE & GOAL
-You are an expert SEO analyst. Your only task is to generate a structured report based on the provided JSON data. You must follow all formatting rules precisely.
+You are an expert SEO analyst. Your only task is to generate a structured report based on the provided site facts. You must follow all formatting rules precisely.
 
 # CRITICAL RULES
 - YOU MUST include the `### SLIDES START` marker at the beginning of the slides.
@@ -122,15 +124,15 @@ You are an expert SEO analyst. Your only task is to generate a structured report
 ### METRICS END
 
 ---
-### JSON INPUT
-{json.dumps(summary, indent=2)}
+### SITE FACTS
+{summarize(summary)["text"]}
 """
-    result = subprocess.run(
-        ["ollama", "run", "llama3"],
-        input=prompt.encode("utf-8"),
-        capture_output=True,
-    )
-    return result.stdout.decode("utf-8")
+    # streamed over the Ollama HTTP API; stops reading at "### SLIDES END"
+    try:
+        return llm_client.generate(prompt)
+    except LLMError as e:
+        print(f"⚠️ LLM generation failed: {e}")
+        return ""
 
 def parse_and_upload(raw_output: str):
     """Parses the LLM output, starts generation, and polls for the result."""
@@ -1,115 +1,22 @@
-import requests
-import xml.etree.ElementTree as ET
-from urllib.parse import urljoin
-import gzip
+from backend.robots import robots
+from backend.sitemaps import fetcher as sitemap_fetcher
 
 def fetch_robots_txt(url: str, target_agent: str = "*") -> dict:
-    robots_url = urljoin(url, "/robots.txt")
-    disallows = []
-    allows_all = True
-    current_agent = None
-    relevant = False
-
-    try:
-        response = requests.get(robots_url, timeout=10)
-        if response.status_code != 200:
-            return {"allows": True, "disallows": []}
-
-        for line in response.text.splitlines():
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-
-            if line.lower().startswith("user-agent:"):
-                current_agent = line.split(":", 1)[1].strip().lower()
-                # Check if this block applies to the target agent
-                relevant = (current_agent == target_agent or current_agent == "*")
-
-            elif line.lower().startswith("disallow:") and relevant:
-                allows_all = False
-                path = line.split(":", 1)[1].strip()
-                disallows.append(path if path else "/")
-
-        return {"allows": allows_all, "disallows": disallows}
-    except Exception:
-        return {"allows": True, "disallows": []}
+    """robots.txt rules for `target_agent` and whether `url` itself may be crawled."""
+    return robots.report(url, target_agent)
 
 
 def fetch_sitemap(url: str, limit: int = 10) -> dict:
-    robots_url = urljoin(url, "/robots.txt")
-    sitemap_locations = []
-    sitemap_urls = []
-
-    # Step 1: Look inside robots.txt
-    try:
-        response = requests.get(robots_url, timeout=10)
-        if response.ok:
-            for line in response.text.splitlines():
-                if line.lower().startswith("sitemap:"):
-                    sm_url = line.split(":", 1)[1].strip()
-                    full_sitemap_url = urljoin(url, sm_url)
-                    sitemap_locations.append(full_sitemap_url)
-    except Exception:
-        pass
-
-    # Step 2: Fallback if robots.txt has no sitemap
-    if not sitemap_locations:
-        sitemap_locations.append(urljoin(url, "/sitemap.xml"))
-
-    # Step 3: Parse sitemaps
-    for sm_url in sitemap_locations:
-        try:
-            resp = requests.get(sm_url, timeout=10)
-            if not resp.ok:
-                continue
-            content = resp.content
-            if sm_url.endswith(".gz"):
-                content = gzip.decompress(content)
-
-            root = ET.fromstring(content)
-
-            # Sitemap Index → nested sitemaps
-            if root.tag.endswith("sitemapindex"):
-                for sitemap in root.findall(".//{*}sitemap/{*}loc"):
-                    nested_url = sitemap.text.strip()
-                    try:
-                        nested_resp = requests.get(nested_url, timeout=10)
-                        if nested_resp.ok:
-                            nested_content = nested_resp.content
-                            if nested_url.endswith(".gz"):
-                                nested_content = gzip.decompress(nested_content)
-                            nested_root = ET.fromstring(nested_content)
-                            for loc in nested_root.findall(".//{*}url/{*}loc"):
-                                sitemap_urls.append(loc.text.strip())
-                                if len(sitemap_urls) >= limit:
-                                    break
-                    except Exception:
-                        continue
-                    if len(sitemap_urls) >= limit:
-                        break
-
-            # Regular sitemap
-            elif root.tag.endswith("urlset"):
-                for loc in root.findall(".//{*}url/{*}loc"):
-                    sitemap_urls.append(loc.text.strip())
-                    if len(sitemap_urls) >= limit:
-                        break
-        except Exception:
-            continue
-        if len(sitemap_urls) >= limit:
-            break
-
-    return {
-        "sitemaps_checked": sitemap_locations,
-        "sitemap_urls_sample": sitemap_urls[:limit],
-        "total_urls": len(sitemap_urls)
-    }
+    """Sitemap coverage for the site: exact URL count, lastmod stats and a sample."""
+    return sitemap_fetcher.summarize(url, limit)
 
 
 def crawlability_audit(url: str, onpage_data: dict = None) -> dict:
-    robots_data = fetch_robots_txt(url)
-    sitemap_data = fetch_sitemap(url)
+    return crawlability_report(fetch_robots_txt(url), fetch_sitemap(url), onpage_data)
+
 
+def crawlability_report(robots_data: dict, sitemap_data: dict, onpage_data: dict = None) -> dict:
+    """Build the crawlability section from already-fetched robots.txt / sitemap data."""
     # Default indexing signals
     indexing_signals = {
         "robots_meta": None,
@@ -146,6 +53,10 @@ def crawlability_audit(url: str, onpage_data: dict = None) -> dict:
         else:
             summary_notes.append("No sitemap found")
 
+    if sitemap_data.get("blocked_by_robots"):
+        status = "Issues Found"
+        summary_notes.append(f"{sitemap_data['blocked_by_robots']} sitemap URLs disallowed by robots.txt")
+
     if indexing_signals["canonical_consistency"] == "Mismatch":
         status = "Issues Found"
         summary_notes.append("Canonical mismatch")
@@ -0,0 +1,188 @@
+# backend/extractor.py
+"""
+Single-pass on-page signal extractor (lxml SAX-style target parser)
+- Streams the document once and collects everything /onpage needs:
+  title, meta description/robots, canonical, h1-h3, images, links, visible text
+- Also records the signals used to decide whether a page needs a JS render
+- Mirrors BeautifulSoup(html, "html.parser") get_text()/find() semantics so the
+  audit output is unchanged (see benchmarks/bench_extractor.py for the parity check)
+"""
+
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+from lxml import etree
+
+HEADING_TAGS = ("h1", "h2", "h3")
+# bs4 keeps script/style/template bodies out of get_text(); /onpage also drops noscript from body text
+HIDDEN_TEXT_TAGS = frozenset(("script", "style", "template"))
+BODY_SKIP_TAGS = frozenset(("script", "style", "template", "noscript"))
+SPA_ROOT_IDS = frozenset(("root", "app", "__next", "__nuxt", "___gatsby", "svelte"))
+CHUNK_SIZE = 1 << 16
+
+
+class _Collector:
+    """Parser target; every callback is O(1) apart from appending text chunks."""
+
+    def __init__(self):
+        self.title: Optional[str] = None
+        self.meta_description: Optional[str] = None
+        self.robots_meta: Optional[str] = None
+        self.canonical: Optional[str] = None
+        self.headings: Dict[str, List[str]] = {t: [] for t in HEADING_TAGS}
+        self.images = 0
+        self.missing_alt: List[str] = []
+        self.links: List[str] = []
+        self.text: List[str] = []
+        self.noscript_text: List[str] = []
+        self.body_chars = 0
+        self.spa_roots: Dict[str, bool] = {}  # id -> has content
+
+        self._seen_title = self._seen_desc = self._seen_robots = self._seen_canonical = False
+        self._title_depth: Optional[int] = None
+        self._title_parts: List[str] = []
+        self._open_headings: List[list] = []  # [tag, depth, parts]
+        self._open_roots: List[list] = []     # [id, depth]
+        self._depth = 0
+        self._hidden = 0     # inside script/style/template
+        self._body_skip = 0  # inside any BODY_SKIP_TAGS
+        self._noscript = 0
+        self._in_body = 0
+        self._buf: List[str] = []
+
+    # --- text nodes: lxml may split one node across several data() calls ---
+
+    def _flush(self) -> None:
+        if not self._buf:
+            return
+        raw = "".join(self._buf)
+        self._buf = []
+        if self._hidden:
+            return
+        if self._title_depth is not None:
+            self._title_parts.append(raw)
+        s = raw.strip()
+        if not s:
+            return
+        for h in self._open_headings:
+            h[2].append(s)
+        if self._noscript:
+            self.noscript_text.append(s)
+        if not self._body_skip:
+            self.text.append(s)
+            if self._in_body:
+                self.body_chars += len(s)
+        for r in self._open_roots:
+            self.spa_roots[r[0]] = True
+
+    def data(self, data: str) -> None:
+        self._buf.append(data)
+
+    def comment(self, text: str) -> None:
+        self._flush()
+
+    def pi(self, target: str, data: str = None) -> None:
+        self._flush()
+
+    # --- elements ---
+
+    def start(self, tag: str, attrib) -> None:
+        self._flush()
+        if not isinstance(tag, str):
+            return
+        self._depth += 1
+        for r in self._open_roots:
+            self.spa_roots[r[0]] = True
+
+        if tag in HIDDEN_TEXT_TAGS:
+            self._hidden += 1
+        if tag in BODY_SKIP_TAGS:
+            self._body_skip += 1
+        if tag == "noscript":
+            self._noscript += 1
+        elif tag == "body":
+            self._in_body += 1
+        elif tag in HEADING_TAGS:
+            self._open_headings.append([tag, self._depth, []])
+        elif tag == "title":
+            if not self._seen_title:
+                self._seen_title = True
+                self._title_depth = self._depth
+        elif tag == "a":
+            href = attrib.get("href")
+            if href is not None:
+                self.links.append(href.strip())
+        elif tag == "img":
+            self.images += 1
+            src = attrib.get("src")
+            if src and not attrib.get("alt"):
+                self.missing_alt.append(src)
+        elif tag == "meta":
+            name = (attrib.get("name") or "").lower()
+            if name == "description" and not self._seen_desc:
+                self._seen_desc = True
+                content = attrib.get("content")
+                self.meta_description = content.strip() if content else None
+            elif name == "robots" and not self._seen_robots:
+                self._seen_robots = True
+                self.robots_meta = attrib.get("content") or None
+        elif tag == "link" and not self._seen_canonical:
+            rel = attrib.get("rel") or ""
+            if rel == "canonical" or "canonical" in rel.split():
+                self._seen_canonical = True
+                self.canonical = attrib.get("href") or None
+
+        el_id = attrib.get("id")
+        if el_id in SPA_ROOT_IDS and el_id not in self.spa_roots:
+            self.spa_roots[el_id] = False
+            self._open_roots.append([el_id, self._depth])
+
+    def end(self, tag: str) -> None:
+        self._flush()
+        if not isinstance(tag, str):
+            return
+        if tag in HIDDEN_TEXT_TAGS:
+            self._hidden -= 1
+        if tag in BODY_SKIP_TAGS:
+            self._body_skip -= 1
+        if tag == "noscript":
+            self._noscript -= 1
+        elif tag == "body":
+            self._in_body -= 1
+        elif tag in HEADING_TAGS:
+            while self._open_headings and self._open_headings[-1][1] >= self._depth:
+                h_tag, _, parts = self._open_headings.pop()
+                self.headings[h_tag].append("".join(parts))
+        elif tag == "title" and self._title_depth == self._depth:
+            self._title_depth = None
+            self.title = "".join(self._title_parts).strip() if self._title_parts else None
+        while self._open_roots and self._open_roots[-1][1] >= self._depth:
+            self._open_roots.pop()
+        self._depth -= 1
+
+    def close(self) -> "_Collector":
+        self._flush()
+        return self
+
+
+def extract(html) -> Dict[str, Any]:
+    """Collect all on-page signals from `html` (str or bytes) in one pass."""
+    target = _Collector()
+    parser = etree.HTMLParser(target=target, huge_tree=True)
+    if html:
+        for i in range(0, len(html), CHUNK_SIZE):
+            parser.feed(html[i:i + CHUNK_SIZE])
+        parser.close()
+    return {
+        "title": target.title,
+        "meta_description": target.meta_description,
+        "robots_meta": target.robots_meta,
+        "canonical": target.canonical,
+        "headings": {t: list(dict.fromkeys(v)) for t, v in target.headings.items()},
+        "images": target.images,
+        "missing_alt": target.missing_alt,
+        "links": target.links,
+        "text": " ".join(target.text),
+        "body_chars": target.body_chars,
+        "noscript_text": " ".join(target.noscript_text),
+        "spa_roots": target.spa_roots,
+    }
@@ -0,0 +1,288 @@
+# backend/gamma.py
+"""
+Gamma generations client for report decks
+- One asyncio loop on a background thread owns one pooled httpx.AsyncClient,
+  shared by every job in the process
+- start() POSTs the slides and returns the generationId; watch() hands the id
+  to a single poller coroutine that checks every in-flight generation, so no
+  thread sleeps while Gamma works
+- Adaptive polling: the first check waits for most of the typical generation
+  time (a running average of completed ones, GAMMA_POLL_FIRST s to start with);
+  after that checks start GAMMA_POLL_MIN s apart and stretch by
+  GAMMA_POLL_FACTOR up to GAMMA_POLL_MAX s; 429/5xx honour Retry-After;
+  unreachable or malformed answers are retried with the same backoff
+- Completion is reported through the watch() callback (run on a worker
+  thread), like a webhook; wait() is the blocking form for scripts
+- GAMMA_API_BASE points the client at a local mock of the generations API
+"""
+
+from __future__ import annotations
+import os, time, random, asyncio, threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import httpx
+from dotenv import load_dotenv
+load_dotenv()
+
+GAMMA_API_BASE = os.getenv("GAMMA_API_BASE", "https://public-api.gamma.app/v0.2").rstrip("/")
+GAMMA_API_KEY = os.getenv("GAMMA_API_KEY")
+POLL_FIRST = float(os.getenv("GAMMA_POLL_FIRST", "20"))  # initial guess at a generation's duration
+POLL_MIN = float(os.getenv("GAMMA_POLL_MIN", "2"))
+POLL_MAX = float(os.getenv("GAMMA_POLL_MAX", "10"))
+POLL_FACTOR = float(os.getenv("GAMMA_POLL_FACTOR", "1.5"))
+TIMEOUT = float(os.getenv("GAMMA_TIMEOUT", "600"))       # give up on a generation after this many s
+MAX_CONNECTIONS = int(os.getenv("GAMMA_MAX_CONNECTIONS", "10"))
+CREATE_RETRIES = 3
+
+# callback(url, error): exactly one of them is set
+DoneCallback = Callable[[Optional[str], Optional[str]], None]
+
+
+class GammaError(RuntimeError):
+    pass
+
+
+def _retry_after(response: httpx.Response, default: float) -> float:
+    try:
+        return max(float(response.headers.get("Retry-After", "")), 0.0)
+    except ValueError:
+        return default
+
+
+def _body(response: httpx.Response) -> Dict:
+    """The JSON object in `response`, or {} for anything else (HTML error page, list, ...)."""
+    try:
+        data = response.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+@dataclass
+class _Watch:
+    generation_id: str
+    deadline: float
+    due: float
+    started: float
+    timeout: float
+    interval: float = POLL_MIN
+    tags: List[str] = field(default_factory=list)
+    callbacks: List[DoneCallback] = field(default_factory=list)
+
+
+class GammaClient:
+    def __init__(self, base_url: str = GAMMA_API_BASE, api_key: Optional[str] = GAMMA_API_KEY,
+                 poll_min: float = POLL_MIN, poll_max: float = POLL_MAX, poll_factor: float = POLL_FACTOR,
+                 timeout: float = TIMEOUT, max_connections: int = MAX_CONNECTIONS):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.poll_min, self.poll_max, self.poll_factor = poll_min, poll_max, poll_factor
+        self.timeout = timeout
+        self.max_connections = max(max_connections, 1)
+        self._watches: Dict[str, _Watch] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._http: Optional[httpx.AsyncClient] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._poller_task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "polls": 0, "poll_errors": 0, "completed": 0, "failed": 0}
+        self._typical = POLL_FIRST  # running average of generation time, s
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    # --- loop thread ---
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                threading.Thread(target=run, name="gamma-loop", daemon=True).start()
+                ready.wait()
+                asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+                self._loop = loop
+            return self._loop
+
+    async def _setup(self) -> None:
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"X-API-KEY": self.api_key or "", "Content-Type": "application/json"},
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+        )
+        self._wakeup = asyncio.Event()
+        self._poller_task = asyncio.get_running_loop().create_task(self._poller())
+
+    async def _shutdown(self) -> None:
+        self._poller_task.cancel()
+        try:
+            await self._poller_task
+        except asyncio.CancelledError:
+            pass
+        await self._http.aclose()
+
+    def close(self) -> None:
+        """Stop the loop; watches still pending are dropped (their jobs get requeued)."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(5)
+            loop.call_soon_threadsafe(loop.stop)
+            self._watches.clear()
+
+    def _call(self, coro, timeout: Optional[float] = None):
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result(timeout)
+
+    # --- public, thread-safe ---
+
+    def start(self, slides: str) -> str:
+        """Start a generation for the slide markdown and return its generationId."""
+        if not self.configured:
+            raise GammaError("GAMMA_API_KEY is not set")
+        return self._call(self._create(slides), timeout=120)
+
+    def watch(self, generation_id: str, callback: DoneCallback, tag: Optional[str] = None,
+              timeout: Optional[float] = None, started_at: Optional[float] = None) -> None:
+        """Poll `generation_id` until it finishes, then run callback(url, error) on a worker thread.
+
+        `tag` (the job id) shows up in watching() while the generation is pending;
+        `started_at` (epoch s) dates a generation started before a restart.
+        """
+        elapsed = max(time.time() - started_at, 0.0) if started_at else 0.0
+        loop = self._ensure_loop()
+        loop.call_soon_threadsafe(self._add_watch, generation_id, callback, tag, timeout or self.timeout, elapsed)
+
+    def wait(self, generation_id: str, timeout: Optional[float] = None, started_at: Optional[float] = None) -> str:
+        """Blocking form of watch(): the deck URL, or GammaError."""
+        done: Future = Future()
+        self.watch(generation_id, lambda url, error: done.set_result((url, error)),
+                   timeout=timeout, started_at=started_at)
+        url, error = done.result()
+        if error:
+            raise GammaError(error)
+        return url
+
+    def watching(self) -> List[str]:
+        """Tags (job ids) of the generations still being polled."""
+        return [tag for w in list(self._watches.values()) for tag in w.tags]
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "in_flight": len(self._watches), "typical_s": round(self._typical, 1)}
+
+    # --- coroutines ---
+
+    async def _create(self, slides: str) -> str:
+        payload = {"inputText": slides, "textMode": "preserve", "cardSplit": "inputTextBreaks"}
+        for attempt in range(CREATE_RETRIES + 1):
+            try:
+                r = await self._http.post("/generations", json=payload)
+            except httpx.HTTPError as e:
+                if attempt == CREATE_RETRIES:
+                    raise GammaError(f"Gamma request failed: {e}") from e
+                await asyncio.sleep(2 ** attempt)
+                continue
+            if (r.status_code == 429 or r.status_code >= 500) and attempt < CREATE_RETRIES:
+                await asyncio.sleep(_retry_after(r, 2 ** attempt))
+                continue
+            if r.status_code >= 400:
+                raise GammaError(f"Gamma HTTP {r.status_code}: {r.text[:200]}")
+            generation_id = _body(r).get("generationId")
+            if not generation_id:
+                raise GammaError(f"Gamma returned no generationId: {r.text[:200]}")
+            self._stats["created"] += 1
+            return generation_id
+
+    def _add_watch(self, generation_id: str, callback: DoneCallback, tag: Optional[str],
+                   timeout: float, elapsed: float) -> None:
+        now = asyncio.get_running_loop().time()
+        w = self._watches.get(generation_id)
+        if w is None:  # a resumed job may watch an id that is already being polled
+            first = max(self._typical * 0.75 - elapsed, self.poll_min)
+            w = self._watches[generation_id] = _Watch(generation_id, deadline=now - elapsed + timeout,
+                                                      due=now + first, started=now - elapsed, timeout=timeout,
+                                                      interval=self.poll_min / self.poll_factor)
+        w.callbacks.append(callback)
+        if tag:
+            w.tags.append(tag)
+        self._wakeup.set()
+
+    async def _poller(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            due = [w for w in self._watches.values() if w.due <= now]
+            if due:
+                results = await asyncio.gather(*(self._check(w) for w in due), return_exceptions=True)
+                for w, result in zip(due, results):
+                    if isinstance(result, Exception):  # one bad check must not stop the poller
+                        print(f"⚠️ Gamma poll of {w.generation_id} failed: {result!r}")
+                        self._stats["poll_errors"] += 1
+                        self._backoff(w)
+                continue
+            next_due = min((w.due for w in self._watches.values()), default=None)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), None if next_due is None else next_due - now)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _check(self, w: _Watch) -> None:
+        loop = asyncio.get_running_loop()
+        self._stats["polls"] += 1
+        delay = None
+        try:
+            r = await self._http.get(f"/generations/{w.generation_id}")
+        except httpx.HTTPError:
+            r = None  # transient; back off and try again
+        if r is not None and (r.status_code == 429 or r.status_code >= 500):
+            delay = _retry_after(r, w.interval)
+        elif r is not None and r.status_code >= 400:
+            return self._finish(w, None, f"Gamma HTTP {r.status_code}: {r.text[:200]}")
+        elif r is not None:
+            data = _body(r)
+            status = data.get("status")  # None for a malformed answer: transient, like a 5xx
+            if status is None:
+                self._stats["poll_errors"] += 1
+            if status == "completed":
+                self._typical = 0.8 * self._typical + 0.2 * (loop.time() - w.started)
+                url = data.get("gammaUrl")
+                return self._finish(w, url, None if url else "completed without a gammaUrl")
+            if status == "failed":
+                return self._finish(w, None, f"Gamma generation failed: {data.get('reason') or 'no reason given'}")
+        self._backoff(w, delay)
+
+    def _backoff(self, w: _Watch, delay: Optional[float] = None) -> None:
+        """Schedule the next check of `w`, or fail it past its deadline."""
+        now = asyncio.get_running_loop().time()
+        if now >= w.deadline:
+            return self._finish(w, None, f"Gamma generation not done after {w.timeout:.0f}s")
+        w.interval = min(w.interval * self.poll_factor, self.poll_max)
+        w.due = now + max(delay or 0, w.interval * random.uniform(0.9, 1.1))
+
+    def _finish(self, w: _Watch, url: Optional[str], error: Optional[str]) -> None:
+        self._watches.pop(w.generation_id, None)
+        self._stats["failed" if error else "completed"] += 1
+        loop = asyncio.get_running_loop()
+        for callback in w.callbacks:
+            loop.run_in_executor(None, self._run_callback, callback, url, error)
+
+    @staticmethod
+    def _run_callback(callback: DoneCallback, url: Optional[str], error: Optional[str]) -> None:
+        try:
+            callback(url, error)
+        except Exception as e:
+            print(f"⚠️ Gamma completion callback failed: {e}")
+
+
+# Shared by the workflow and the worker.
+client = GammaClient()
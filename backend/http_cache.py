@@ -0,0 +1,219 @@
+# backend/http_cache.py
+"""
+Conditional GETs for robots.txt, sitemaps and static page HTML
+- Bodies of 200 responses that carry an ETag or Last-Modified are kept on disk
+  (HTTP_CACHE_DIR, default data/http_cache) with their validators
+- The next fetch of the URL sends If-None-Match / If-Modified-Since; on 304 the
+  stored body is served, so an unchanged 50 MB sitemap costs one round trip
+- Bodies are teed to disk while the caller streams them; only bodies read to
+  the end are stored, so a capped or failed read never leaves a truncated copy
+- Entry writes are serialized per URL; a 304 serves the copy opened before the
+  request, so a concurrent store or eviction cannot pull it away mid-read
+- Size-bounded (HTTP_CACHE_MAX_BYTES), least recently used entries go first;
+  Cache-Control: no-store is honoured, 404/410 drop the entry
+- Stats (bytes and time saved by 304s) on /http-cache/stats; HTTP_CACHE=0 turns
+  the layer into plain GETs
+"""
+
+from __future__ import annotations
+import io, os, json, time, uuid, hashlib, pathlib, threading
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, Iterator, Optional
+import requests
+
+CACHE_DIR = pathlib.Path(os.getenv("HTTP_CACHE_DIR", pathlib.Path(__file__).resolve().parent.parent / "data" / "http_cache"))
+MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+ENABLED = os.getenv("HTTP_CACHE", "1") != "0"
+CHUNK_SIZE = 1 << 16
+KEY_LOCKS = 64  # entry writes are serialized per key, striped over this many locks
+
+
+@dataclass
+class Fetched:
+    status: int
+    url: str
+    content_type: str
+    body: BinaryIO            # decoded body (Content-Encoding undone), read it as a stream
+    revalidated: bool = False  # True: 304, body is the stored copy
+
+
+class _Tee(io.RawIOBase):
+    """Read-through wrapper that copies every byte to `sink` and times the reads."""
+
+    def __init__(self, source, sink):
+        self.source, self.sink = source, sink
+        self.eof = False
+        self.read_s = 0.0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buf) -> int:
+        t0 = time.perf_counter()
+        data = self.source.read(len(buf))
+        self.read_s += time.perf_counter() - t0
+        if not data:
+            self.eof = True
+            return 0
+        self.sink.write(data)
+        buf[:len(data)] = data
+        return len(data)
+
+
+class ConditionalCache:
+    def __init__(self, directory: pathlib.Path = CACHE_DIR, max_bytes: int = MAX_BYTES, enabled: bool = ENABLED):
+        self.dir = pathlib.Path(directory)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(KEY_LOCKS)]
+        self._stored_bytes: Optional[int] = None  # scanned on first store
+        self._stats = {"requests": 0, "conditional": 0, "not_modified": 0, "modified": 0, "stored": 0,
+                       "bytes_downloaded": 0, "bytes_saved": 0, "ms_saved": 0}
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()[:24]
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        return self._key_locks[int(key[:8], 16) % KEY_LOCKS]
+
+    def _count(self, **deltas) -> None:
+        with self._lock:
+            for name, n in deltas.items():
+                self._stats[name] += n
+
+    # --- entries: <key>.json (validators, body file name) + immutable <key>.<id>.body ---
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads((self.dir / f"{key}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _drop(self, key: str) -> None:
+        with self._key_lock(key):
+            entry = self._load(key)  # the current entry, not the one a caller read earlier
+            (self.dir / f"{key}.json").unlink(missing_ok=True)
+            if entry:
+                (self.dir / entry["body"]).unlink(missing_ok=True)
+                with self._lock:
+                    if self._stored_bytes is not None:
+                        self._stored_bytes -= entry["size"]
+
+    def _store(self, key: str, entry: Dict[str, Any], tmp: pathlib.Path) -> None:
+        with self._key_lock(key):  # two stores of one URL: the second replaces the first, no orphaned body
+            old = self._load(key)
+            os.replace(tmp, self.dir / entry["body"])
+            meta_tmp = self.dir / f".{key}.{uuid.uuid4().hex[:8]}.json.tmp"
+            meta_tmp.write_text(json.dumps(entry), encoding="utf-8")
+            os.replace(meta_tmp, self.dir / f"{key}.json")
+            if old:
+                (self.dir / old["body"]).unlink(missing_ok=True)  # readers that opened it keep their handle
+        with self._lock:
+            self._stats["stored"] += 1
+            if self._stored_bytes is None:
+                self._stored_bytes = sum(p.stat().st_size for p in self.dir.glob("*.body"))
+            else:
+                self._stored_bytes += entry["size"] - (old["size"] if old else 0)
+            over = self._stored_bytes > self.max_bytes
+        if over:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until under 90% of max_bytes."""
+        metas = sorted(self.dir.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        target = int(self.max_bytes * 0.9)
+        for meta in metas:
+            with self._lock:
+                if self._stored_bytes <= target:
+                    return
+            self._drop(meta.name[:-len(".json")])
+
+    # --- fetch ---
+
+    @contextmanager
+    def get(self, session: requests.Session, url: str, timeout=None,
+            headers: Optional[Dict[str, str]] = None) -> Iterator[Fetched]:
+        """GET `url` through `session`, revalidating a stored copy if there is one.
+
+        Use as a context manager and read `body` inside it; the body is stored
+        on exit only when it was read to the end without an error.
+        """
+        key = self._key(url)
+        entry = self._load(key) if self.enabled else None
+        with ExitStack() as stack:
+            stored = None
+            if entry:
+                try:
+                    # opened before the request: a concurrent store or eviction can unlink the
+                    # file but not this handle; already gone means an unconditional GET
+                    stored = stack.enter_context(open(self.dir / entry["body"], "rb"))
+                except OSError:
+                    entry = None
+            request_headers = dict(headers or {})
+            if entry:
+                if entry.get("etag"):
+                    request_headers["If-None-Match"] = entry["etag"]
+                if entry.get("last_modified"):
+                    request_headers["If-Modified-Since"] = entry["last_modified"]
+            t0 = time.perf_counter()
+            r = stack.enter_context(session.get(url, headers=request_headers, timeout=timeout, stream=True))
+            wait_s = time.perf_counter() - t0
+            self._count(requests=1, conditional=int(bool(entry)))
+            r.raw.decode_content = True  # undo Content-Encoding: gzip
+
+            if r.status_code == 304 and entry:
+                try:
+                    os.utime(self.dir / f"{key}.json")  # recently used
+                except OSError:
+                    pass  # replaced or evicted meanwhile; the open copy is still the one validated
+                self._count(not_modified=1, bytes_saved=entry["size"],
+                            ms_saved=max(int(entry["fetch_ms"] - wait_s * 1000), 0))
+                yield Fetched(entry["status"], url, entry["content_type"], stored, revalidated=True)
+                return
+            if stored:
+                stored.close()
+
+            if entry:
+                self._count(modified=1)
+                if r.status_code in (404, 410):
+                    self._drop(key)
+            etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+            storable = (self.enabled and r.status_code == 200 and (etag or last_modified)
+                        and "no-store" not in r.headers.get("Cache-Control", "").lower())
+            content_type = r.headers.get("Content-Type", "")
+            if not storable:
+                yield Fetched(r.status_code, url, content_type, r.raw)
+                return
+
+            self.dir.mkdir(parents=True, exist_ok=True)
+            body_name = f"{key}.{uuid.uuid4().hex[:8]}.body"
+            tmp = self.dir / f".{body_name}.tmp"
+            complete = False
+            try:
+                with open(tmp, "wb") as sink:
+                    tee = _Tee(r.raw, sink)
+                    body = io.BufferedReader(tee, CHUNK_SIZE)
+                    yield Fetched(r.status_code, url, content_type, body)
+                    complete = tee.eof or not body.read(1)  # the caller may stop right at the end
+                    size = sink.tell()
+                self._count(bytes_downloaded=size)
+                if complete:
+                    self._store(key, {
+                        "url": url, "status": r.status_code, "etag": etag, "last_modified": last_modified,
+                        "content_type": content_type, "body": body_name, "size": size,
+                        "fetch_ms": int((wait_s + tee.read_s) * 1000), "stored_at": time.time(),
+                    }, tmp)
+            finally:
+                if not complete:
+                    tmp.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "enabled": self.enabled, "stored_bytes": self._stored_bytes}
+
+
+# Shared by robots.txt, sitemap and static HTML fetches.
+http_cache = ConditionalCache()
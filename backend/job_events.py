@@ -0,0 +1,143 @@
+# backend/job_events.py
+"""
+Push delivery of report job progress
+- GET /report-events/{job_id}: server-sent events, one `status` event per change
+- GET /report-status/{job_id}?wait=N&since=V: long-poll fallback
+- One poller per API process reads store.changes_since(cursor) every
+  JOB_EVENTS_POLL s and fans each change out to that job's subscribers, so the
+  store sees one query per interval however many clients are watching
+- A subscriber is only an asyncio.Queue: thousands of idle streams cost no
+  threads and no store queries; idle streams get a comment ping every
+  JOB_EVENTS_HEARTBEAT s
+- Changes made by separate worker processes arrive through the store
+"""
+
+from __future__ import annotations
+import os, json, asyncio
+from typing import Any, AsyncIterator, Dict, Optional, Set
+from fastapi.concurrency import run_in_threadpool
+from backend.jobs import FINISHED, store as job_store
+
+POLL_INTERVAL = float(os.getenv("JOB_EVENTS_POLL", "0.5"))
+HEARTBEAT = float(os.getenv("JOB_EVENTS_HEARTBEAT", "15"))
+QUEUE_SIZE = 8  # a slow client only ever needs the latest state
+
+
+def _sse(job: Dict[str, Any]) -> str:
+    return f"id: {job.get('version', 0)}\nevent: status\ndata: {json.dumps(job, default=str)}\n\n"
+
+
+def _offer(queue: asyncio.Queue, job: Dict[str, Any]) -> None:
+    if queue.full():
+        queue.get_nowait()  # drop the oldest state; newer versions supersede it
+    queue.put_nowait(job)
+
+
+class JobEventHub:
+    def __init__(self, store, poll_interval: float = POLL_INTERVAL):
+        self.store = store
+        self.poll_interval = poll_interval
+        self._subs: Dict[str, Set[asyncio.Queue]] = {}
+        self._cursor = 0
+        self._task: Optional[asyncio.Task] = None
+
+    # --- lifecycle ---
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._cursor = await run_in_threadpool(self.store.version)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _subscribe(self, job_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+        self._subs.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def _unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subs.get(job_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subs[job_id]
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                if not self._subs:
+                    # nobody listening: move the cursor forward, to a version read before
+                    # checking again; a subscriber arriving during the read fetched its
+                    # job after it, so skipping up to that version loses nothing
+                    version = await run_in_threadpool(self.store.version)
+                    if not self._subs:
+                        self._cursor = max(self._cursor, version)
+                        continue
+                changes = await run_in_threadpool(self.store.changes_since, self._cursor)
+            except Exception as e:
+                print(f"⚠️ Job event poll failed: {e}")
+                continue
+            for job in changes:
+                self._cursor = max(self._cursor, job["version"])
+                for queue in self._subs.get(job["job_id"], ()):
+                    _offer(queue, job)
+
+    # --- consumers ---
+
+    async def stream(self, job_id: str, last_version: int = 0) -> AsyncIterator[str]:
+        """SSE body: current state, then every change until the job finishes."""
+        queue = self._subscribe(job_id)
+        try:
+            await self.start()
+            yield "retry: 3000\n\n"
+            job = await run_in_threadpool(self.store.get, job_id)
+            if job is None:
+                yield _sse({"status": "not_found", "result": None})
+                return
+            while True:
+                if job is not None and job["version"] > last_version:
+                    last_version = job["version"]
+                    yield _sse(job)
+                    if job["status"] in FINISHED:
+                        return
+                try:
+                    job = await asyncio.wait_for(queue.get(), HEARTBEAT)
+                except asyncio.TimeoutError:
+                    job = None
+                    yield ": ping\n\n"
+        finally:
+            self._unsubscribe(job_id, queue)
+
+    async def wait(self, job_id: str, since: int, timeout: float) -> Optional[Dict[str, Any]]:
+        """Long-poll: return once the job's version passes `since`, or its current state after `timeout` s."""
+        queue = self._subscribe(job_id)
+        try:
+            await self.start()
+            job = await run_in_threadpool(self.store.get, job_id)
+            if job is None or job["version"] > since or job["status"] in FINISHED:
+                return job
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    latest = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                job = latest
+                if job["version"] > since:
+                    break
+            return job
+        finally:
+            self._unsubscribe(job_id, queue)
+
+
+# Process-wide hub used by the API routes.
+job_events = JobEventHub(job_store)
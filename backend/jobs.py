@@ -0,0 +1,526 @@
+# backend/jobs.py
+"""
+Durable job store for /generate-report
+- SQLite by default (JOB_DB, default data/jobs/jobs.sqlite3), shared by the API and
+  any number of worker processes on the same machine
+- Redis when JOB_BACKEND=redis, or when REDIS_URL is set and the `redis` package is
+  installed; lets workers run on other machines
+- Dedup: submitting a URL that already has an unfinished job returns that job
+- Stale running jobs (no heartbeat for JOB_STALE_AFTER s) go back to the queue,
+  up to JOB_MAX_ATTEMPTS runs (then failed, keeping the sections already
+  published); finished jobs are deleted after JOB_RETENTION s
+- `statuses` is a dict-like view, so run_full_workflow() keeps writing
+  statuses[job_id] = {"status": ..., "result": ...}
+- Every write bumps a store-wide version; changes_since(v) lists jobs changed
+  after v (drives the push endpoints in backend/job_events.py)
+- Also keeps named token buckets with a daily quota (take_token / pause_limit),
+  so a rate limit holds across every process on the store (the PSI client's)
+"""
+
+from __future__ import annotations
+import os, json, math, time, uuid, sqlite3, pathlib, threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from backend.cache import normalize_url
+
+JOB_DB = pathlib.Path(os.getenv("JOB_DB", pathlib.Path(__file__).resolve().parent.parent / "data" / "jobs" / "jobs.sqlite3"))
+JOB_BACKEND = os.getenv("JOB_BACKEND", "")  # "sqlite" | "redis" | "" (auto)
+REDIS_URL = os.getenv("REDIS_URL")
+REDIS_PREFIX = os.getenv("JOB_REDIS_PREFIX", "seo:jobs:")
+RETENTION = int(os.getenv("JOB_RETENTION", str(7 * 86400)))   # seconds finished jobs are kept
+STALE_AFTER = int(os.getenv("JOB_STALE_AFTER", "120"))         # seconds without a heartbeat
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+
+PENDING = "pending"
+FINISHED = frozenset(("complete", "failed"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           TEXT PRIMARY KEY,
+    url          TEXT NOT NULL,
+    url_key      TEXT NOT NULL,
+    status       TEXT NOT NULL,
+    data         TEXT NOT NULL,
+    worker       TEXT,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    created_at   REAL NOT NULL,
+    updated_at   REAL NOT NULL,
+    heartbeat_at REAL,
+    finished_at  REAL,
+    version      INTEGER NOT NULL DEFAULT 0,
+    options      TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS job_version (id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER NOT NULL);
+INSERT OR IGNORE INTO job_version (id, value) VALUES (1, 0);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_inflight ON jobs (url_key) WHERE finished_at IS NULL;
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at);
+CREATE INDEX IF NOT EXISTS jobs_version ON jobs (version);
+CREATE TABLE IF NOT EXISTS rate_limits (name TEXT PRIMARY KEY, state TEXT NOT NULL);
+"""
+
+
+_ADDED_COLUMNS = {"version": "INTEGER NOT NULL DEFAULT 0", "options": "TEXT NOT NULL DEFAULT '{}'"}
+
+
+def _record(job_id: str, url: str, status: str, data: Dict[str, Any], **meta) -> Dict[str, Any]:
+    """Public shape of a job: what /report-status returns."""
+    return {"job_id": job_id, "url": url, "status": status, "result": None, **data, **meta}
+
+
+def _limit_state(state: Optional[Dict[str, Any]], now: float, burst: int = 1) -> Dict[str, Any]:
+    """A stored bucket (None: new, full) with today's day and defaults filled in."""
+    day = time.strftime("%Y-%m-%d", time.gmtime(now))
+    state = {"tokens": float(burst), "refilled_at": now, "day": day, "day_used": 0, "paused_until": 0.0,
+             **(state or {})}
+    if state["day"] != day:
+        state.update(day=day, day_used=0)
+    return state
+
+
+def _refill(state: Optional[Dict[str, Any]], now: float, rate: float, burst: int) -> Dict[str, Any]:
+    state = _limit_state(state, now, burst)
+    state["tokens"] = min(burst, state["tokens"] + max(now - state["refilled_at"], 0) * rate)
+    state["refilled_at"] = now
+    return state
+
+
+def _take_token(state: Optional[Dict[str, Any]], now: float, rate: float, burst: int,
+                per_day: int) -> Tuple[Dict[str, Any], float]:
+    """Refill the bucket and take a token: (new state, 0) if taken, else the seconds to wait (inf: quota used up)."""
+    state = _refill(state, now, rate, burst)
+    if state["paused_until"] > now:
+        return state, state["paused_until"] - now
+    if state["day_used"] >= per_day:
+        return state, math.inf
+    if state["tokens"] >= 1:
+        state["tokens"] -= 1
+        state["day_used"] += 1
+        return state, 0.0
+    return state, (1 - state["tokens"]) / rate
+
+
+def _pause(state: Optional[Dict[str, Any]], now: float, until: float) -> Tuple[Dict[str, Any], None]:
+    state = _limit_state(state, now)
+    state["paused_until"] = max(state["paused_until"], until)
+    return state, None
+
+
+class SQLiteJobStore:
+    def __init__(self, path: pathlib.Path = JOB_DB):
+        self.path = pathlib.Path(path)
+        self._local = threading.local()
+        self.wakeup = threading.Event()  # set on submit, so in-process workers don't wait a poll interval
+
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, decl in _ADDED_COLUMNS.items():  # job db created by an older version
+                if columns and column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {decl}")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _write(self, sql: str, args) -> int:
+        """Run one UPDATE/INSERT that sets `version = ?` (first parameter) under a fresh version."""
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("UPDATE job_version SET value = value + 1 WHERE id = 1")
+            version = db.execute("SELECT value FROM job_version WHERE id = 1").fetchone()[0]
+            count = db.execute(sql, (version, *args)).rowcount
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return count
+
+    # --- API side ---
+
+    def submit(self, url: str, options: Optional[Dict[str, Any]] = None) -> Tuple[str, bool]:
+        """Queue a report for `url`. Returns (job_id, deduped).
+
+        `options` (e.g. {"regenerate": True}) are handed to the worker with the job.
+        """
+        key = normalize_url(url)
+        now = time.time()
+        job_id = str(uuid.uuid4())
+        try:
+            self._write(
+                "INSERT INTO jobs (version, id, url, url_key, status, data, options, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, url, key, PENDING, "{}", json.dumps(options or {}), now, now),
+            )
+        except sqlite3.IntegrityError:
+            row = self._db().execute("SELECT id FROM jobs WHERE url_key = ? AND finished_at IS NULL", (key,)).fetchone()
+            if row:
+                return row[0], True
+            return self.submit(url, options)  # the in-flight job finished in between
+        self.wakeup.set()
+        return job_id, False
+
+    _COLUMNS = "id, url, status, data, attempts, created_at, updated_at, version"
+
+    @staticmethod
+    def _from_row(row) -> Dict[str, Any]:
+        job_id, url, status, data, attempts, created_at, updated_at, version = row
+        return _record(job_id, url, status, json.loads(data), attempts=attempts,
+                       created_at=created_at, updated_at=updated_at, version=version)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._db().execute(f"SELECT {self._COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else self._from_row(row)
+
+    def version(self) -> int:
+        return self._db().execute("SELECT value FROM job_version WHERE id = 1").fetchone()[0]
+
+    def changes_since(self, version: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Jobs written after `version`, oldest change first."""
+        rows = self._db().execute(
+            f"SELECT {self._COLUMNS} FROM jobs WHERE version > ? ORDER BY version LIMIT ?", (version, limit)
+        ).fetchall()
+        return [self._from_row(r) for r in rows]
+
+    # --- worker side ---
+
+    def claim(self, worker: str, timeout: float = 0) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest pending job, waiting up to `timeout` s for one."""
+        job = self._claim(worker)
+        if job is None and timeout:
+            self.wakeup.wait(timeout)
+            self.wakeup.clear()
+            job = self._claim(worker)
+        return job
+
+    def _claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        db = self._db()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                "SELECT id, url, options FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (PENDING,)
+            ).fetchone()
+            if row:
+                db.execute("UPDATE job_version SET value = value + 1 WHERE id = 1")
+                db.execute(
+                    "UPDATE jobs SET status = 'claimed', worker = ?, attempts = attempts + 1, "
+                    "heartbeat_at = ?, updated_at = ?, version = (SELECT value FROM job_version WHERE id = 1) "
+                    "WHERE id = ?",
+                    (worker, now, now, row[0]),
+                )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return {"job_id": row[0], "url": row[1], "options": json.loads(row[2])} if row else None
+
+    def update(self, job_id: str, value: Dict[str, Any]) -> None:
+        """Replace a job's status/result/extra fields (the statuses[job_id] = {...} write)."""
+        value = dict(value)
+        status = value.pop("status")
+        now = time.time()
+        self._write(
+            "UPDATE jobs SET version = ?, status = ?, data = ?, updated_at = ?, heartbeat_at = ?, finished_at = ? "
+            "WHERE id = ?",
+            (status, json.dumps(value, default=str), now, now, now if status in FINISHED else None, job_id),
+        )
+
+    def fail(self, job_id: str, result: str) -> None:
+        """Mark a job failed with `result`, keeping the sections it already published."""
+        now = time.time()
+        self._write(
+            "UPDATE jobs SET version = ?, status = 'failed', data = json_set(data, '$.result', ?), "
+            "updated_at = ?, heartbeat_at = ?, finished_at = ? WHERE id = ?",
+            (result, now, now, now, job_id),
+        )
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        now = time.time()
+        self._db().executemany("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND finished_at IS NULL",
+                               [(now, j) for j in job_ids])
+
+    def requeue_stale(self, stale_after: int = STALE_AFTER, max_attempts: int = MAX_ATTEMPTS) -> int:
+        """Put jobs whose worker died back in the queue (or fail them after max_attempts).
+
+        A failed job keeps the sections it already published; only `result` is set.
+        """
+        now = time.time()
+        cutoff = now - stale_after
+        failed = self._write(
+            "UPDATE jobs SET version = ?, status = 'failed', data = json_set(data, '$.result', ?), "
+            "finished_at = ?, updated_at = ? "
+            "WHERE status != ? AND finished_at IS NULL AND heartbeat_at < ? AND attempts >= ?",
+            ("Worker stopped responding.", now, now, PENDING, cutoff, max_attempts),
+        )
+        requeued = self._write(
+            "UPDATE jobs SET version = ?, status = ?, worker = NULL, updated_at = ? "
+            "WHERE status != ? AND finished_at IS NULL AND heartbeat_at < ?",
+            (PENDING, now, PENDING, cutoff),
+        )
+        if requeued:
+            self.wakeup.set()
+        return requeued + failed
+
+    def cleanup(self, retention: int = RETENTION) -> int:
+        return self._db().execute("DELETE FROM jobs WHERE finished_at < ?", (time.time() - retention,)).rowcount
+
+    # --- shared rate limits ---
+
+    def _update_limit(self, name: str, step: Callable[[Optional[Dict[str, Any]], float], Tuple[Dict[str, Any], Any]]):
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT state FROM rate_limits WHERE name = ?", (name,)).fetchone()
+            state, result = step(json.loads(row[0]) if row else None, time.time())
+            db.execute("INSERT OR REPLACE INTO rate_limits (name, state) VALUES (?, ?)", (name, json.dumps(state)))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return result
+
+    def take_token(self, name: str, rate: float, burst: int, per_day: int) -> float:
+        """Take one token from bucket `name`: 0 if taken, else seconds to wait (inf: daily quota used up)."""
+        return self._update_limit(name, lambda state, now: _take_token(state, now, rate, burst, per_day))
+
+    def pause_limit(self, name: str, seconds: float) -> None:
+        """Hand out no token from bucket `name` for `seconds` (e.g. a Retry-After)."""
+        self._update_limit(name, lambda state, now: _pause(state, now, now + seconds))
+
+    def limit_state(self, name: str, rate: float, burst: int) -> Dict[str, Any]:
+        """Bucket `name` as it stands now (tokens refilled, not taken)."""
+        row = self._db().execute("SELECT state FROM rate_limits WHERE name = ?", (name,)).fetchone()
+        return _refill(json.loads(row[0]) if row else None, time.time(), rate, burst)
+
+
+class RedisJobStore:
+    """Same interface on Redis: job hashes, a pending list, and sorted sets for
+    running jobs (by heartbeat), finished jobs (by finish time) and changes (by version)."""
+
+    def __init__(self, url: str = REDIS_URL, prefix: str = REDIS_PREFIX, client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.r = client
+        self.p = prefix
+
+    def _job(self, job_id: str) -> str:
+        return f"{self.p}job:{job_id}"
+
+    def _inflight(self, key: str) -> str:
+        return f"{self.p}inflight:{key}"
+
+    def _bump(self, job_id: str) -> None:
+        """Give the job a new store-wide version, after its hash has been written.
+
+        Counter and changes entry move in one MULTI (retried if another process
+        bumps in between), so whoever reads version v also finds every change
+        below v in the changes set; changes_since() can't skip one.
+        """
+        from redis.exceptions import WatchError
+        counter = f"{self.p}version"
+        with self.r.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(counter)
+                    version = int(pipe.get(counter) or 0) + 1
+                    pipe.multi()
+                    pipe.set(counter, version)
+                    pipe.hset(self._job(job_id), "version", version)
+                    pipe.zadd(f"{self.p}changes", {job_id: version})
+                    pipe.execute()
+                    return
+                except WatchError:
+                    continue
+
+    def submit(self, url: str, options: Optional[Dict[str, Any]] = None) -> Tuple[str, bool]:
+        key = normalize_url(url)
+        now = time.time()
+        job_id = str(uuid.uuid4())
+        if not self.r.set(self._inflight(key), job_id, nx=True):
+            existing = self.r.get(self._inflight(key))
+            if existing and self.r.exists(self._job(existing)):
+                return existing, True
+            self.r.delete(self._inflight(key))
+            return self.submit(url, options)
+        pipe = self.r.pipeline()
+        pipe.hset(self._job(job_id), mapping={
+            "url": url, "url_key": key, "status": PENDING, "data": "{}", "options": json.dumps(options or {}),
+            "attempts": 0, "created_at": now, "updated_at": now,
+        })
+        pipe.rpush(f"{self.p}pending", job_id)
+        pipe.execute()
+        self._bump(job_id)
+        return job_id, False
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        h = self.r.hgetall(self._job(job_id))
+        if not h:
+            return None
+        return _record(job_id, h["url"], h["status"], json.loads(h.get("data") or "{}"),
+                       attempts=int(h.get("attempts", 0)), created_at=float(h["created_at"]),
+                       updated_at=float(h["updated_at"]), version=int(h.get("version", 0)))
+
+    def version(self) -> int:
+        return int(self.r.get(f"{self.p}version") or 0)
+
+    def changes_since(self, version: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        listed = self.r.zrangebyscore(f"{self.p}changes", f"({version}", "+inf", start=0, num=limit, withscores=True)
+        jobs = []
+        for job_id, listed_version in listed:
+            job = self.get(job_id)
+            if job is not None:
+                # changed again since the listing: report the listed version, so a
+                # reader's cursor never passes changes it hasn't been given yet
+                job["version"] = min(job["version"], int(listed_version))
+                jobs.append(job)
+        return jobs
+
+    def claim(self, worker: str, timeout: float = 0) -> Optional[Dict[str, Any]]:
+        if timeout:
+            item = self.r.blpop(f"{self.p}pending", timeout=max(int(timeout), 1))
+            job_id = item[1] if item else None
+        else:
+            job_id = self.r.lpop(f"{self.p}pending")
+        if not job_id:
+            return None
+        now = time.time()
+        pipe = self.r.pipeline()
+        pipe.hset(self._job(job_id), mapping={"status": "claimed", "worker": worker, "updated_at": now})
+        pipe.hincrby(self._job(job_id), "attempts", 1)
+        pipe.zadd(f"{self.p}running", {job_id: now})
+        pipe.hmget(self._job(job_id), "url", "options")
+        url, options = pipe.execute()[-1]
+        if url is None:  # deleted while queued
+            self.r.zrem(f"{self.p}running", job_id)
+            self.r.delete(self._job(job_id))
+            return None
+        self._bump(job_id)
+        return {"job_id": job_id, "url": url, "options": json.loads(options or "{}")}
+
+    def update(self, job_id: str, value: Dict[str, Any]) -> None:
+        value = dict(value)
+        status = value.pop("status")
+        now = time.time()
+        pipe = self.r.pipeline()
+        pipe.hset(self._job(job_id), mapping={"status": status, "data": json.dumps(value, default=str), "updated_at": now})
+        if status in FINISHED:
+            pipe.hset(self._job(job_id), "finished_at", now)
+            pipe.zrem(f"{self.p}running", job_id)
+            pipe.zadd(f"{self.p}finished", {job_id: now})
+        else:
+            pipe.zadd(f"{self.p}running", {job_id: now}, xx=True)
+        pipe.execute()
+        self._bump(job_id)
+        if status in FINISHED:
+            self._release(job_id)
+
+    def fail(self, job_id: str, result: str) -> None:
+        data = json.loads(self.r.hget(self._job(job_id), "data") or "{}")  # keep published sections
+        self.update(job_id, {**data, "status": "failed", "result": result})
+
+    def _release(self, job_id: str) -> None:
+        key = self.r.hget(self._job(job_id), "url_key")
+        if key and self.r.get(self._inflight(key)) == job_id:
+            self.r.delete(self._inflight(key))
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        if job_ids:
+            self.r.zadd(f"{self.p}running", {j: time.time() for j in job_ids}, xx=True)
+
+    def requeue_stale(self, stale_after: int = STALE_AFTER, max_attempts: int = MAX_ATTEMPTS) -> int:
+        count = 0
+        for job_id in self.r.zrangebyscore(f"{self.p}running", "-inf", time.time() - stale_after):
+            if not self.r.zrem(f"{self.p}running", job_id):
+                continue  # another worker got to it first
+            count += 1
+            if int(self.r.hget(self._job(job_id), "attempts") or 0) >= max_attempts:
+                self.fail(job_id, "Worker stopped responding.")
+            else:
+                self.r.hset(self._job(job_id), mapping={"status": PENDING, "worker": "", "updated_at": time.time()})
+                self._bump(job_id)
+                self.r.rpush(f"{self.p}pending", job_id)
+        return count
+
+    def cleanup(self, retention: int = RETENTION) -> int:
+        old = self.r.zrangebyscore(f"{self.p}finished", "-inf", time.time() - retention)
+        if old:
+            pipe = self.r.pipeline()
+            for job_id in old:
+                pipe.delete(self._job(job_id))
+                pipe.zrem(f"{self.p}finished", job_id)
+                pipe.zrem(f"{self.p}changes", job_id)
+            pipe.execute()
+        return len(old)
+
+    # --- shared rate limits ---
+
+    def _update_limit(self, name: str, step: Callable[[Optional[Dict[str, Any]], float], Tuple[Dict[str, Any], Any]]):
+        from redis.exceptions import WatchError
+        key = f"{self.p}limit:{name}"
+        with self.r.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    raw = pipe.get(key)
+                    state, result = step(json.loads(raw) if raw else None, time.time())
+                    pipe.multi()
+                    pipe.set(key, json.dumps(state))
+                    pipe.execute()
+                    return result
+                except WatchError:
+                    continue  # another process took a token in between
+
+    def take_token(self, name: str, rate: float, burst: int, per_day: int) -> float:
+        return self._update_limit(name, lambda state, now: _take_token(state, now, rate, burst, per_day))
+
+    def pause_limit(self, name: str, seconds: float) -> None:
+        self._update_limit(name, lambda state, now: _pause(state, now, now + seconds))
+
+    def limit_state(self, name: str, rate: float, burst: int) -> Dict[str, Any]:
+        raw = self.r.get(f"{self.p}limit:{name}")
+        return _refill(json.loads(raw) if raw else None, time.time(), rate, burst)
+
+
+def _make_store():
+    backend = JOB_BACKEND.lower()
+    if backend == "redis" or (not backend and REDIS_URL):
+        try:
+            return RedisJobStore()
+        except ImportError:
+            if backend == "redis":
+                raise
+    return SQLiteJobStore()
+
+
+class StatusView:
+    """dict-like facade over a job store (what run_full_workflow writes to)."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, job_id: str) -> Dict[str, Any]:
+        job = self.store.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job
+
+    def __setitem__(self, job_id: str, value: Dict[str, Any]) -> None:
+        self.store.update(job_id, value)
+
+    def __contains__(self, job_id: str) -> bool:
+        return self.store.get(job_id) is not None
+
+    def get(self, job_id: str, default=None):
+        job = self.store.get(job_id)
+        return default if job is None else job
+
+
+# Process-wide store, shared by the API routes and the embedded worker.
+store = _make_store()
+statuses = StatusView(store)
@@ -0,0 +1,135 @@
+# backend/keywords.py
+"""
+Keyword engine for /onpage
+- Tokenizes the lowered page text once
+- Counts unigrams, bigrams and trigrams in one Counter pass each (C-level counting)
+- Title / meta description / heading checks run against pre-lowered indexes
+- Per-language stopword lists: built-ins below, register_stopwords(), or
+  <STOPWORDS_DIR>/<lang>.txt (one word per line) loaded on first use; lang is
+  a 2-3 letter code, anything else or an unknown language falls back to en and
+  the report's lang says which list was used
+"""
+
+from __future__ import annotations
+import os, re, pathlib
+from collections import Counter
+from itertools import compress, repeat
+from operator import add, and_, mul
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"\w+")  # same tokens as \b\w+\b, without the boundary checks
+MIN_TERM_LEN = 3
+TOP_N = 10
+LANG_RE = re.compile(r"[a-z]{2,3}")  # ISO 639-1/-2 codes, also keeps lang a plain file name
+STOPWORDS_DIR = pathlib.Path(os.getenv("STOPWORDS_DIR", pathlib.Path(__file__).resolve().parent.parent / "data" / "stopwords"))
+
+_STOPWORDS: Dict[str, FrozenSet[str]] = {
+    "en": frozenset("the and or for of a an to in on at by with is are was were".split()),
+    "es": frozenset("el la los las de del y o en un una unos unas por para con que es son fue se al lo su sus".split()),
+    "fr": frozenset("le la les de des du et ou en un une par pour avec que est sont au aux ce ces se sur dans".split()),
+    "de": frozenset("der die das den dem des und oder ein eine einer mit von zu im in ist sind war auf für".split()),
+}
+_HEADING_SEP = "\x1f"  # never inside a token or a typed keyword
+
+
+def register_stopwords(lang: str, words: Iterable[str]) -> None:
+    _STOPWORDS[lang.lower()] = frozenset(w.strip().lower() for w in words if w.strip())
+
+
+def stopwords_lang(lang: str = "en") -> str:
+    """Language whose stopword list serves `lang`: its own if built in, registered or bundled, else en."""
+    lang = (lang or "en").lower()
+    if lang in _STOPWORDS:
+        return lang
+    if LANG_RE.fullmatch(lang):
+        path = STOPWORDS_DIR / f"{lang}.txt"
+        if path.is_file():  # only bundled files are cached, unknown codes are not
+            register_stopwords(lang, path.read_text(encoding="utf-8").splitlines())
+            return lang
+    return "en"
+
+
+def get_stopwords(lang: str = "en") -> FrozenSet[str]:
+    return _STOPWORDS[stopwords_lang(lang)]
+
+
+def tokenize(text_lower: str) -> List[str]:
+    return TOKEN_RE.findall(text_lower)
+
+
+class _Index:
+    """Lowered title / meta / headings, computed once per page."""
+
+    def __init__(self, title: Optional[str], meta_description: Optional[str], headings: Dict[str, List[str]]):
+        self.title = (title or "").lower()
+        self.meta = (meta_description or "").lower()
+        self.headings = _HEADING_SEP.join(h.lower() for level in ("h1", "h2", "h3") for h in headings.get(level, []))
+
+    def flags(self, term: str) -> Dict[str, bool]:
+        return {
+            "in_title": bool(self.title and term in self.title),
+            "in_meta_desc": bool(self.meta and term in self.meta),
+            "in_headings": term in self.headings,
+        }
+
+
+def _top_ngrams(tokens: List[str], stopwords: FrozenSet[str], top_n: int) -> Dict[int, List[Tuple[str, int]]]:
+    """Top uni/bi/trigrams whose first and last word are real terms (not stopwords, not too short).
+
+    Tokens are mapped to vocabulary ids and each n-gram to a single int
+    (((a * V) + b) * V + c), so counting and edge filtering run in C through
+    map/compress instead of per-token Python loops. Counter keeps first-seen
+    order, so ties rank by first occurrence, as before.
+    """
+    unigrams = Counter(tokens)
+    vocab = list(unigrams)
+    ids = list(map({t: i for i, t in enumerate(vocab)}.__getitem__, tokens))
+    usable = [len(t) >= MIN_TERM_LEN and t not in stopwords for t in vocab]
+    ok = list(map(usable.__getitem__, ids))
+    size = len(vocab)
+
+    top = {1: [(t, c) for t, c in unigrams.most_common() if len(t) >= MIN_TERM_LEN and t not in stopwords][:top_n]}
+    keys = ids
+    for n in (2, 3):
+        keys = list(map(add, map(mul, keys, repeat(size)), ids[n - 1:]))
+        counts = Counter(compress(keys, map(and_, ok, ok[n - 1:])))
+        rows = []
+        for key, count in counts.most_common(top_n):
+            words = []
+            for _ in range(n):
+                key, i = divmod(key, size)
+                words.append(vocab[i])
+            rows.append((" ".join(reversed(words)), count))
+        top[n] = rows
+    return top
+
+
+def keyword_analysis(tokens: List[str], body_lower: str, title: Optional[str], meta_description: Optional[str],
+                     headings: Dict[str, List[str]], keyword: Optional[str] = None,
+                     lang: str = "en", top_n: int = TOP_N) -> Dict[str, Any]:
+    """Keyword section of the /onpage report. `tokens` must come from tokenize(body_lower)."""
+    index = _Index(title, meta_description, headings)
+    word_count = len(tokens)
+
+    if keyword:
+        kw = keyword.lower()
+        count = body_lower.count(kw)
+        return {
+            "keyword": keyword,
+            **index.flags(kw),
+            "count_in_body": count,
+            "density_percent": round((count / word_count * 100), 2) if word_count else 0
+        }
+
+    lang = stopwords_lang(lang)
+    top = _top_ngrams(tokens, _STOPWORDS[lang], top_n)
+
+    def _rows(pairs):
+        return [{"term": term, "count": count, **index.flags(term)} for term, count in pairs]
+
+    return {
+        "top_terms": _rows(top[1]),
+        "top_bigrams": _rows(top[2]),
+        "top_trigrams": _rows(top[3]),
+        "lang": lang,
+    }
@@ -0,0 +1,221 @@
+# backend/links.py
+"""
+Link health for the on-page audit (/onpage?check_links=true, report jobs)
+- One asyncio loop on a background thread owns one pooled httpx.AsyncClient
+  (as in backend/gamma.py); every page and job in the process shares it
+- HEAD first, GET (headers only, body never read) when the server refuses or
+  mishandles HEAD; redirects are followed and recorded hop by hop
+- LINKS_CONCURRENCY checks at once, at most LINKS_PER_HOST per host
+- Repeated hrefs are checked once (normalized URL); a link being checked for
+  another page is awaited, not fetched again
+- Statuses are kept in the result cache (source "links", CACHE_TTL_LINKS s;
+  timeouts, 429 and 5xx only LINKS_ERROR_TTL s), so the same link is not
+  checked again across pages, jobs and worker processes
+- Per link: status, ok, method, redirect chain, final URL, latency, error; a
+  malformed href (bad port, invalid host) is an error entry for that link only
+"""
+
+from __future__ import annotations
+import os, time, asyncio, threading
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+import httpx
+from backend.cache import results_cache, cache_key
+
+CONCURRENCY = int(os.getenv("LINKS_CONCURRENCY", "32"))
+PER_HOST = int(os.getenv("LINKS_PER_HOST", "4"))
+MAX_PER_PAGE = int(os.getenv("LINKS_MAX_PER_PAGE", "300"))
+ERROR_TTL = int(os.getenv("LINKS_ERROR_TTL", "600"))
+USER_AGENT = os.getenv("LINKS_USER_AGENT", "Mozilla/5.0 (compatible; SEO-Auditor/1.0)")
+MAX_REDIRECTS = 10
+TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+# HEAD answers not to trust: retried with GET
+GET_FALLBACK = frozenset((400, 403, 405, 406, 429, 500, 501, 502, 503))
+
+
+def _link_key(url: str) -> str:
+    try:
+        return cache_key("links", url)
+    except ValueError:  # e.g. a port out of range: not normalizable, keyed as written
+        return url
+
+
+def _failed(error: BaseException) -> Dict[str, Any]:
+    return {"status": None, "ok": False, "method": "HEAD", "final_url": None,
+            "redirects": [], "latency_ms": None, "error": f"{type(error).__name__}: {error}"[:200]}
+
+
+def _transient(result: Dict[str, Any]) -> bool:
+    status = result["status"]
+    return status is None or status == 429 or status >= 500
+
+
+class LinkChecker:
+    def __init__(self, concurrency: int = CONCURRENCY, per_host: int = PER_HOST, cache=results_cache):
+        self.concurrency = max(concurrency, 1)
+        self.per_host = max(per_host, 1)
+        self.cache = cache
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._http: Optional[httpx.AsyncClient] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._hosts: Dict[str, List] = {}  # host -> [semaphore, checks using it]
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"checked": 0, "cache_hits": 0, "shared": 0, "head": 0, "get": 0}
+
+    # --- loop thread ---
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                threading.Thread(target=run, name="links-loop", daemon=True).start()
+                ready.wait()
+                asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+                self._loop = loop
+            return self._loop
+
+    async def _setup(self) -> None:
+        self._http = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT}, timeout=TIMEOUT, follow_redirects=True, max_redirects=MAX_REDIRECTS,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+        )
+        self._slots = asyncio.Semaphore(self.concurrency)
+
+    def close(self) -> None:
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self._http.aclose(), loop).result(5)
+            loop.call_soon_threadsafe(loop.stop)
+
+    # --- public, thread-safe ---
+
+    def check(self, urls: Iterable[str], limit: int = MAX_PER_PAGE) -> Dict[str, Any]:
+        """Check the http(s) links among `urls` (absolute) and summarize them. Blocking."""
+        return asyncio.run_coroutine_threadsafe(self._check_all(list(urls), limit), self._ensure_loop()).result()
+
+    async def check_async(self, urls: Iterable[str], limit: int = MAX_PER_PAGE) -> Dict[str, Any]:
+        """check() for callers on another event loop (the API)."""
+        future = asyncio.run_coroutine_threadsafe(self._check_all(list(urls), limit), self._ensure_loop())
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "in_flight": len(self._inflight)}
+
+    # --- coroutines ---
+
+    async def _check_all(self, urls: List[str], limit: int) -> Dict[str, Any]:
+        # one entry per normalized URL, in page order, with how often the page links it
+        links: Dict[str, Dict[str, Any]] = {}
+        for url in urls:
+            url = url.split("#", 1)[0]
+            if not url.startswith(("http://", "https://")):
+                continue
+            key = _link_key(url)
+            if key in links:
+                links[key]["occurrences"] += 1
+            else:
+                links[key] = {"url": url, "occurrences": 1}
+        keys = list(links)
+        truncated = len(keys) > limit
+        keys = keys[:limit]
+
+        loop = asyncio.get_running_loop()
+        cached = await loop.run_in_executor(None, self.cache.get_many, "links", keys) if keys else {}
+        self._stats["cache_hits"] += len(cached)
+        fresh_keys = [k for k in keys if k not in cached]
+        fresh = await asyncio.gather(*(self._shared(k, links[k]["url"]) for k in fresh_keys), return_exceptions=True)
+        fresh = [_failed(r) if isinstance(r, Exception) else r for r in fresh]  # one bad link, not the page
+        if fresh_keys:  # one transaction for the page's new statuses
+            await loop.run_in_executor(None, self.cache.put_many, "links", dict(zip(fresh_keys, fresh)),
+                                       {k: ERROR_TTL for k, r in zip(fresh_keys, fresh) if _transient(r)})
+        results = {**{k: dict(v, cached=True) for k, v in cached.items()},
+                   **{k: dict(v, cached=False) for k, v in zip(fresh_keys, fresh)}}
+
+        checked = []
+        for key in keys:
+            result = results[key]
+            checked.append({**result, "url": links[key]["url"], "occurrences": links[key]["occurrences"]})
+        return {
+            "checked": len(checked),
+            "broken": sum(1 for r in checked if r["status"] is not None and r["status"] >= 400),
+            "unreachable": sum(1 for r in checked if r["status"] is None),
+            "redirected": sum(1 for r in checked if r["redirects"]),
+            "from_cache": sum(1 for r in checked if r["cached"]),
+            "truncated": truncated,
+            "links": checked,
+        }
+
+    async def _shared(self, key: str, url: str) -> Dict[str, Any]:
+        """Check `url` unless another caller is already checking it; then wait for that."""
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self._stats["shared"] += 1
+            return await asyncio.shield(pending)
+        pending = self._inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await self._check_one(url)
+            pending.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            pending.exception()  # retrieved here, so a failure nobody waits on doesn't warn
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _get(self, url: str) -> httpx.Response:
+        async with self._http.stream("GET", url) as r:  # status and headers only
+            return r
+
+    async def _check_one(self, url: str) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"status": None, "ok": False, "method": "HEAD", "final_url": None,
+                                  "redirects": [], "latency_ms": None, "error": None}
+        host = urlsplit(url).netloc.lower()
+        entry = self._hosts.setdefault(host, [asyncio.Semaphore(self.per_host), 0])
+        entry[1] += 1
+        try:
+            async with entry[0], self._slots:  # host first: a busy host queues without holding global slots
+                t0 = time.perf_counter()
+                self._stats["checked"] += 1
+                await self._request(url, result)
+                result["latency_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._hosts[host]  # idle hosts are forgotten
+        return result
+
+    async def _request(self, url: str, result: Dict[str, Any]) -> None:
+        try:
+            try:
+                self._stats["head"] += 1
+                r = await self._http.head(url)
+                retry = r.status_code in GET_FALLBACK
+            except (httpx.TimeoutException, httpx.TooManyRedirects):
+                raise  # GET would hit the same wall
+            except httpx.HTTPError:
+                retry = True  # e.g. a server that drops HEAD connections
+            if retry:
+                result["method"] = "GET"
+                self._stats["get"] += 1
+                r = await self._get(url)
+            result.update(status=r.status_code, ok=r.status_code < 400, final_url=str(r.url),
+                          redirects=[{"url": str(h.url), "status": h.status_code} for h in r.history])
+        except (httpx.HTTPError, httpx.InvalidURL, ValueError) as e:  # InvalidURL is no HTTPError
+            result["error"] = f"{type(e).__name__}: {e}"[:200]
+
+
+# Shared by /onpage and the report workflow.
+checker = LinkChecker()
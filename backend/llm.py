@@ -0,0 +1,132 @@
+# backend/llm.py
+"""
+Ollama client for report text generation
+- Uses the Ollama HTTP API (OLLAMA_HOST, default http://127.0.0.1:11434) over one
+  pooled, kept-alive session instead of spawning `ollama run` per report
+- Streams tokens and closes the stream as soon as a stop marker (default
+  "### SLIDES END") starts a line; Ollama aborts the rest of the generation
+- keep_alive (OLLAMA_KEEP_ALIVE) keeps the model loaded between reports;
+  warm() loads it ahead of the first job
+- Timeouts: connect, between tokens (OLLAMA_READ_TIMEOUT, covers prompt
+  processing before the first token) and total (OLLAMA_TIMEOUT)
+- At most OLLAMA_MAX_CONCURRENCY generations at once per process; callers
+  wait for a slot within the total timeout
+"""
+
+from __future__ import annotations
+import os, json, time, threading
+from typing import Any, Callable, Dict, Optional, Sequence
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+load_dotenv()
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434").rstrip("/")
+if not OLLAMA_HOST.startswith(("http://", "https://")):
+    OLLAMA_HOST = "http://" + OLLAMA_HOST  # OLLAMA_HOST is often set as host:port for the CLI
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "300"))
+TOTAL_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "900"))
+MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "1"))
+WARMUP = os.getenv("OLLAMA_WARMUP", "1") != "0"  # workers load the model on start
+
+SLIDES_END = "### SLIDES END"
+
+
+class LLMError(RuntimeError):
+    pass
+
+
+def _line_start_find(text: str, marker: str, start: int) -> int:
+    at = text.find(marker, start)
+    while at > 0 and text[at - 1] != "\n":
+        at = text.find(marker, at + 1)
+    return at
+
+
+class OllamaClient:
+    def __init__(self, host: str = OLLAMA_HOST, model: str = OLLAMA_MODEL, keep_alive: str = KEEP_ALIVE,
+                 read_timeout: float = READ_TIMEOUT, total_timeout: float = TOTAL_TIMEOUT,
+                 max_concurrency: int = MAX_CONCURRENCY):
+        self.host = host
+        self.model = model
+        self.keep_alive = keep_alive
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self._slots = threading.BoundedSemaphore(max(max_concurrency, 1))
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=max(max_concurrency, 1) + 1))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max(max_concurrency, 1) + 1))
+
+    def warm(self) -> bool:
+        """Load the model into memory (a generate call without a prompt)."""
+        try:
+            r = self.session.post(f"{self.host}/api/generate",
+                                  json={"model": self.model, "keep_alive": self.keep_alive},
+                                  timeout=(CONNECT_TIMEOUT, self.read_timeout))
+            return r.ok
+        except requests.RequestException:
+            return False
+
+    def generate(self, prompt: str, stop: Sequence[str] = (SLIDES_END,),
+                 on_token: Optional[Callable[[str], None]] = None,
+                 options: Optional[Dict[str, Any]] = None) -> str:
+        """Stream a completion; returns the text up to and including the first stop marker.
+
+        Markers only count at the start of a line, so a model echoing the prompt's
+        rules ("include the `### SLIDES END` marker") doesn't end the stream early.
+        """
+        deadline = time.monotonic() + self.total_timeout
+        if not self._slots.acquire(timeout=self.total_timeout):
+            raise LLMError(f"no free LLM slot within {self.total_timeout:.0f}s")
+        try:
+            payload = {"model": self.model, "prompt": prompt, "stream": True, "keep_alive": self.keep_alive}
+            if options:
+                payload["options"] = options
+            try:
+                with self.session.post(f"{self.host}/api/generate", json=payload, stream=True,
+                                       timeout=(CONNECT_TIMEOUT, self.read_timeout)) as r:
+                    if r.status_code != 200:
+                        raise LLMError(f"Ollama HTTP {r.status_code}: {r.text[:200]}")
+                    return self._read_stream(r, stop, on_token, deadline)
+            except requests.RequestException as e:
+                raise LLMError(f"Ollama request failed: {e}") from e
+        finally:
+            self._slots.release()
+
+    def _read_stream(self, r: requests.Response, stop: Sequence[str], on_token, deadline: float) -> str:
+        text = ""
+        longest = max((len(m) for m in stop), default=0) + 1
+        for line in r.iter_lines():
+            if not line:
+                continue
+            try:
+                chunk = json.loads(line)
+            except ValueError:
+                chunk = None
+            if not isinstance(chunk, dict):  # truncated or garbage line
+                raise LLMError(f"Ollama sent a malformed stream line: {line[:80]!r}")
+            if chunk.get("error"):
+                raise LLMError(f"Ollama: {chunk['error']}")
+            piece = chunk.get("response", "")
+            if piece:
+                scan_from = max(len(text) - longest, 0)  # a marker can straddle two tokens
+                text += piece
+                if on_token:
+                    on_token(piece)
+                for marker in stop:
+                    at = _line_start_find(text, marker, scan_from)
+                    if at != -1:
+                        # leaving the `with` closes the connection, which cancels the generation
+                        return text[:at + len(marker)]
+            if chunk.get("done"):
+                return text
+            if time.monotonic() > deadline:
+                raise LLMError(f"generation exceeded {self.total_timeout:.0f}s")
+        return text
+
+
+# Shared by the workflow, the worker and scripts.
+client = OllamaClient()
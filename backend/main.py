@@ -1,17 +1,52 @@
-import uuid
-from fastapi import FastAPI, BackgroundTasks
-from pydantic import BaseModel
+from typing import List, Literal, Optional
+from contextlib import asynccontextmanager
+import re, json
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, Field
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 
 # --- Import endpoint logic from your other backend files ---
 from backend.onpage import router as onpage_router
 from backend.crawlability_checker import crawlability_audit
 from backend.analyzer import analyze
-from backend.workflow import run_full_workflow
+from backend.psi_client import client as psi_client
+from backend.gamma import client as gamma_client
+from backend.links import checker as link_checker
+from backend.http_cache import http_cache
+from backend.jobs import store as job_store
+from backend.job_events import job_events
+from backend.worker import Worker, EMBEDDED as EMBEDDED_WORKER
+from backend.browser_pool import pool as browser_pool
+from backend.cache import results_cache
+from backend.workflow import DECK_DIR
+from backend.bulk import runner as bulk_runner, check_batch_id
+from backend.site_crawler import site_crawls, MAX_PAGES as CRAWL_MAX_PAGES, MAX_DEPTH as CRAWL_MAX_DEPTH
+
+# --- App lifespan ---
+# One shared headless browser serves every /onpage render instead of
+# launching Chromium per request. Unless JOB_EMBEDDED_WORKER=0, the API also
+# runs report jobs itself; `python -m backend.worker` adds more workers.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(browser_pool.start)
+    worker = Worker() if EMBEDDED_WORKER else None
+    if worker:
+        worker.start()
+    try:
+        yield
+    finally:
+        await job_events.stop()
+        await site_crawls.stop()
+        if worker:
+            await run_in_threadpool(worker.stop)
+        await run_in_threadpool(gamma_client.close)
+        await run_in_threadpool(browser_pool.stop)
 
 # Initialize the FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # --- Add CORS Middleware ---
 # This is crucial for allowing your React frontend (on localhost:3000)
@@ -29,10 +64,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# --- In-memory storage for job statuses ---
-# In a real production app, you would use a database like Redis.
-job_statuses = {}
-
 # --- Define API Endpoints ---
 
 # Include the router from onpage.py to create the /onpage endpoint
@@ -45,34 +76,157 @@ def root():
 
 # The crawlability endpoint that the workflow will call
 @app.get("/crawl")
-def crawl(url: str):
-    return crawlability_audit(url)
+def crawl(url: str, refresh: bool = False):
+    return results_cache.cached("crawl", url, None, lambda: crawlability_audit(url), refresh=refresh)
 
 # The performance endpoint that the workflow will call
 @app.get("/performance")
-def performance(url: str, refresh: bool = False):
-    return analyze(url, refresh)
+def performance(url: str, refresh: bool = False, priority: Literal["interactive", "batch"] = "interactive"):
+    # Partial PSI results (one strategy failed) are returned but not cached.
+    return results_cache.cached("performance", url, None, lambda: analyze(url, refresh, priority=priority), refresh=refresh,
+                                cacheable=lambda r: not r.get("errors"))
+
+# Result cache hit/miss counters and size
+@app.get("/cache/stats")
+def cache_stats():
+    return results_cache.stats()
+
+# PSI client rate limiter state (tokens, daily quota used, queue depth)
+@app.get("/psi/stats")
+def psi_stats():
+    return psi_client.stats()
+
+# Gamma poller counters (generations started, status polls, in flight)
+@app.get("/gamma/stats")
+def gamma_stats():
+    return gamma_client.stats()
+
+# Link checker counters (checks, cache hits, HEAD vs GET)
+@app.get("/links/stats")
+def links_stats():
+    return link_checker.stats()
+
+
+# Conditional GET counters (304s, bytes and time saved on robots.txt, sitemaps, HTML)
+@app.get("/http-cache/stats")
+def http_cache_stats():
+    return http_cache.stats()
+
+# Browser pool counters (launches, pages served, recycles)
+@app.get("/browser-pool")
+def browser_pool_stats():
+    return browser_pool.stats()
 
 # Pydantic model for the frontend's request body
 class ReportRequest(BaseModel):
     url: str
+    regenerate: bool = False  # skip the LLM output cache
 
 # The main endpoint that the frontend will call to start the process
 @app.post("/generate-report")
-def generate_report_endpoint(request: ReportRequest, background_tasks: BackgroundTasks):
-    """Accepts a URL, starts the workflow, and returns a job ID."""
-    job_id = str(uuid.uuid4())
-    job_statuses[job_id] = {"status": "pending", "result": None}
-    
-    background_tasks.add_task(run_full_workflow, job_id, request.url, job_statuses)
-    
-    return {"message": "Report generation started", "job_id": job_id}
-
-# The status-checking endpoint that the frontend will poll
+def generate_report_endpoint(request: ReportRequest):
+    """Accepts a URL, queues the workflow, and returns a job ID.
+
+    A URL that already has an unfinished job gets that job's ID back (deduped=True).
+    """
+    job_id, deduped = job_store.submit(request.url, {"regenerate": request.regenerate})
+    return {"message": "Report generation started", "job_id": job_id, "deduped": deduped}
+
+# The status-checking endpoint (long-poll fallback for /report-events)
 @app.get("/report-status/{job_id}")
-def get_report_status(job_id: str):
+async def get_report_status(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to wait for a change before answering"),
+    since: int = Query(0, description="Last seen job version; return as soon as the job is newer"),
+):
     """Returns the status of a specific job."""
-    return job_statuses.get(job_id, {"status": "not_found", "result": None})
+    if wait:
+        job = await job_events.wait(job_id, since, wait)
+    else:
+        job = await run_in_threadpool(job_store.get, job_id)
+    return job or {"status": "not_found", "result": None}
+
+# Server-sent events: one `status` event per job change, until it finishes
+@app.get("/report-events/{job_id}")
+async def report_events(job_id: str, request: Request):
+    last = request.headers.get("last-event-id", "")
+    return StreamingResponse(
+        job_events.stream(job_id, int(last) if last.isdigit() else 0),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Decks written by the local renderer (PRESENTATION_RENDERER=local)
+_DECK_NAME = re.compile(r"^[a-z0-9-]+\.pptx$")
+
+@app.get("/decks/{name}")
+def get_deck(name: str):
+    path = DECK_DIR / name
+    if not _DECK_NAME.match(name) or not path.is_file():
+        raise HTTPException(status_code=404, detail="Deck not found")
+    return FileResponse(path, filename=name,
+                        media_type="application/vnd.openxmlformats-officedocument.presentationml.presentation")
+
+# Site-wide crawl: the on-page audit for every page, results streamed to NDJSON
+class CrawlSiteRequest(BaseModel):
+    url: str
+    max_pages: int = Field(CRAWL_MAX_PAGES, ge=1, le=200000)
+    max_depth: int = Field(CRAWL_MAX_DEPTH, ge=0, le=50)
+    keyword: Optional[str] = None
+    lang: str = Field("en", pattern=r"^[A-Za-z]{2,3}$")
+
+_CRAWL_ID = re.compile(r"^[0-9a-f]{12}$")
+
+@app.post("/crawl-site")
+async def crawl_site(request: CrawlSiteRequest):
+    """Starts a crawl in the background; poll /crawl-site/{id}, read pages from /crawl-site/{id}/pages."""
+    crawl_id = site_crawls.start(request.url, max_pages=request.max_pages, max_depth=request.max_depth,
+                                 keyword=request.keyword, lang=request.lang)
+    return {"crawl_id": crawl_id, "status": f"/crawl-site/{crawl_id}", "pages": f"/crawl-site/{crawl_id}/pages"}
+
+@app.get("/crawl-site/{crawl_id}")
+def crawl_site_status(crawl_id: str):
+    summary = site_crawls.status(crawl_id) if _CRAWL_ID.match(crawl_id) else None
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Crawl not found")
+    return summary
+
+# One JSON object per crawled page, in completion order (grows while the crawl runs)
+@app.get("/crawl-site/{crawl_id}/pages")
+def crawl_site_pages(crawl_id: str):
+    path = site_crawls.results_path(crawl_id)
+    if not _CRAWL_ID.match(crawl_id) or not path.is_file():
+        raise HTTPException(status_code=404, detail="Crawl not found")
+    return FileResponse(path, media_type="application/x-ndjson")
+
+# Bulk audits: results stream back as NDJSON while they complete
+class BulkAuditRequest(BaseModel):
+    urls: List[str] = Field(..., min_length=1)
+    batch_id: Optional[str] = None  # default: hash of the URL list, so resubmitting resumes
+    resume: bool = True              # False: drop the checkpoint and audit every URL again
+
+@app.post("/bulk-audit")
+def bulk_audit(request: BulkAuditRequest):
+    """Audits every URL (per-domain round-robin, PSI at batch priority) and streams one line per result."""
+    try:
+        check_batch_id(request.batch_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    records = bulk_runner.run(request.urls, batch_id=request.batch_id, resume=request.resume)
+    return StreamingResponse((json.dumps(r, ensure_ascii=False) + "\n" for r in records),
+                             media_type="application/x-ndjson")
+
+# A batch's checkpoint: every result finished so far
+@app.get("/bulk-audit/{batch_id}")
+def bulk_audit_results(batch_id: str):
+    try:
+        check_batch_id(batch_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    path = bulk_runner.checkpoint_path(batch_id)
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return FileResponse(path, media_type="application/x-ndjson")
 
 # --- Run the Server ---
 if __name__ == "__main__":
@@ -1,135 +1,295 @@
-from fastapi import APIRouter, Query
-from bs4 import BeautifulSoup
+import asyncio
+from typing import List, Literal, Optional, Tuple
+import requests
+from requests.utils import get_encoding_from_headers
+from fastapi import APIRouter, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from urllib.parse import urlparse, urljoin
-import re
-from playwright.sync_api import sync_playwright
+from backend.browser_pool import pool
+from backend.extractor import extract
+from backend.cache import results_cache, cache_key
+from backend.http_cache import http_cache
+from backend.keywords import keyword_analysis, tokenize
+from backend.links import checker as link_checker
 
 router = APIRouter()
 
-def fetch_html_with_playwright(url: str) -> str:
-    """Fetch rendered HTML using Playwright (executes JavaScript)."""
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-        page.goto(url, timeout=60000)
-        content = page.content()
-        browser.close()
-    return content
+# --- Static fast path ---
+# mode=static   -> plain HTTP fetch only
+# mode=rendered -> always render with Chromium (previous behaviour)
+# mode=auto     -> plain HTTP fetch, escalate to Chromium when the HTML looks JS-dependent
+FetchMode = Literal["static", "rendered", "auto"]
+WaitUntil = Literal["domcontentloaded", "load", "networkidle"]
+STATIC_HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; SEO-Hackathon-Auditor/1.0)"}
+NOSCRIPT_JS_HINTS = ("enable javascript", "javascript is required", "requires javascript",
+                     "javascript to run", "turn on javascript", "javascript is disabled")
+MIN_STATIC_TEXT_CHARS = 200
+_static_session = requests.Session()
+_static_session.headers.update(STATIC_HEADERS)
 
-@router.get("/onpage")
-def onpage_analysis(url: str, keyword: str = Query(None, description="Optional keyword for SEO analysis")):
+
+def fetch_html_static(url: str) -> str:
+    """Fetch raw server HTML without executing JavaScript."""
+    with http_cache.get(_static_session, url, timeout=15) as r:  # 304 -> stored HTML
+        if r.status >= 400:
+            raise requests.HTTPError(f"{r.status} Error for url: {url}")
+        ctype = r.content_type
+        if ctype and "html" not in ctype.lower():
+            raise ValueError(f"Not an HTML document ({ctype})")
+        body = r.body.read()
+    # no charset: utf-8, where requests would assume ISO-8859-1 for text/html
+    encoding = get_encoding_from_headers({"content-type": ctype}) if "charset" in ctype.lower() else "utf-8"
     try:
-        # --- Fetch fully rendered HTML ---
-        html = fetch_html_with_playwright(url)
-        soup = BeautifulSoup(html, "html.parser")
-
-        # Title
-        title = soup.title.string.strip() if soup.title else None
-        title_status = None
-        if title:
-            if len(title) < 30:
-                title_status = "Too short"
-            elif len(title) > 60:
-                title_status = "Too long"
-            else:
-                title_status = "Good length"
-
-        # Meta description
-        meta_desc_tag = soup.find("meta", attrs={"name": lambda v: v and v.lower() == "description"})
-        meta_description = meta_desc_tag["content"].strip() if meta_desc_tag and meta_desc_tag.get("content") else None
-
-        # Headings (deduplicate for cleanliness)
-        headings = {
-            "h1": list(dict.fromkeys([h.get_text(strip=True) for h in soup.find_all("h1")])),
-            "h2": list(dict.fromkeys([h.get_text(strip=True) for h in soup.find_all("h2")])),
-            "h3": list(dict.fromkeys([h.get_text(strip=True) for h in soup.find_all("h3")]))
-        }
+        return body.decode(encoding, errors="replace")
+    except LookupError:  # unknown charset name
+        return body.decode("utf-8", errors="replace")
 
-        # Canonical
-        canonical_tag = soup.find("link", attrs={"rel": "canonical"})
-        canonical = canonical_tag["href"] if canonical_tag and canonical_tag.get("href") else None
-
-        # Robots meta
-        robots_meta_tag = soup.find("meta", attrs={"name": lambda v: v and v.lower() == "robots"})
-        robots_meta = robots_meta_tag["content"] if robots_meta_tag and robots_meta_tag.get("content") else "index, follow"
-
-        # Image audit (works now with JS-rendered HTML)
-        all_imgs = soup.find_all("img")
-        missing_alt = [img.get("src") for img in all_imgs if not img.get("alt") and img.get("src")]
-        alt_stats = {
-            "total_images": len(all_imgs),
-            "missing_alt_count": len(missing_alt),
-            "missing_alt_percent": round((len(missing_alt) / len(all_imgs) * 100), 2) if all_imgs else 0
-        }
 
-        # Word count
-        for tag in soup(["script", "style", "noscript"]):
-            tag.extract()
-        body_text = soup.get_text(" ", strip=True)
-        words = re.findall(r"\b\w+\b", body_text.lower())
-        word_count = len(words)
-
-        # Internal vs external links
-        domain = urlparse(url).netloc
-        internal_links, external_links = [], []
-        for link in soup.find_all("a", href=True):
-            href = urljoin(url, link["href"].strip())
-            if domain in urlparse(href).netloc:
-                internal_links.append(href)
-            else:
-                external_links.append(href)
-
-        # Keyword analysis
-        keyword_analysis = {}
-        if keyword:
-            # Detailed analysis for provided keyword
-            kw = keyword.lower()
-            keyword_analysis = {
-                "keyword": keyword,
-                "in_title": bool(title and kw in title.lower()),
-                "in_meta_desc": bool(meta_description and kw in meta_description.lower()),
-                "in_headings": any(kw in h.lower() for h in headings["h1"] + headings["h2"] + headings["h3"]),
-                "count_in_body": body_text.lower().count(kw),
-                "density_percent": round((body_text.lower().count(kw) / word_count * 100), 2) if word_count else 0
-            }
+def js_render_reason(signals: dict) -> Optional[str]:
+    """Return why a page needs a JS render (from extract() signals), or None if the static HTML is usable."""
+    if not signals["title"]:
+        return "no title"
+    for root_id, has_content in signals["spa_roots"].items():
+        if not has_content:
+            return f"empty SPA root #{root_id}"
+    noscript = signals["noscript_text"].lower()
+    if noscript and any(hint in noscript for hint in NOSCRIPT_JS_HINTS):
+        return "noscript JavaScript warning"
+    if signals["body_chars"] < MIN_STATIC_TEXT_CHARS:
+        return "empty body text"
+    return None
+
+
+def _try_static(url: str, mode: str) -> Tuple[Optional[dict], Optional[str]]:
+    """Returns (signals, None) when the static HTML can be analyzed, else (None, reason to render)."""
+    if mode == "rendered":
+        return None, "mode=rendered"
+    try:
+        html = fetch_html_static(url)
+    except Exception as e:
+        if mode == "static":
+            raise
+        return None, f"static fetch failed: {e}"
+    signals = extract(html)
+    reason = None if mode == "static" else js_render_reason(signals)
+    return (None, reason) if reason else (signals, None)
+
+
+def _take_links(result: dict) -> List[str]:
+    """Remove the link lists build_report(include_links=True) added; returns internal + external."""
+    links = result["onpage"].pop("links")
+    return links["internal"] + links["external"]
+
+
+def _with_render_path(result: dict, path: str, reason: Optional[str], debug: Optional[dict] = None) -> dict:
+    result["onpage"]["render_path"] = path
+    result["onpage"]["render_reason"] = reason
+    if debug is not None:
+        result["onpage"]["debug"] = debug
+    return result
+
+def fetch_html_with_playwright(url: str, wait_until: str = "load", block_resources: bool = True,
+                               debug: Optional[dict] = None) -> str:
+    """Fetch rendered HTML using Playwright (executes JavaScript).
+
+    Renders through the shared browser pool, starting it on first use when the
+    app lifespan has not (e.g. when this module is used standalone).
+    """
+    if not pool.running:
+        pool.start()
+    return pool.render(url, timeout_ms=60000, wait_until=wait_until,
+                       block_resources=block_resources, debug=debug)
+
+def _cache_params(keyword, lang, mode, wait_until, block_resources, check_links=False) -> dict:
+    params = {"keyword": keyword, "lang": lang, "mode": mode, "wait_until": wait_until,
+              "block_resources": block_resources}
+    if check_links:  # only when set, so existing entries keep their keys
+        params["check_links"] = True
+    return params
+
+
+def onpage_analysis(url: str, keyword: str = None, mode: str = "auto", wait_until: str = "load",
+                    block_resources: bool = True, debug: bool = False, lang: str = "en",
+                    refresh: bool = False, check_links: bool = False) -> dict:
+    """Blocking variant for in-process callers (scripts, workflow).
+
+    check_links=True adds a link_health block (backend/links.py) for every link on the page.
+    """
+    compute = lambda: _onpage_uncached(url, keyword, mode, wait_until, block_resources, debug, lang, check_links)
+    if debug:  # debug measures a live render, never served from cache
+        return compute()
+    return results_cache.cached("onpage", url,
+                                _cache_params(keyword, lang, mode, wait_until, block_resources, check_links),
+                                compute, refresh=refresh, cacheable=lambda r: "error" not in r)
+
+
+def _onpage_uncached(url, keyword, mode, wait_until, block_resources, debug, lang, check_links=False) -> dict:
+    try:
+        render_debug = {} if debug else None
+        signals, reason = _try_static(url, mode)
+        if signals is not None:
+            result = _with_render_path(build_report(url, signals, keyword, lang, check_links),
+                                       "static", None, render_debug)
         else:
-            # Return top 10 frequent terms if no keyword provided
-            stopwords = {"the","and","or","for","of","a","an","to","in","on","at","by","with","is","are","was","were"}
-            freq = {}
-            for w in words:
-                if w not in stopwords and len(w) > 2:
-                    freq[w] = freq.get(w, 0) + 1
-            common_terms = sorted(freq.items(), key=lambda x: x[1], reverse=True)[:10]
-
-            keyword_analysis = {
-                "top_terms": [
-                    {
-                        "term": term,
-                        "count": count,
-                        "in_title": bool(title and term in title.lower()),
-                        "in_meta_desc": bool(meta_description and term in meta_description.lower()),
-                        "in_headings": any(term in h.lower() for h in headings["h1"] + headings["h2"] + headings["h3"])
-                    }
-                    for term, count in common_terms
-                ]
-            }
-
-        return {
-            "onpage": {
-                "url": url,
-                "title": title,
-                "title_status": title_status,
-                "meta_description": meta_description,
-                "headings": headings,
-                "canonical": canonical,
-                "robots_meta": robots_meta,
-                "alt_audit": alt_stats,
-                "word_count": word_count,
-                "internal_links": len(internal_links),
-                "external_links": len(external_links),
-                "keyword_analysis": keyword_analysis
-            }
-        }
+            html = fetch_html_with_playwright(url, wait_until, block_resources, render_debug)
+            result = _with_render_path(analyze_html(url, html, keyword, lang, check_links),
+                                       "rendered", reason, render_debug)
+        if check_links:
+            result["onpage"]["link_health"] = link_checker.check(_take_links(result))
+        return result
+    except Exception as e:
+        return {"error": str(e)}
+
 
+async def _until_disconnect(request: Request, coro, poll_interval: float = 0.5):
+    """Await `coro`, cancelling it if the client goes away first."""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise asyncio.CancelledError("client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+@router.get("/onpage")
+async def onpage_analysis_async(
+    request: Request,
+    url: str,
+    keyword: str = Query(None, description="Optional keyword for SEO analysis"),
+    lang: str = Query("en", pattern=r"^[A-Za-z]{2,3}$",
+                      description="Stopword language (2-3 letter code) for the top-terms analysis; unknown ones use en"),
+    mode: FetchMode = Query("auto", description="static | rendered | auto (static first, render if the page needs JS)"),
+    wait_until: WaitUntil = Query("load", description="domcontentloaded | load | networkidle (capped)"),
+    block_resources: bool = Query(True, description="Abort image/font/media/tracker requests while rendering"),
+    debug: bool = Query(False, description="Add a debug block with blocked requests and bytes/time saved"),
+    refresh: bool = Query(False, description="Bypass the result cache"),
+    check_links: bool = Query(False, description="Check every link on the page: status, redirects, latency"),
+):
+    """Non-blocking /onpage: many renders share one worker, bounded by the browser pool."""
+    key = cache_key("onpage", url, _cache_params(keyword, lang, mode, wait_until, block_resources, check_links))
+    if not (refresh or debug):
+        hit = await run_in_threadpool(results_cache.get, "onpage", key)
+        if hit is not None:
+            return hit
+    result = await _onpage_async_uncached(request, url, keyword, lang, mode, wait_until, block_resources, debug,
+                                          check_links)
+    if not debug and "error" not in result:
+        await run_in_threadpool(results_cache.put, "onpage", key, result)
+    return result
+
+
+async def _onpage_async_uncached(request, url, keyword, lang, mode, wait_until, block_resources, debug,
+                                 check_links=False) -> dict:
+    try:
+        render_debug = {} if debug else None
+        signals, reason = await _until_disconnect(request, run_in_threadpool(_try_static, url, mode))
+        if signals is not None:
+            result = _with_render_path(build_report(url, signals, keyword, lang, check_links),
+                                       "static", None, render_debug)
+        else:
+            if not pool.running:
+                await run_in_threadpool(pool.start)
+            html = await _until_disconnect(request, pool.render_async(
+                url, timeout_ms=60000, wait_until=wait_until, block_resources=block_resources, debug=render_debug))
+            # Parsing is CPU-bound; keep it off the event loop.
+            result = await run_in_threadpool(analyze_html, url, html, keyword, lang, check_links)
+            result = _with_render_path(result, "rendered", reason, render_debug)
+        if check_links:
+            result["onpage"]["link_health"] = await _until_disconnect(
+                request, link_checker.check_async(_take_links(result)))
+        return result
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
         return {"error": str(e)}
+
+
+def analyze_html(url: str, html: str, keyword: str = None, lang: str = "en", include_links: bool = False) -> dict:
+    """Run the on-page audit over already-fetched HTML."""
+    return build_report(url, extract(html), keyword, lang, include_links)
+
+
+def split_links(url: str, hrefs) -> Tuple[List[str], List[str]]:
+    """Resolve hrefs against `url` and split them into (internal, external) absolute URLs."""
+    domain = urlparse(url).netloc
+    internal_links, external_links = [], []
+    for raw_href in hrefs:
+        try:
+            href = urljoin(url, raw_href)
+            internal = domain in urlparse(href).netloc
+        except ValueError:  # e.g. "http://[::1": kept as written, the link check reports it
+            href, internal = raw_href, False
+        if internal:
+            internal_links.append(href)
+        else:
+            external_links.append(href)
+    return internal_links, external_links
+
+
+def build_report(url: str, signals: dict, keyword: str = None, lang: str = "en",
+                 include_links: bool = False) -> dict:
+    """Turn extract() signals into the /onpage result.
+
+    include_links=True also returns the resolved link lists ("links": {"internal", "external"}).
+    """
+    # Title
+    title = signals["title"]
+    title_status = None
+    if title:
+        if len(title) < 30:
+            title_status = "Too short"
+        elif len(title) > 60:
+            title_status = "Too long"
+        else:
+            title_status = "Good length"
+
+    meta_description = signals["meta_description"]
+    headings = signals["headings"]
+    canonical = signals["canonical"]
+    robots_meta = signals["robots_meta"] or "index, follow"
+
+    # Image audit (works now with JS-rendered HTML)
+    total_images = signals["images"]
+    missing_alt = signals["missing_alt"]
+    alt_stats = {
+        "total_images": total_images,
+        "missing_alt_count": len(missing_alt),
+        "missing_alt_percent": round((len(missing_alt) / total_images * 100), 2) if total_images else 0
+    }
+
+    # Word count
+    body_lower = signals["text"].lower()
+    words = tokenize(body_lower)
+    word_count = len(words)
+
+    # Internal vs external links
+    internal_links, external_links = split_links(url, signals["links"])
+
+    # Keyword analysis
+    keyword_data = keyword_analysis(words, body_lower, title, meta_description, headings, keyword, lang)
+
+    report = {
+        "onpage": {
+            "url": url,
+            "title": title,
+            "title_status": title_status,
+            "meta_description": meta_description,
+            "headings": headings,
+            "canonical": canonical,
+            "robots_meta": robots_meta,
+            "alt_audit": alt_stats,
+            "word_count": word_count,
+            "internal_links": len(internal_links),
+            "external_links": len(external_links),
+            "keyword_analysis": keyword_data
+        }
+    }
+    if include_links:
+        report["onpage"]["links"] = {"internal": internal_links, "external": external_links}
+    return report
@@ -0,0 +1,210 @@
+# backend/psi_client.py
+"""
+Process-wide PageSpeed Insights client
+- One pooled HTTP session for every PSI call in the process
+- Token bucket: PSI_RATE_PER_SEC (burst PSI_BURST) plus a PSI_RATE_PER_DAY quota,
+  kept in the job store (backend/jobs.py, SQLite or Redis) so the API and every
+  worker process share one budget for the key; PSI_SHARED_LIMIT=0 keeps it per
+  process (then each process may spend the full rate and quota)
+- Priority admission: waiting interactive calls always go before waiting batch calls
+  of the same process (across processes, the shared bucket is first come first served)
+- Honors Retry-After on throttling responses, else exponential backoff (max 16 s);
+  the pause applies to every caller (every process when shared), not just the
+  one that was throttled
+- PSI_BASE_URL points the client at a local stub server for testing
+"""
+
+from __future__ import annotations
+import os, math, time, heapq, datetime, itertools, threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+load_dotenv()
+from backend.jobs import store as job_store
+
+PSI_BASE = os.getenv("PSI_BASE_URL", "https://www.googleapis.com/pagespeedonline/v5/runPagespeed")
+RATE_PER_SEC = float(os.getenv("PSI_RATE_PER_SEC", "1.0"))
+BURST = int(os.getenv("PSI_BURST", "4"))
+RATE_PER_DAY = int(os.getenv("PSI_RATE_PER_DAY", "25000"))
+SHARED_LIMIT = os.getenv("PSI_SHARED_LIMIT", "1") != "0"
+LIMIT_NAME = "psi"
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+PRIORITIES = {"interactive": PRIORITY_INTERACTIVE, "batch": PRIORITY_BATCH}
+
+RETRIABLE = (408, 429, 500, 502, 503, 504)
+
+
+class QuotaExceeded(RuntimeError):
+    pass
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+        return max((when - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0.0)
+    except Exception:
+        return None
+
+
+class PSIClient:
+    def __init__(self, base_url: str = PSI_BASE, api_key: Optional[str] = None,
+                 rate_per_sec: float = RATE_PER_SEC, burst: int = BURST, per_day: int = RATE_PER_DAY,
+                 limits=None):
+        """`limits`: a job store to keep the bucket, quota and pause in (shared with
+        every process using it); None keeps them in this process."""
+        self.base_url = base_url
+        self.api_key = api_key if api_key is not None else os.getenv("GOOGLE_API_KEY")
+        self.rate = max(rate_per_sec, 1e-6)
+        self.burst = max(burst, 1)
+        self.per_day = per_day
+        self.limits = limits
+
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+        self.session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+
+        self._cond = threading.Condition()
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._day = datetime.datetime.utcnow().date()
+        self._day_used = 0
+        self._waiters: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._stats = {"requests": 0, "throttled": 0, "retry_after_honored": 0, "quota_rejections": 0}
+
+    # --- admission control ---
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        today = datetime.datetime.utcnow().date()
+        if today != self._day:
+            self._day, self._day_used = today, 0
+
+    def _acquire(self, priority: int) -> None:
+        """Block until this caller is first in the priority queue and a token is available."""
+        with self._cond:
+            me = (priority, next(self._seq))
+            heapq.heappush(self._waiters, me)
+            try:
+                while True:
+                    if self._waiters[0] != me:
+                        self._cond.wait()
+                        continue
+                    wait = self._take()
+                    if wait == 0:
+                        return
+                    if wait == math.inf:
+                        self._stats["quota_rejections"] += 1
+                        raise QuotaExceeded(f"PSI daily quota of {self.per_day} requests used up")
+                    self._cond.wait(wait)
+            finally:
+                # leave the queue whether admitted, rejected or interrupted
+                self._waiters.remove(me)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def _take(self) -> float:
+        """Take a token: 0 if taken, else seconds to wait (inf: daily quota used up)."""
+        if self.limits is not None:
+            return self.limits.take_token(LIMIT_NAME, self.rate, self.burst, self.per_day)
+        now = time.monotonic()
+        self._refill(now)
+        wait = self._paused_until - now
+        if wait > 0:
+            return wait
+        if self._day_used >= self.per_day:
+            return math.inf
+        if self._tokens >= 1:
+            self._tokens -= 1
+            self._day_used += 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def _pause(self, seconds: float) -> None:
+        if self.limits is not None:
+            self.limits.pause_limit(LIMIT_NAME, seconds)
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    # --- API ---
+
+    def run_pagespeed(self, url: str, strategy: str, categories: Sequence[str],
+                      priority: int = PRIORITY_INTERACTIVE, retries: int = 5) -> Dict[str, Any]:
+        if not self.api_key:
+            raise RuntimeError('GOOGLE_API_KEY not set. Run: export GOOGLE_API_KEY="YOUR_KEY"')
+
+        params = {
+            "url": url,
+            "strategy": strategy,
+            "key": self.api_key,
+            "category": list(categories),
+        }
+
+        backoff = 1.0
+        last_err = None
+        for _ in range(retries):
+            self._acquire(priority)
+            with self._cond:
+                self._stats["requests"] += 1
+            r = self.session.get(self.base_url, params=params, timeout=(10, 180))
+            if r.status_code == 200:
+                return r.json()
+
+            try:
+                err = r.json()
+            except Exception:
+                err = {"text": r.text}
+            last_err = f"HTTP {r.status_code}: {err}"
+
+            # retry on throttling / transient errors
+            if r.status_code in RETRIABLE:
+                retry_after = _retry_after_seconds(r.headers.get("Retry-After"))
+                with self._cond:
+                    self._stats["throttled"] += 1
+                    if retry_after is not None:
+                        self._stats["retry_after_honored"] += 1
+                self._pause(retry_after if retry_after is not None else backoff)
+                backoff = min(backoff * 2, 16)
+                continue
+
+            # non-retriable
+            raise RuntimeError(f"PSI {strategy} {last_err}")
+
+        raise RuntimeError(f"PSI {strategy} failed after retries: {last_err}")
+
+    def stats(self) -> Dict[str, Any]:
+        shared = self.limits.limit_state(LIMIT_NAME, self.rate, self.burst) if self.limits is not None else None
+        with self._cond:
+            self._refill(time.monotonic())
+            paused_for = max(self._paused_until - time.monotonic(), 0)
+            if shared:
+                paused_for = max(paused_for, shared["paused_until"] - time.time())
+            return {
+                **self._stats,
+                "tokens": round(shared["tokens"] if shared else self._tokens, 2),
+                "rate_per_sec": self.rate,
+                "burst": self.burst,
+                "day_used": shared["day_used"] if shared else self._day_used,
+                "per_day": self.per_day,
+                "shared": shared is not None,
+                "waiting": len(self._waiters),
+                "paused_for_s": round(paused_for, 2),
+            }
+
+
+# Shared by every analyze() call in the process; its budget by every process on the job store.
+client = PSIClient(limits=job_store if SHARED_LIMIT else None)
@@ -0,0 +1,233 @@
+# backend/robots.py
+"""
+robots.txt engine shared by the crawl audit, sitemaps and crawlers
+- Each host's robots.txt is fetched once and kept for ROBOTS_TTL s (failures
+  for ROBOTS_ERROR_TTL s; at most ROBOTS_MAX_HOSTS hosts); concurrent lookups
+  for the same host share one fetch
+- RFC 9309 semantics: user-agent groups (most specific product token, else *),
+  Allow and Disallow with `*` and `$`, longest match wins, Allow wins ties;
+  4xx = no rules, 5xx / unreachable = everything disallowed
+- Rules are compiled once: plain paths become prefix checks, wildcard paths
+  regexes, ordered so the first hit is the winning rule
+- can_fetch(url, agent) is the check to use everywhere in the backend;
+  report(url, agent) is the robots_txt block of the /crawl audit
+- Fetches go through backend/http_cache.py: once the TTL runs out, an unchanged
+  robots.txt is revalidated with a conditional GET, not downloaded again
+"""
+
+from __future__ import annotations
+import os, re, time, threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, quote, unquote
+import requests
+from requests.adapters import HTTPAdapter
+from backend.http_cache import http_cache
+
+TTL = int(os.getenv("ROBOTS_TTL", "3600"))
+ERROR_TTL = int(os.getenv("ROBOTS_ERROR_TTL", "300"))  # 5xx / unreachable: retry sooner
+MAX_HOSTS = int(os.getenv("ROBOTS_MAX_HOSTS", "1024"))
+MAX_BYTES = 500 * 1024  # RFC 9309: parse at least 500 KiB; the rest is ignored
+USER_AGENT = os.getenv("ROBOTS_USER_AGENT", "Mozilla/5.0 (compatible; SEO-Auditor/1.0)")
+TIMEOUT = (5, 10)
+
+_AGENT_TOKEN = re.compile(r"[a-z_-]+")
+_URL = re.compile(r"([A-Za-z][A-Za-z0-9+.-]*)://([^/?#]*)([^#]*)")  # scheme, netloc, path + query
+_PLAIN_PATH = re.compile(r"[A-Za-z0-9/?&=*$:@!,;+~'()._-]*")  # nothing to (re)encode
+
+
+def _product_token(agent: str) -> str:
+    """'Googlebot/2.1 (+http://...)' -> 'googlebot'."""
+    m = _AGENT_TOKEN.match(agent.strip().lower())
+    return m.group(0) if m else "*"
+
+
+def _normalize_path(path: str) -> str:
+    # compare in one percent-encoding: decode what's safe, re-encode the rest
+    if _PLAIN_PATH.fullmatch(path):
+        return path
+    return quote(unquote(path), safe="/?&=*$%:@!,;+~'()")
+
+
+def _compile(pattern: str):
+    """Matcher for one rule path: str prefix when there's no wildcard, else a regex."""
+    anchored = pattern.endswith("$")
+    body = pattern[:-1] if anchored else pattern
+    if "*" not in body and not anchored:
+        return body
+    regex = ".*".join(re.escape(part) for part in body.split("*"))
+    return re.compile(regex + ("$" if anchored else "")).match
+
+
+class RobotsRules:
+    """Parsed robots.txt: groups of rules per user-agent, plus sitemap lines."""
+
+    def __init__(self, text: str = "", status: Optional[int] = 200, disallow_all: bool = False):
+        self.status = status
+        self.disallow_all = disallow_all
+        self.sitemaps: List[str] = []
+        self._groups: Dict[str, List[Tuple[bool, str]]] = {}
+        self._compiled: Dict[str, list] = {}
+        self._parse(text)
+
+    def _parse(self, text: str) -> None:
+        agents: List[str] = []
+        in_rules = False  # a user-agent line after rules starts a new group
+        for raw in text.splitlines():
+            line = raw.split("#", 1)[0].strip()
+            if ":" not in line:
+                continue
+            field, value = (s.strip() for s in line.split(":", 1))
+            field = field.lower()
+            if field == "user-agent":
+                if in_rules:
+                    agents, in_rules = [], False
+                agents.append(_product_token(value) if value != "*" else "*")
+            elif field in ("allow", "disallow"):
+                in_rules = True
+                for agent in agents:
+                    rules = self._groups.setdefault(agent, [])  # even an empty group overrides *
+                    if value:  # empty Disallow: no restriction
+                        rules.append((field == "allow", _normalize_path(value)))
+            elif field == "sitemap" and value:
+                self.sitemaps.append(value)
+
+    def group(self, agent: str = "*") -> List[Tuple[bool, str]]:
+        """Rules that apply to `agent`: its own group(s), else the * group."""
+        token = _product_token(agent) if agent != "*" else "*"
+        rules = self._groups.get(token)
+        return rules if rules is not None else self._groups.get("*", [])
+
+    def _matchers(self, agent: str) -> list:
+        token = _product_token(agent) if agent != "*" else "*"
+        compiled = self._compiled.get(token)
+        if compiled is None:
+            # longest pattern first, Allow before Disallow on equal length: the first hit wins
+            rules = sorted(self.group(agent), key=lambda r: (-len(r[1]), not r[0]))
+            compiled = [(allow, _compile(path)) for allow, path in rules]
+            self._compiled[token] = compiled
+        return compiled
+
+    def allowed(self, path: str, agent: str = "*") -> bool:
+        """Whether `path` (path + query) may be fetched by `agent`."""
+        if path == "/robots.txt":
+            return True
+        if self.disallow_all:
+            return False
+        path = _normalize_path(path or "/")
+        for allow, match in self._matchers(agent):
+            if (path.startswith(match) if isinstance(match, str) else match(path)):
+                return allow
+        return True
+
+
+class RobotsCache:
+    def __init__(self, ttl: int = TTL, max_hosts: int = MAX_HOSTS):
+        self.ttl = ttl
+        self.max_hosts = max_hosts
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._entries: "OrderedDict[str, Tuple[float, RobotsRules]]" = OrderedDict()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "fetches": 0}
+
+    @staticmethod
+    def origin(url: str) -> str:
+        if "://" not in url:
+            url = "https://" + url
+        p = urlsplit(url)
+        return f"{p.scheme.lower()}://{p.netloc.lower()}"
+
+    def _fresh(self, origin: str) -> Optional[RobotsRules]:
+        entry = self._entries.get(origin)  # lock-free read; hits are the hot path
+        if entry and entry[0] > time.monotonic():
+            self._stats["hits"] += 1
+            return entry[1]
+        return None
+
+    def fetch(self, origin: str) -> RobotsRules:
+        """Download and parse {origin}/robots.txt (no rules caching; an unchanged file is a 304)."""
+        try:
+            with http_cache.get(self.session, f"{origin}/robots.txt", timeout=TIMEOUT) as r:
+                if r.status >= 500:
+                    return RobotsRules("", status=r.status, disallow_all=True)
+                if r.status >= 300:  # 4xx, or a redirect requests gave up on
+                    return RobotsRules("", status=r.status)
+                body = r.body.read(MAX_BYTES)
+            return RobotsRules(body.decode("utf-8", errors="replace"), status=r.status)
+        except (requests.RequestException, OSError):  # OSError: the cache's disk, not the host
+            return RobotsRules("", status=None, disallow_all=True)
+
+    def get(self, url: str) -> RobotsRules:
+        """Rules for the host of `url`, from cache when fresh."""
+        return self._get_origin(self.origin(url))
+
+    def _get_origin(self, origin: str, fetch: bool = True) -> Optional[RobotsRules]:
+        while True:
+            rules = self._fresh(origin)
+            if rules is not None or not fetch:
+                return rules
+            with self._lock:
+                entry = self._entries.get(origin)
+                if entry and entry[0] > time.monotonic():
+                    continue  # fetched while we were taking the lock
+                waiting = self._inflight.get(origin)
+                if waiting is None:
+                    done = self._inflight[origin] = threading.Event()
+                    break
+            waiting.wait(TIMEOUT[0] + TIMEOUT[1])  # another thread is fetching this host
+        try:
+            rules = self.fetch(origin)
+            with self._lock:
+                self._stats["fetches"] += 1
+                ttl = self.ttl if not rules.disallow_all else min(self.ttl, ERROR_TTL)
+                self._entries.pop(origin, None)
+                self._entries[origin] = (time.monotonic() + ttl, rules)  # evicted oldest-fetched first
+                while len(self._entries) > self.max_hosts:
+                    self._entries.popitem(last=False)
+            return rules
+        finally:
+            with self._lock:
+                self._inflight.pop(origin, None)
+            done.set()
+
+    def can_fetch(self, url: str, agent: str = "*", fetch: bool = True) -> bool:
+        """Whether robots.txt lets `agent` fetch `url`.
+
+        With fetch=False only already-cached hosts are checked (others count as
+        allowed), for bulk checks that must not block on unknown hosts.
+        """
+        m = _URL.match(url if "://" in url else "https://" + url)
+        if m is None:
+            return False
+        scheme, netloc, path = m.groups()
+        rules = self._get_origin(f"{scheme.lower()}://{netloc.lower()}", fetch)
+        return rules is None or rules.allowed(path if path.startswith("/") else "/" + path, agent)
+
+    def report(self, url: str, agent: str = "*") -> Dict[str, Any]:
+        """robots.txt summary for the crawl audit; `allows` is whether `url` itself is crawlable."""
+        rules = self.get(url)
+        group = rules.group(agent)
+        return {
+            "allows": self.can_fetch(url, agent),
+            "disallows": [path for allow, path in group if not allow],
+            "allow_rules": [path for allow, path in group if allow],
+            "sitemaps": rules.sitemaps,
+            "status": rules.status,
+            "disallow_all": rules.disallow_all,
+        }
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "hosts": len(self._entries)}
+
+
+# Shared by the crawl audit, sitemaps and crawlers.
+robots = RobotsCache()
+
+
+def can_fetch(url: str, agent: str = "*", fetch: bool = True) -> bool:
+    return robots.can_fetch(url, agent, fetch)
@@ -0,0 +1,338 @@
+# backend/site_crawler.py
+"""
+Site-wide crawl (/crawl-site): the /onpage audit for every page of a site
+- asyncio crawler over one httpx.AsyncClient: breadth-first frontier from the
+  start URL, CRAWL_CONCURRENCY pages in flight
+- Politeness per host: at most CRAWL_PER_HOST requests in flight and
+  CRAWL_HOST_DELAY s between request starts
+- Follows http(s) links on the start host (with or without www.) that
+  robots.txt allows (shared cache in backend/robots.py); pages with a
+  nofollow robots meta are audited but their links are not followed
+- Bounded by CRAWL_MAX_PAGES and CRAWL_MAX_DEPTH (links on the start page are depth 1)
+- Seen URLs are kept as 64-bit hashes of their normalized form (~80 bytes per
+  URL, half a set of the strings), so 100k+ URL sites stay cheap to dedup
+- Every HTML page goes through extract() + build_report() (static HTML, no JS
+  render); one JSON line per page is appended to CRAWL_DIR/<crawl_id>.ndjson as
+  it completes, the crawl summary is kept in <crawl_id>.json
+"""
+
+from __future__ import annotations
+import os, json, time, uuid, asyncio, hashlib, pathlib
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+import httpx
+from backend.cache import normalize_url
+from backend.extractor import extract
+from backend.onpage import build_report, split_links, STATIC_HEADERS
+from backend.robots import robots
+
+CRAWL_DIR = pathlib.Path(os.getenv("CRAWL_DIR", pathlib.Path(__file__).resolve().parent.parent / "data" / "crawls"))
+MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "500"))
+MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", "5"))
+CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "8"))
+PER_HOST = int(os.getenv("CRAWL_PER_HOST", "2"))
+HOST_DELAY = float(os.getenv("CRAWL_HOST_DELAY", "0.25"))
+MAX_PAGE_BYTES = int(os.getenv("CRAWL_MAX_PAGE_BYTES", str(5 * 1024 * 1024)))
+ROBOTS_AGENT = os.getenv("CRAWL_ROBOTS_AGENT", "*")
+TIMEOUT = httpx.Timeout(15.0, connect=5.0)
+
+
+class PageTooLarge(ValueError):
+    pass
+
+
+class SeenUrls:
+    """Set of URLs stored as 64-bit blake2b hashes of normalize_url(url).
+
+    A collision (about 1 in 10^9 at 100k URLs) only means one page is skipped.
+    """
+
+    def __init__(self):
+        self._hashes: Set[int] = set()
+
+    @staticmethod
+    def _hash(url: str) -> int:
+        digest = hashlib.blake2b(normalize_url(url).encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    def add(self, url: str) -> bool:
+        """Record `url`; False if it was already seen."""
+        h = self._hash(url)
+        if h in self._hashes:
+            return False
+        self._hashes.add(h)
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        return self._hash(url) in self._hashes
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+
+class _HostGate:
+    """Per-host politeness: `per_host` requests in flight, `delay` s between starts."""
+
+    def __init__(self, per_host: int, delay: float):
+        self.slots = asyncio.Semaphore(max(per_host, 1))
+        self.delay = delay
+        self._lock = asyncio.Lock()
+        self._next_at = 0.0
+
+    async def __aenter__(self):
+        await self.slots.acquire()
+        try:
+            async with self._lock:
+                loop = asyncio.get_running_loop()
+                wait = self._next_at - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._next_at = loop.time() + self.delay
+        except BaseException:
+            self.slots.release()
+            raise
+
+    async def __aexit__(self, *exc):
+        self.slots.release()
+
+
+def _site_host(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _analyze(url: str, html: str, keyword: Optional[str], lang: str) -> Tuple[Dict[str, Any], List[str]]:
+    """The /onpage report for one page, plus the internal links to follow (CPU-bound)."""
+    signals = extract(html)
+    report = build_report(url, signals, keyword, lang)
+    follow = "nofollow" not in (signals["robots_meta"] or "").lower()
+    return report, split_links(url, signals["links"])[0] if follow else []
+
+
+class SiteCrawler:
+    def __init__(self, start_url: str, out_path: pathlib.Path, crawl_id: Optional[str] = None,
+                 max_pages: int = MAX_PAGES, max_depth: int = MAX_DEPTH, concurrency: int = CONCURRENCY,
+                 per_host: int = PER_HOST, host_delay: float = HOST_DELAY, keyword: Optional[str] = None,
+                 lang: str = "en", agent: str = ROBOTS_AGENT):
+        if "://" not in start_url:
+            start_url = "https://" + start_url
+        self.start_url = start_url.split("#", 1)[0]
+        self.out_path = pathlib.Path(out_path)
+        self.max_pages, self.max_depth = max(max_pages, 1), max(max_depth, 0)
+        self.concurrency = max(concurrency, 1)
+        self.per_host, self.host_delay = per_host, host_delay
+        self.keyword, self.lang, self.agent = keyword, lang, agent
+        self.host = _site_host(self.start_url)
+        self.seen = SeenUrls()
+        self.scheduled = 0
+        self._gates: Dict[str, _HostGate] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._out = None
+        self._statuses: Counter = Counter()
+        self.progress: Dict[str, Any] = {
+            "crawl_id": crawl_id, "url": self.start_url, "status": "pending",
+            "pages": 0, "analyzed": 0, "errors": 0, "queued": 0,
+            "skipped_robots": 0, "skipped_limit": 0, "skipped_offsite_redirects": 0,
+            "max_depth_reached": 0, "statuses": {},
+            "issues": {"missing_title": 0, "missing_meta_description": 0, "missing_h1": 0, "noindex": 0},
+            "started_at": None, "finished_at": None, "elapsed_ms": None,
+        }
+
+    # --- frontier ---
+
+    def _enqueue(self, url: str, depth: int) -> None:
+        if not url.startswith(("http://", "https://")):
+            return  # mailto:, javascript:, tel:, ...
+        url = url.split("#", 1)[0]
+        if _site_host(url) != self.host or not self.seen.add(url):
+            return
+        if self.scheduled >= self.max_pages:
+            self.progress["skipped_limit"] += 1
+            return
+        if not robots.can_fetch(url, self.agent, fetch=False):  # hosts already looked up only
+            self.progress["skipped_robots"] += 1
+            return
+        self.scheduled += 1
+        self._queue.put_nowait((url, depth))
+
+    def _gate(self, url: str) -> _HostGate:
+        host = urlsplit(url).netloc.lower()
+        gate = self._gates.get(host)
+        if gate is None:
+            gate = self._gates[host] = _HostGate(self.per_host, self.host_delay)
+        return gate
+
+    # --- one page ---
+
+    async def _fetch(self, client: httpx.AsyncClient, url: str) -> Tuple[int, str, Optional[str]]:
+        """(status, final URL, HTML or None when the response is not an HTML page)."""
+        async with client.stream("GET", url) as r:
+            ctype = r.headers.get("content-type", "")
+            if r.status_code != 200 or (ctype and "html" not in ctype.lower()):
+                return r.status_code, str(r.url), None
+            body = bytearray()
+            async for chunk in r.aiter_bytes():
+                body += chunk
+                if len(body) > MAX_PAGE_BYTES:
+                    raise PageTooLarge(f"page larger than {MAX_PAGE_BYTES} bytes")
+            try:
+                return r.status_code, str(r.url), body.decode(r.charset_encoding or "utf-8", errors="replace")
+            except LookupError:  # unknown charset label
+                return r.status_code, str(r.url), body.decode("utf-8", errors="replace")
+
+    async def _visit(self, client: httpx.AsyncClient, url: str, depth: int) -> None:
+        loop = asyncio.get_running_loop()
+        # robots.txt of a host not looked up yet (the enqueue check only sees cached hosts)
+        if not await loop.run_in_executor(None, robots.can_fetch, url, self.agent):
+            self.scheduled -= 1  # give the slot back to another page
+            self.progress["skipped_robots"] += 1
+            return
+        record: Dict[str, Any] = {"url": url, "depth": depth}
+        t0 = time.perf_counter()
+        try:
+            async with self._gate(url):
+                status, final_url, html = await self._fetch(client, url)
+            record.update(status=status, final_url=final_url)
+            self._statuses[str(status)] += 1
+            if html is not None and _site_host(final_url) != self.host:
+                self.progress["skipped_offsite_redirects"] += 1
+            elif html is not None:
+                if final_url != url:
+                    self.seen.add(final_url)
+                report, links = await loop.run_in_executor(None, _analyze, final_url, html, self.keyword, self.lang)
+                record.update(report)
+                self._count_issues(report["onpage"])
+                self.progress["analyzed"] += 1
+                if depth < self.max_depth:
+                    for link in links:
+                        self._enqueue(link, depth + 1)
+        except (httpx.HTTPError, PageTooLarge) as e:
+            record["error"] = str(e)[:200] or type(e).__name__
+            self.progress["errors"] += 1
+        record["fetch_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        self._write(record)
+        self.progress["max_depth_reached"] = max(self.progress["max_depth_reached"], depth)
+
+    def _count_issues(self, page: Dict[str, Any]) -> None:
+        issues = self.progress["issues"]
+        issues["missing_title"] += not page["title"]
+        issues["missing_meta_description"] += not page["meta_description"]
+        issues["missing_h1"] += not page["headings"]["h1"]
+        issues["noindex"] += "noindex" in page["robots_meta"].lower()
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._out.flush()  # readers can tail the file while the crawl runs
+        self.progress["pages"] += 1
+
+    # --- run ---
+
+    async def _worker(self, client: httpx.AsyncClient) -> None:
+        while True:
+            url, depth = await self._queue.get()
+            try:
+                await self._visit(client, url, depth)
+            except Exception as e:  # one bad page must not stop the crawl
+                self.progress["errors"] += 1
+                self._write({"url": url, "depth": depth, "error": f"{type(e).__name__}: {e}"[:200]})
+            finally:
+                self._queue.task_done()
+
+    async def run(self) -> Dict[str, Any]:
+        """Crawl until the frontier is empty or the limits are reached; returns the summary."""
+        started = time.perf_counter()
+        self.progress.update(status="running", started_at=time.time())
+        self.out_path.parent.mkdir(parents=True, exist_ok=True)
+        self._queue = asyncio.Queue()
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        workers: List[asyncio.Task] = []
+        try:
+            with open(self.out_path, "a", encoding="utf-8") as self._out:
+                async with httpx.AsyncClient(headers=STATIC_HEADERS, timeout=TIMEOUT, limits=limits,
+                                             follow_redirects=True, max_redirects=5) as client:
+                    self.seen.add(self.start_url)
+                    self.scheduled = 1
+                    self._queue.put_nowait((self.start_url, 0))
+                    workers = [asyncio.create_task(self._worker(client)) for _ in range(self.concurrency)]
+                    await self._queue.join()
+            self.progress["status"] = "completed"
+        except asyncio.CancelledError:
+            self.progress["status"] = "cancelled"
+            raise
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self.progress.update(finished_at=time.time(), elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
+        return self.summary()
+
+    def summary(self) -> Dict[str, Any]:
+        queued = self._queue.qsize() if self._queue else 0
+        return {**self.progress, "queued": queued, "seen": len(self.seen), "statuses": dict(self._statuses),
+                "issues": dict(self.progress["issues"])}
+
+
+def crawl_site(url: str, out_path: pathlib.Path, **options) -> Dict[str, Any]:
+    """Blocking variant for scripts: crawl `url`, writing per-page NDJSON to `out_path`."""
+    return asyncio.run(SiteCrawler(url, out_path, **options).run())
+
+
+class SiteCrawls:
+    """Crawls started from the API; they run as tasks on the server's event loop."""
+
+    def __init__(self, directory: pathlib.Path = CRAWL_DIR):
+        self.dir = pathlib.Path(directory)
+        self._running: Dict[str, Tuple[SiteCrawler, asyncio.Task]] = {}
+
+    def results_path(self, crawl_id: str) -> pathlib.Path:
+        return self.dir / f"{crawl_id}.ndjson"
+
+    def _save(self, crawl_id: str, summary: Dict[str, Any]) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.dir / f".{crawl_id}.json.tmp"
+        tmp.write_text(json.dumps(summary), encoding="utf-8")
+        os.replace(tmp, self.dir / f"{crawl_id}.json")
+
+    def start(self, url: str, **options) -> str:
+        """Start a crawl on the running event loop; returns its crawl_id."""
+        crawl_id = uuid.uuid4().hex[:12]
+        crawler = SiteCrawler(url, self.results_path(crawl_id), crawl_id=crawl_id, **options)
+        self._save(crawl_id, crawler.summary())
+        task = asyncio.get_running_loop().create_task(self._run(crawl_id, crawler))
+        self._running[crawl_id] = (crawler, task)
+        return crawl_id
+
+    async def _run(self, crawl_id: str, crawler: SiteCrawler) -> None:
+        try:
+            await crawler.run()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            crawler.progress.update(status="failed", error=str(e)[:200])
+        finally:
+            self._save(crawl_id, crawler.summary())
+            self._running.pop(crawl_id, None)
+
+    def status(self, crawl_id: str) -> Optional[Dict[str, Any]]:
+        running = self._running.get(crawl_id)
+        if running:
+            return running[0].summary()
+        try:
+            summary = json.loads((self.dir / f"{crawl_id}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if summary["status"] in ("pending", "running"):
+            summary["status"] = "interrupted"  # the process that ran it is gone
+        return summary
+
+    async def stop(self) -> None:
+        """Cancel running crawls (app shutdown); their summaries are saved as cancelled."""
+        tasks = [task for _, task in self._running.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Shared by the /crawl-site endpoints.
+site_crawls = SiteCrawls()
@@ -0,0 +1,253 @@
+# backend/sitemaps.py
+"""
+Sitemap engine for the crawlability audit
+- Sitemaps listed in robots.txt (else /sitemap.xml); sitemap indexes are
+  followed level by level, child sitemaps fetched SITEMAP_CONCURRENCY at a time
+  over one pooled session
+- Bodies are streamed and fed chunk by chunk to an lxml target parser (as in
+  backend/extractor.py), gunzipped on the fly for .gz files; only counters and
+  the sample are kept, so a 50k-URL file never sits in memory as a tree
+- Exact <url> counts, lastmod stats (oldest/newest, updated in the last 30 / 365
+  days), URLs that robots.txt disallows, and a sample of the first URLs in
+  sitemap order
+- Fetched through backend/http_cache.py: on re-audit an unchanged sitemap is a
+  304 and is parsed from the stored copy
+- Bounded: SITEMAP_MAX_FILES sitemaps, SITEMAP_MAX_DEPTH index levels,
+  SITEMAP_MAX_BYTES per decompressed file
+"""
+
+from __future__ import annotations
+import io, os, re, gzip
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urljoin
+import requests
+from requests.adapters import HTTPAdapter
+from lxml import etree
+from backend.robots import robots
+from backend.http_cache import http_cache
+
+CONCURRENCY = int(os.getenv("SITEMAP_CONCURRENCY", "8"))
+MAX_FILES = int(os.getenv("SITEMAP_MAX_FILES", "1000"))
+MAX_DEPTH = int(os.getenv("SITEMAP_MAX_DEPTH", "3"))
+MAX_BYTES = int(os.getenv("SITEMAP_MAX_BYTES", str(100 * 1024 * 1024)))  # protocol limit is 50 MB
+TIMEOUT = (5, 30)
+CHUNK_SIZE = 1 << 16
+USER_AGENT = os.getenv("SITEMAP_USER_AGENT", "Mozilla/5.0 (compatible; SEO-Auditor/1.0)")
+
+
+class SitemapTooLarge(ValueError):
+    pass
+
+
+class _Capped(io.RawIOBase):
+    """Read-through wrapper that stops a body at `limit` bytes."""
+
+    def __init__(self, stream, limit: int):
+        self.stream, self.limit, self.left = stream, limit, limit
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buf) -> int:
+        data = self.stream.read(len(buf))
+        self.left -= len(data)
+        if self.left < 0:
+            raise SitemapTooLarge(f"sitemap larger than {self.limit} bytes")
+        buf[:len(data)] = data
+        return len(data)
+
+
+_DAY_RE = re.compile(r"\s*(\d{4}-\d{2}-\d{2})")  # W3C datetime; the date part is enough
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _new_lastmod() -> Dict[str, Any]:
+    # days are kept as ISO strings: they order correctly and cost no parsing
+    return {"with_lastmod": 0, "oldest": None, "newest": None, "last_30_days": 0, "last_365_days": 0}
+
+
+def _merge_lastmod(into: Dict[str, Any], other: Dict[str, Any]) -> None:
+    for key in ("with_lastmod", "last_30_days", "last_365_days"):
+        into[key] += other[key]
+    for key, pick in (("oldest", min), ("newest", max)):
+        values = [v for v in (into[key], other[key]) if v is not None]
+        into[key] = pick(values) if values else None
+
+
+class _SitemapTarget:
+    """Parser target for <urlset>/<sitemapindex>; keeps counters, never a tree.
+
+    Called for every element of files with 50k entries, so the callbacks avoid
+    anything but depth checks and string compares.
+    """
+
+    def __init__(self, sample_size: int, today: date, blocked: Optional[Callable[[str], bool]] = None):
+        self.sample_size = sample_size
+        self.blocked = blocked
+        self.cutoff_30 = (today - timedelta(days=30)).isoformat()
+        self.cutoff_365 = (today - timedelta(days=365)).isoformat()
+        self.result = {"kind": None, "urls": 0, "blocked": 0, "sample": [], "lastmod": _new_lastmod(),
+                       "children": []}
+        self._depth = 0
+        self._field: Optional[str] = None  # "loc" / "lastmod" while inside one
+        self._buf: List[str] = []
+        self._loc = self._lastmod = None
+
+    def start(self, tag: str, attrib) -> None:
+        self._depth += 1
+        if self._depth == 3:  # <urlset><url><loc>, not <image:loc> further down
+            if tag == "loc" or tag.endswith("}loc"):
+                self._field, self._buf = "loc", []
+            elif tag == "lastmod" or tag.endswith("}lastmod"):
+                self._field, self._buf = "lastmod", []
+        elif self._depth == 1:
+            self.result["kind"] = _local(tag)
+
+    def end(self, tag: str) -> None:
+        depth = self._depth
+        self._depth = depth - 1
+        if depth == 3:
+            if self._field:
+                if self._field == "loc":
+                    self._loc = "".join(self._buf).strip()
+                else:
+                    self._lastmod = "".join(self._buf)
+                self._field = None
+        elif depth == 2:
+            self._entry(tag)
+
+    def _entry(self, tag: str) -> None:
+        result = self.result
+        loc, lastmod = self._loc, self._lastmod
+        self._loc = self._lastmod = None
+        if tag == "url" or tag.endswith("}url"):
+            result["urls"] += 1
+            if loc and len(result["sample"]) < self.sample_size:
+                result["sample"].append(loc)
+            if loc and self.blocked and self.blocked(loc):
+                result["blocked"] += 1
+            m = _DAY_RE.match(lastmod) if lastmod else None
+            if m:
+                day, stats = m.group(1), result["lastmod"]
+                stats["with_lastmod"] += 1
+                if stats["oldest"] is None or day < stats["oldest"]:
+                    stats["oldest"] = day
+                if stats["newest"] is None or day > stats["newest"]:
+                    stats["newest"] = day
+                if day >= self.cutoff_365:
+                    stats["last_365_days"] += 1
+                    if day >= self.cutoff_30:
+                        stats["last_30_days"] += 1
+        elif loc and (tag == "sitemap" or tag.endswith("}sitemap")):
+            result["children"].append(loc)
+
+    def data(self, data: str) -> None:
+        if self._field:
+            self._buf.append(data)
+
+    def close(self) -> Dict[str, Any]:
+        return self.result
+
+
+def parse_sitemap(stream, sample_size: int = 10, today: Optional[date] = None,
+                  blocked: Optional[Callable[[str], bool]] = None) -> Dict[str, Any]:
+    """Incrementally parse one sitemap or sitemap index from a binary stream.
+
+    Returns {"kind": "urlset"|"sitemapindex"|None, "urls": count, "blocked": count
+    of URLs for which `blocked(url)` is true, "sample": [...], "lastmod": stats,
+    "children": [child sitemap URLs]}.
+    """
+    target = _SitemapTarget(sample_size, today or date.today(), blocked)
+    parser = etree.XMLParser(target=target, resolve_entities=False, no_network=True, huge_tree=True)
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        parser.feed(chunk)
+    return parser.close()
+
+
+class SitemapFetcher:
+    def __init__(self, concurrency: int = CONCURRENCY, max_files: int = MAX_FILES,
+                 max_depth: int = MAX_DEPTH, max_bytes: int = MAX_BYTES):
+        self.concurrency = max(concurrency, 1)
+        self.max_files, self.max_depth, self.max_bytes = max_files, max_depth, max_bytes
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="sitemap")
+
+    def locations(self, url: str) -> List[str]:
+        """Sitemap URLs declared in robots.txt (shared robots cache), else /sitemap.xml."""
+        found = [urljoin(url, sm) for sm in robots.get(url).sitemaps]
+        return list(dict.fromkeys(found)) or [urljoin(url, "/sitemap.xml")]
+
+    def fetch_one(self, sitemap_url: str, sample_size: int = 10,
+                  blocked: Optional[Callable[[str], bool]] = None) -> Dict[str, Any]:
+        """Stream and parse a single sitemap file."""
+        with http_cache.get(self.session, sitemap_url, timeout=TIMEOUT) as r:
+            if r.status >= 400:
+                raise requests.HTTPError(f"HTTP {r.status}")
+            body = io.BufferedReader(_Capped(r.body, self.max_bytes))
+            if body.peek(2)[:2] == b"\x1f\x8b":  # .xml.gz served as a file
+                body = io.BufferedReader(_Capped(gzip.GzipFile(fileobj=body), self.max_bytes))
+            return parse_sitemap(body, sample_size, blocked=blocked)
+
+    def summarize(self, url: str, limit: int = 10, locations: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Crawl every sitemap reachable from the site's roots, one index level at a time."""
+        roots = locations or self.locations(url)
+        is_blocked = lambda loc: not robots.can_fetch(loc, fetch=False)  # hosts already looked up only
+        seen = set(roots)
+        total, blocked, lastmod = 0, 0, _new_lastmod()
+        files: List[Dict[str, Any]] = []  # per-sitemap results in discovery order, for the sample
+        errors: Dict[str, str] = {}
+        truncated = False
+
+        level, depth = list(roots), 0
+        while level:
+            futures = [(u, self._pool.submit(self.fetch_one, u, limit, is_blocked)) for u in level]
+            next_level = []
+            for sm_url, fut in futures:
+                try:
+                    res = fut.result()
+                except (requests.RequestException, etree.XMLSyntaxError, SitemapTooLarge, OSError, EOFError) as e:
+                    errors[sm_url] = str(e)[:200]
+                    continue
+                files.append(res)
+                total += res["urls"]
+                blocked += res["blocked"]
+                _merge_lastmod(lastmod, res["lastmod"])
+                for child in res["children"]:
+                    child = urljoin(sm_url, child)
+                    if child in seen:
+                        continue
+                    if len(seen) >= self.max_files or depth >= self.max_depth:
+                        truncated = True
+                        continue
+                    seen.add(child)
+                    next_level.append(child)
+            level, depth = next_level, depth + 1
+
+        sample = [u for res in files for u in res["sample"]][:limit]
+        return {
+            "sitemaps_checked": roots,
+            "sitemap_urls_sample": sample,
+            "total_urls": total,
+            "blocked_by_robots": blocked,
+            "sitemaps_fetched": len(files),
+            "sitemap_indexes": sum(1 for res in files if res["kind"] == "sitemapindex"),
+            "lastmod": lastmod,
+            "errors": errors,
+            "truncated": truncated,
+        }
+
+
+# Shared by the crawlability audit, the report workflow and scripts.
+fetcher = SitemapFetcher()
@@ -0,0 +1,194 @@
+# backend/summarizer.py
+"""
+Compact fact sheet for the report prompt
+- Boils the /onpage, /crawl and /performance payloads down to the fields the
+  eight slide sections cite (scores, CWV, crawl status, meta tags, keywords,
+  links and, when checked, broken links)
+- Deterministic: fixed field order, fixed truncation, no timestamps, so equal
+  facts give byte-identical prompts
+- Hard budget (SUMMARY_TOKEN_BUDGET): list caps and text lengths shrink level by
+  level until the sheet fits; the last resort cuts whole lines
+- Token counts are estimates (~4 chars per token, no tokenizer dependency);
+  summarize() reports them next to the size of the old indented JSON dump
+- fingerprint(): hash of the sheet with numbers coarsened (scores to
+  LLM_CACHE_SCORE_STEP, large numbers to 2 significant digits), the key for
+  reusing generated slides when nothing material changed
+"""
+
+from __future__ import annotations
+import os, re, json, hashlib
+from typing import Any, Dict, List, Optional
+
+TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "600"))
+CHARS_PER_TOKEN = 4
+SCORE_STEP = int(os.getenv("LLM_CACHE_SCORE_STEP", "5"))
+_NUMBER_RE = re.compile(r"(?<![\w/.-])\d+(?:\.\d+)?(?![\w/-])")  # standalone numbers, not URL parts
+
+# Caps per detail level; the first level that fits the budget wins.
+DETAIL_LEVELS = [
+    {"opportunities": 5, "disallows": 5, "keywords": 5, "bigrams": 3, "h1": 2, "broken": 5, "text": 160},
+    {"opportunities": 3, "disallows": 3, "keywords": 5, "bigrams": 0, "h1": 1, "broken": 3, "text": 100},
+    {"opportunities": 2, "disallows": 2, "keywords": 3, "bigrams": 0, "h1": 0, "broken": 1, "text": 70},
+    {"opportunities": 1, "disallows": 0, "keywords": 3, "bigrams": 0, "h1": 0, "broken": 0, "text": 0},
+]
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _clip(value: Optional[str], limit: int) -> Optional[str]:
+    if not value or limit <= 0:
+        return None
+    value = " ".join(value.split())
+    return value if len(value) <= limit else value[:limit - 3].rstrip() + "..."
+
+
+def _pagespeed(block: Dict[str, Any], caps: Dict[str, int]) -> Dict[str, Any]:
+    scores = block.get("scores") or {}
+    cwv = block.get("lab_cwv") or {}
+    labels = cwv.get("labels") or {}
+
+    def metric(value, label):
+        return None if value is None else f"{value} ({label})" if label else value
+
+    cls = cwv.get("cls")
+    return {
+        "performance": scores.get("performance"),
+        "seo": scores.get("seo"),
+        "accessibility": scores.get("accessibility"),
+        "best_practices": scores.get("best_practices"),
+        "lcp_ms": metric(cwv.get("lcp_ms"), labels.get("lcp")),
+        "cls": metric(round(cls, 3) if isinstance(cls, (int, float)) else None, labels.get("cls")),
+        "inp_ms": metric(cwv.get("inp_ms"), labels.get("inp")),
+        "top_opportunities": (block.get("top_opportunities") or [])[:caps["opportunities"]],
+    }
+
+
+def build_facts(summary: Dict[str, Any], caps: Dict[str, int] = DETAIL_LEVELS[0]) -> Dict[str, Any]:
+    """Fact sheet from fetch_all()'s {"onpage", "crawlability", "performance"} payload."""
+    onpage = (summary.get("onpage") or {}).get("onpage") or {}
+    crawl = (summary.get("crawlability") or {}).get("crawlability") or {}
+    perf = summary.get("performance") or {}
+    facts: Dict[str, Any] = {"url": onpage.get("url") or perf.get("url")}
+
+    pagespeed = perf.get("pagespeed") or {}
+    for strategy in ("mobile", "desktop"):
+        if strategy in pagespeed:
+            facts[strategy] = _pagespeed(pagespeed[strategy], caps)
+        elif strategy in (perf.get("errors") or {}):
+            facts[strategy] = {"error": _clip(perf["errors"][strategy], 80)}
+
+    if crawl:
+        robots = crawl.get("robots_txt") or {}
+        sitemap = crawl.get("sitemap_info") or {}
+        signals = crawl.get("indexing_signals") or {}
+        verdict = crawl.get("summary") or {}
+        facts["crawl"] = {
+            "status": verdict.get("status"),
+            "notes": verdict.get("notes"),
+            "is_crawlable": robots.get("allows"),
+            "robots_disallows": (robots.get("disallows") or [])[:caps["disallows"]],
+            "sitemap_urls": sitemap.get("total_urls"),
+            "canonical_consistency": signals.get("canonical_consistency"),
+        }
+
+    if onpage:
+        headings = onpage.get("headings") or {}
+        alt = onpage.get("alt_audit") or {}
+        ka = onpage.get("keyword_analysis") or {}
+        facts["onpage"] = {
+            "title": _clip(onpage.get("title"), caps["text"]),
+            "title_status": onpage.get("title_status"),
+            "description": _clip(onpage.get("meta_description"), caps["text"]),
+            "robots_meta": onpage.get("robots_meta"),
+            "canonical": onpage.get("canonical"),
+            "word_count": onpage.get("word_count"),
+            "headings": {level: len(headings.get(level) or []) for level in ("h1", "h2", "h3")},
+            "h1": [_clip(h, caps["text"]) for h in (headings.get("h1") or [])[:caps["h1"]]],
+            "internal_links": onpage.get("internal_links"),
+            "external_links": onpage.get("external_links"),
+            "images_missing_alt": f"{alt.get('missing_alt_count', 0)}/{alt.get('total_images', 0)}",
+            "top_keywords": [(t["term"], t["count"]) for t in (ka.get("top_terms") or [])[:caps["keywords"]]],
+            "top_phrases": [(t["term"], t["count"]) for t in (ka.get("top_bigrams") or [])[:caps["bigrams"]]],
+        }
+        health = onpage.get("link_health")
+        if health:  # only when the link check ran
+            broken = [link for link in health["links"] if not link["ok"]]
+            facts["onpage"]["broken_links"] = f"{len(broken)}/{health['checked']}"
+            facts["onpage"]["broken_urls"] = [f"{_clip(link['url'], 100)} ({link['status'] or 'unreachable'})"
+                                              for link in broken[:caps["broken"]]]
+    elif (summary.get("onpage") or {}).get("error"):
+        facts["onpage"] = {"error": _clip(summary["onpage"]["error"], 80)}
+    return facts
+
+
+def _fmt(value: Any) -> str:
+    if isinstance(value, bool):
+        return "yes" if value else "no"
+    if isinstance(value, list):
+        return ", ".join(f"{v[0]} ({v[1]})" if isinstance(v, tuple) else str(v) for v in value)
+    if isinstance(value, dict):
+        return " ".join(f"{k}={v}" for k, v in value.items())
+    return str(value)
+
+
+def render_facts(facts: Dict[str, Any]) -> str:
+    """One `key: value` line per fact, grouped by section; empty values are left out."""
+    lines: List[str] = []
+    for key, value in facts.items():
+        if isinstance(value, dict):
+            lines.append(f"[{key}]")
+            lines.extend(f"{k}: {_fmt(v)}" for k, v in value.items() if v not in (None, [], ""))
+        elif value is not None:
+            lines.append(f"{key}: {_fmt(value)}")
+    return "\n".join(lines)
+
+
+def summarize(summary: Dict[str, Any], budget: int = TOKEN_BUDGET) -> Dict[str, Any]:
+    """Fact sheet text within `budget` estimated tokens, plus token accounting."""
+    for level, caps in enumerate(DETAIL_LEVELS):
+        facts = build_facts(summary, caps)
+        text = render_facts(facts)
+        if estimate_tokens(text) <= budget:
+            break
+    else:
+        # still too long: keep whole lines up to the budget
+        kept, size = [], 0
+        for line in text.split("\n"):
+            size += len(line) + 1
+            if size > budget * CHARS_PER_TOKEN:
+                break
+            kept.append(line)
+        text = "\n".join(kept)
+
+    json_tokens = estimate_tokens(json.dumps(summary, indent=2))
+    facts_tokens = estimate_tokens(text)
+    return {
+        "text": text,
+        "facts": facts,
+        "tokens": {
+            "budget": budget,
+            "detail_level": level,
+            "json_estimate": json_tokens,
+            "facts_estimate": facts_tokens,
+            "saved_estimate": max(json_tokens - facts_tokens, 0),
+        },
+    }
+
+
+def _coarse(match: re.Match, step: int) -> str:
+    raw = match.group(0)
+    if "." in raw:
+        return f"{float(raw):.2f}"
+    n = int(raw)
+    if n <= 100:
+        return str(int(round(n / step)) * step) if step > 1 else raw
+    digits = len(raw) - 2
+    return str(int(round(n, -digits)))
+
+
+def fingerprint(text: str, step: int = SCORE_STEP) -> str:
+    """Stable hash of a fact sheet that ignores immaterial metric jitter."""
+    coarse = _NUMBER_RE.sub(lambda m: _coarse(m, step), text)
+    return hashlib.sha256(coarse.encode("utf-8")).hexdigest()
@@ -0,0 +1,126 @@
+# backend/worker.py
+"""
+Report worker: runs queued /generate-report jobs from backend/jobs.py
+- `python -m backend.worker [--concurrency N]`; start as many processes as needed
+  (on other machines too, with the Redis backend)
+- JOB_WORKERS jobs at once per process, plus per-stage limits
+  (JOB_CONCURRENCY_FETCH / _LLM / _PRESENTATION) so e.g. only one Ollama
+  generation runs while other jobs keep fetching
+- Heartbeats its running jobs, requeues jobs of dead workers and deletes
+  finished jobs past retention
+- The API process runs one embedded worker unless JOB_EMBEDDED_WORKER=0
+- Loads the Ollama model on start (OLLAMA_WARMUP=0 to skip)
+- Jobs waiting on Gamma don't hold a worker thread; they stay heartbeated
+  while the process's Gamma poller watches them
+"""
+
+from __future__ import annotations
+import os, sys, time, uuid, socket, argparse, threading
+from typing import Dict, Optional, Set
+from backend.jobs import StatusView, store as job_store, statuses
+from backend.workflow import run_full_workflow
+from backend.llm import client as llm_client, WARMUP as LLM_WARMUP
+from backend.gamma import client as gamma_client
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+STAGE_LIMITS = {
+    "fetch": int(os.getenv("JOB_CONCURRENCY_FETCH", "4")),
+    "llm": int(os.getenv("JOB_CONCURRENCY_LLM", "1")),
+    "presentation": int(os.getenv("JOB_CONCURRENCY_PRESENTATION", "4")),
+}
+POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "15"))
+CLEANUP_INTERVAL = float(os.getenv("JOB_CLEANUP_INTERVAL", "300"))
+EMBEDDED = os.getenv("JOB_EMBEDDED_WORKER", "1") != "0"
+
+
+class Worker:
+    def __init__(self, store=job_store, concurrency: int = JOB_WORKERS,
+                 stage_limits: Optional[Dict[str, int]] = None):
+        self.store = store
+        self.statuses = statuses if store is job_store else StatusView(store)
+        self.concurrency = max(concurrency, 1)
+        self.gates = {stage: threading.BoundedSemaphore(max(n, 1))
+                      for stage, n in (stage_limits or STAGE_LIMITS).items()}
+        self.id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._active: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+                         for i in range(self.concurrency)]
+        self._threads.append(threading.Thread(target=self._maintain, name="job-maintenance", daemon=True))
+        for t in self._threads:
+            t.start()
+        if LLM_WARMUP:
+            # load the model while the first jobs are still fetching
+            threading.Thread(target=llm_client.warm, name="llm-warmup", daemon=True).start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop claiming new jobs; jobs still running are requeued by the next worker."""
+        self._stop.set()
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(max(deadline - time.monotonic(), 0))
+        self._threads = []
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self.store.claim(self.id, timeout=POLL_INTERVAL)
+            except Exception as e:
+                print(f"⚠️ Job store unavailable: {e}")
+                self._stop.wait(POLL_INTERVAL)
+                continue
+            if job:
+                self._run(job["job_id"], job["url"], job.get("options") or {})
+
+    def _run(self, job_id: str, url: str, options: dict) -> None:
+        with self._lock:
+            self._active.add(job_id)
+        try:
+            run_full_workflow(job_id, url, self.statuses, gates=self.gates,
+                              regenerate=bool(options.get("regenerate")))
+        except Exception as e:
+            self.store.fail(job_id, f"Worker error: {e}")  # sections published so far stay
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+
+    def _maintain(self) -> None:
+        last_cleanup = 0.0
+        while not self._stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                with self._lock:
+                    active = list(self._active)
+                active += gamma_client.watching()
+                self.store.heartbeat(active)
+                self.store.requeue_stale()
+                if time.monotonic() - last_cleanup >= CLEANUP_INTERVAL:
+                    self.store.cleanup()
+                    last_cleanup = time.monotonic()
+            except Exception as e:
+                print(f"⚠️ Job maintenance failed: {e}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run queued SEO report jobs.")
+    parser.add_argument("--concurrency", type=int, default=JOB_WORKERS, help="jobs run at once")
+    args = parser.parse_args(argv)
+
+    worker = Worker(concurrency=args.concurrency)
+    worker.start()
+    print(f"--- Worker {worker.id} running {worker.concurrency} jobs at once ({type(job_store).__name__}) ---")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        worker.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,85 @@
-import os, json, subprocess, requests, pathlib, time
+import os, re, pathlib, time, threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+from backend.onpage import onpage_analysis
+from backend.analyzer import analyze
+from backend.crawlability_checker import fetch_robots_txt, fetch_sitemap, crawlability_report
+from backend.cache import results_cache, cache_key
+from backend.llm import client as llm_client, LLMError
+from backend.summarizer import summarize, fingerprint
+from backend.gamma import client as gamma_client, GammaError
+from core.logic import parse_slides, render_deck
 
 load_dotenv()
 
 # --- CONFIGURATION ---
-BASE = "http://127.0.0.1:8000"
-GAMMA_API_KEY = os.getenv("GAMMA_API_KEY")
+PRESENTATION_RENDERER = os.getenv("PRESENTATION_RENDERER", "gamma").lower()  # gamma | local
+DECK_DIR = pathlib.Path(os.getenv("DECK_DIR", pathlib.Path(__file__).resolve().parent.parent / "data" / "decks"))
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "http://127.0.0.1:8000").rstrip("/")
+CHECK_LINKS = os.getenv("REPORT_CHECK_LINKS", "1") != "0"  # link health stage (backend/links.py)
 
-def fetch_all(url: str):
-    """Fetch results from all three local API endpoints."""
+def _timed(timings: dict, stage: str, fn, *args):
+    t0 = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        timings[stage] = int((time.perf_counter() - t0) * 1000)
+
+def _onpage(url: str) -> dict:
+    # link checks run inside the on-page stage, alongside the (much slower) PSI calls
+    return onpage_analysis(url, check_links=CHECK_LINKS)
+
+def _performance(url: str, priority: str = "interactive") -> dict:
+    # same cache entry as the /performance route; partial results are not stored
+    return results_cache.cached("performance", url, None, lambda: analyze(url, priority=priority),
+                                cacheable=lambda r: not r.get("errors"))
+
+def fetch_all(url: str, timings: dict = None, on_section=None, priority: str = "interactive"):
+    """Run the on-page, crawlability and performance audits in-process, all at once.
+
+    robots.txt and sitemap are fetched alongside the other audits; the crawl
+    report is assembled from them once the on-page result is in, so it reuses
+    its robots meta / canonical signals. `timings` receives per-stage ms;
+    `on_section(name, result)` is called as soon as each section is ready.
+    `priority` is the PSI priority ("batch" queues behind interactive calls).
+    """
+    timings = {} if timings is None else timings
+    on_section = on_section or (lambda name, value: None)
+    t0 = time.perf_counter()
     data = {}
     try:
-        data["onpage"] = requests.get(f"{BASE}/onpage", params={"url": url}, timeout=90).json()
-        data["crawlability"] = requests.get(f"{BASE}/crawl", params={"url": url}, timeout=30).json()
-        data["performance"] = requests.get(f"{BASE}/performance", params={"url": url}, timeout=180).json()
+        with ThreadPoolExecutor(max_workers=4, thread_name_prefix="fetch") as ex:
+            onpage = ex.submit(_timed, timings, "onpage", _onpage, url)
+            performance = ex.submit(_timed, timings, "performance", _performance, url, priority)
+            robots = ex.submit(_timed, timings, "robots", fetch_robots_txt, url)
+            sitemap = ex.submit(_timed, timings, "sitemap", fetch_sitemap, url)
+
+            sections = {onpage: "onpage", performance: "performance"}
+            for fut in as_completed(sections):
+                name = sections[fut]
+                data[name] = fut.result()
+                on_section(name, data[name])
+                if name == "onpage":
+                    onpage_data = data["onpage"].get("onpage")  # None when the on-page audit errored
+                    data["crawlability"] = crawlability_report(robots.result(), sitemap.result(), onpage_data)
+                    on_section("crawlability", data["crawlability"])
+            data = {k: data[k] for k in ("onpage", "crawlability", "performance")}
     except Exception as e:
         print(f"⚠️ An error occurred during data fetching: {e}")
         return None
+    finally:
+        timings["fetch_total"] = int((time.perf_counter() - t0) * 1000)
     return data
 
-def run_ollama(summary: dict) -> str:
-    """Send combined JSON to Ollama and return raw output."""
-    prompt = f"""
+# Bump whenever build_prompt() changes, so cached slides from the old prompt aren't reused.
+PROMPT_VERSION = "2"
+
+def build_prompt(facts: str) -> str:
+    """The slide-writing prompt around a summarizer fact sheet."""
+    return f"""
 # ROLE & GOAL
-You are an expert SEO analyst. Your only task is to generate a structured report based on the provided JSON data. You must follow all formatting rules precisely.
+You are an expert SEO analyst. Your only task is to generate a structured report based on the provided site facts. You must follow all formatting rules precisely.
 
 # CRITICAL RULES
 - YOU MUST include the `### SLIDES START` marker at the beginning of the slides.
@@ -78,7 +134,7 @@ You are an expert SEO analyst. Your only task is to generate a structured report
 - State the number of `internal_links` and `external_links`.
 - Explain the role of internal links in distributing authority.
 - Discuss the purpose and quality of external links.
-- Recommend checking for broken links.
+- Report how many links are broken (`broken_links`) and name the ones listed; if none were found, say so.
 *Key Takeaway*: Conclude on the health of the page's linking strategy.
 
 ## Slide 8: Priority Recommendations & Next Steps
@@ -89,14 +145,24 @@ You are an expert SEO analyst. Your only task is to generate a structured report
 *Key Takeaway*: A final, encouraging call to action.
 ### SLIDES END
 ---
-### JSON INPUT
-{json.dumps(summary, indent=2)}
+### SITE FACTS
+{facts}
 """
-    result = subprocess.run(["ollama", "run", "llama3"], input=prompt.encode("utf-8"), capture_output=True)
-    return result.stdout.decode("utf-8")
 
-def parse_and_upload(raw_output: str):
-    """Parses LLM output, starts Gamma generation, and polls for the result. Returns the final URL."""
+def run_ollama(summary: dict) -> str:
+    """Send the compacted analyzer results to Ollama and return raw output."""
+    return generate_text(build_prompt(summarize(summary)["text"]))
+
+def generate_text(prompt: str) -> str:
+    # streamed over the Ollama HTTP API; stops reading at "### SLIDES END"
+    try:
+        return llm_client.generate(prompt)
+    except LLMError as e:
+        print(f"⚠️ LLM generation failed: {e}")
+        return ""
+
+def extract_slides(raw_output: str) -> str:
+    """The slide markdown between the SLIDES START/END markers ("" if missing)."""
     slides = ""
     start_marker, end_marker = "### SLIDES START", "### SLIDES END"
     if start_marker in raw_output:
@@ -105,55 +171,176 @@ def parse_and_upload(raw_output: str):
             slides = content_after_start.split(end_marker, 1)[0].strip()
         else:
             slides = content_after_start.strip()
+    return slides
 
-    if not (GAMMA_API_KEY and slides):
-        return None
+def parse_and_upload(raw_output: str):
+    """Parses LLM output, starts Gamma generation, and polls for the result. Returns the final URL."""
+    return upload_slides(extract_slides(raw_output))
 
-    try:
-        start_endpoint = "https://public-api.gamma.app/v0.2/generations"
-        headers = {"X-API-KEY": GAMMA_API_KEY, "Content-Type": "application/json"}
-        payload = {"inputText": slides, "textMode": "preserve", "cardSplit": "inputTextBreaks"}
-        resp = requests.post(start_endpoint, headers=headers, json=payload, timeout=30)
-        resp.raise_for_status()
-        generation_id = resp.json().get("generationId")
-        if not generation_id: return None
-
-        status_endpoint = f"https://public-api.gamma.app/v0.2/generations/{generation_id}"
-        for _ in range(20):
-            time.sleep(5)
-            status_resp = requests.get(status_endpoint, headers=headers, timeout=30)
-            status_resp.raise_for_status()
-            status_data = status_resp.json()
-            status = status_data.get("status")
-            if status == "completed":
-                return status_data.get("gammaUrl")
-            if status == "failed":
-                return None
+def upload_slides(slides: str):
+    """Starts Gamma generation for `slides` and waits for the result. Returns the final URL."""
+    if not (gamma_client.configured and slides):
         return None
-    except Exception as e:
+    try:
+        return gamma_client.wait(gamma_client.start(slides))
+    except GammaError as e:
         print(f"⚠️ An error occurred during Gamma upload: {e}")
         return None
 
-def run_full_workflow(job_id: str, url: str, statuses: dict):
-    """Orchestrates the entire process and updates the job status dictionary."""
+def deck_metrics(summary: dict) -> dict:
+    """PSI category scores per strategy, for the deck's chart slide."""
+    pagespeed = ((summary or {}).get("performance") or {}).get("pagespeed") or {}
+    return {strategy: block.get("scores") or {} for strategy, block in pagespeed.items()}
+
+def render_local(job_id: str, url: str, slides: str, metrics: dict = None):
+    """Renders `slides` to data/decks/<site>-<job>.pptx and returns its /decks URL."""
+    parsed = parse_slides(slides)
+    if not parsed:
+        return None
+    site = re.sub(r"[^a-z0-9]+", "-", re.sub(r"^https?://", "", url.lower())).strip("-")[:60] or "site"
+    name = f"{site}-{job_id[:8]}.pptx"
+    DECK_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = DECK_DIR / f".{name}.tmp"
+    tmp.write_bytes(render_deck(parsed, metrics=metrics, title=f"SEO Audit: {url}"))
+    os.replace(tmp, DECK_DIR / name)
+    return f"{PUBLIC_BASE_URL}/decks/{name}"
+
+def build_presentation(job_id: str, url: str, slides: str, metrics: dict = None):
+    """The deck URL from the configured renderer (PRESENTATION_RENDERER), or None."""
+    if PRESENTATION_RENDERER == "local":
+        return render_local(job_id, url, slides, metrics)
+    return upload_slides(slides)
+
+def _finish(job: "_JobProgress", final_url):
+    if final_url:
+        job.section("presentation_url", final_url)
+        job.set("complete", final_url)
+        print(f"--- [Job {job.job_id}] Successfully finished. ---")
+    else:
+        job.set("failed", "Failed to create the presentation.")
+        print(f"--- [Job {job.job_id}] Failed during presentation creation ({PRESENTATION_RENDERER}). ---")
+
+def _watch_gamma(job: "_JobProgress"):
+    """Let the shared Gamma poller finish the job; the worker thread is free meanwhile."""
+    started = job.presentation.get("started_at") or time.time()
+
+    def done(final_url, error):
+        job.timings["presentation"] = int((time.time() - started) * 1000)
+        if error:
+            print(f"⚠️ [Job {job.job_id}] {error}")
+        _finish(job, final_url)
+
+    gamma_client.watch(job.presentation["generation_id"], done, tag=job.job_id, started_at=started)
+
+class _JobProgress:
+    """The job record being built; every change is written through to `statuses`.
+
+    Sections fill in as stages finish (onpage, crawlability, performance, then
+    slides, then presentation_url), so clients can show them before the job ends.
+    """
+
+    def __init__(self, job_id: str, statuses: dict):
+        self.job_id, self.statuses = job_id, statuses
+        self.status, self.result = "pending", None
+        self.timings = {}  # per-stage ms
+        self.sections = {}
+        self.llm = {}  # prompt token accounting
+        self.presentation = {}  # renderer, Gamma generation_id while it is pending
+        self._lock = threading.Lock()  # fetch_all reports sections from several threads
+
+    def _publish(self):
+        self.statuses[self.job_id] = {"status": self.status, "result": self.result,
+                                      "timings_ms": dict(self.timings), "sections": dict(self.sections),
+                                      "llm": dict(self.llm), "presentation": dict(self.presentation)}
+
+    def restore(self, previous: dict):
+        """Carry over what an earlier run of this job already published."""
+        self.status, self.result = previous.get("status", self.status), previous.get("result")
+        self.timings = dict(previous.get("timings_ms") or {})
+        self.sections = dict(previous.get("sections") or {})
+        self.llm = dict(previous.get("llm") or {})
+        self.presentation = dict(previous.get("presentation") or {})
+
+    def set(self, status: str, result=None):
+        with self._lock:
+            self.status, self.result = status, result
+            self._publish()
+
+    def section(self, name: str, value):
+        with self._lock:
+            self.sections[name] = value
+            self._publish()
+
+def _llm_cache_key(url: str, facts: str) -> str:
+    params = {"facts": fingerprint(facts), "prompt_version": PROMPT_VERSION, "model": llm_client.model}
+    return cache_key("llm", url, params)
+
+def run_full_workflow(job_id: str, url: str, statuses: dict, gates: dict = None, regenerate: bool = False):
+    """Orchestrates the entire process and updates the job status dictionary.
+
+    `gates` optionally maps a stage ("fetch", "llm", "presentation") to a
+    semaphore that bounds how many jobs run that stage at once. Slides are
+    reused from the LLM cache when the site facts haven't materially changed,
+    unless `regenerate` is set. With Gamma, the call returns once the generation
+    has started; the shared poller in backend/gamma.py completes the job.
+    """
+    gates = gates or {}
+    gate = lambda stage: gates.get(stage) or nullcontext()
+    job = _JobProgress(job_id, statuses)
+    previous = statuses.get(job_id) or {}
+    if (previous.get("presentation") or {}).get("generation_id") and \
+            not (previous.get("sections") or {}).get("presentation_url"):
+        # requeued after a restart while Gamma was generating (the status column then
+        # reads pending/claimed, so go by the stored generation): pick it back up
+        print(f"--- [Job {job_id}] Resuming Gamma generation {previous['presentation']['generation_id']} ---")
+        job.restore(previous)
+        job.set("creating_presentation")
+        _watch_gamma(job)
+        return
     print(f"--- [Job {job_id}] Starting for: {url} ---")
-    statuses[job_id] = {"status": "fetching_data", "result": None}
-    summary = fetch_all(url)
+    job.set("fetching_data")
+    with gate("fetch"):
+        summary = fetch_all(url, job.timings, on_section=job.section)
     if not summary:
-        statuses[job_id] = {"status": "failed", "result": "Failed to fetch initial SEO data."}
+        job.set("failed", "Failed to fetch initial SEO data.")
         return
 
-    print(f"--- [Job {job_id}] Generating text with Ollama... ---")
-    statuses[job_id] = {"status": "generating_text", "result": None}
-    raw_output = run_ollama(summary)
-
-    print(f"--- [Job {job_id}] Creating presentation with Gamma... ---")
-    statuses[job_id] = {"status": "creating_presentation", "result": None}
-    final_url = parse_and_upload(raw_output)
-    
-    if final_url:
-        statuses[job_id] = {"status": "complete", "result": final_url}
-        print(f"--- [Job {job_id}] Successfully finished. ---")
+    digest = summarize(summary)
+    job.llm["prompt_tokens"] = digest["tokens"]
+    llm_key = _llm_cache_key(url, digest["text"])
+    cached = None if regenerate else results_cache.get("llm", llm_key)
+    if cached:
+        print(f"--- [Job {job_id}] Facts unchanged, reusing cached slides. ---")
+        job.llm["cache"] = "hit"
+        slides = cached["slides"]
     else:
-        statuses[job_id] = {"status": "failed", "result": "Failed to create the Gamma presentation."}
-        print(f"--- [Job {job_id}] Failed during Gamma presentation creation. ---")
\ No newline at end of file
+        job.llm["cache"] = "regenerate" if regenerate else "miss"
+        print(f"--- [Job {job_id}] Generating text with Ollama... ---")
+        job.set("generating_text")
+        with gate("llm"):
+            raw_output = _timed(job.timings, "llm", generate_text, build_prompt(digest["text"]))
+        slides = extract_slides(raw_output)
+        if slides:
+            results_cache.put("llm", llm_key, {"slides": slides, "model": llm_client.model,
+                                               "prompt_version": PROMPT_VERSION})
+    job.section("slides", slides or None)
+
+    print(f"--- [Job {job_id}] Creating presentation ({PRESENTATION_RENDERER})... ---")
+    job.presentation["renderer"] = PRESENTATION_RENDERER
+    job.set("creating_presentation")
+    if PRESENTATION_RENDERER != "local" and gamma_client.configured and slides:
+        try:
+            with gate("presentation"):
+                generation_id = gamma_client.start(slides)
+        except GammaError as e:
+            print(f"⚠️ [Job {job_id}] {e}")
+            return _finish(job, None)
+        # stored with the job, so a worker that picks it up after a restart resumes polling
+        job.presentation.update(generation_id=generation_id, started_at=time.time())
+        job.set("creating_presentation")
+        return _watch_gamma(job)
+
+    with gate("presentation"):
+        final_url = _timed(job.timings, "presentation", build_presentation,
+                           job_id, url, slides, deck_metrics(summary))
+    _finish(job, final_url)
@@ -0,0 +1,16 @@
+# benchmarks/_server.py
+"""
+Local stub HTTP server shared by the benchmarks.
+- Handler threads are daemons, so a hung client never blocks exit
+- A listen backlog of REQUEST_QUEUE_SIZE instead of socketserver's 5: a burst
+  of N concurrent clients would otherwise get ConnectionResetError
+"""
+
+from http.server import ThreadingHTTPServer
+
+REQUEST_QUEUE_SIZE = 1024
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = REQUEST_QUEUE_SIZE
@@ -0,0 +1,89 @@
+# benchmarks/bench_browser_pool.py
+"""
+Cold-launch vs pooled rendering latency for /onpage.
+
+Serves a small fixture page from a local HTTP server, then renders it N times
+with a fresh Chromium per call (the old behaviour) and N times through the
+shared BrowserPool.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_browser_pool [N]
+"""
+
+import sys, time, statistics, threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+from playwright.sync_api import sync_playwright
+from backend.browser_pool import BrowserPool
+from benchmarks._server import StubServer
+
+FIXTURE = b"""<!doctype html><html><head><title>Fixture page for pool benchmark</title>
+<meta name="description" content="Local fixture"></head>
+<body><h1>Fixture</h1><p>""" + b"lorem ipsum dolor sit amet " * 200 + b"""</p>
+<a href="/a">a</a><a href="https://example.com/">ext</a><img src="/x.png"></body></html>"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(FIXTURE)))
+        self.end_headers()
+        self.wfile.write(FIXTURE)
+
+    def log_message(self, *args):
+        pass
+
+
+def _cold_render(url: str) -> str:
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        page.goto(url, timeout=60000)
+        content = page.content()
+        browser.close()
+    return content
+
+
+def _timed(fn, url):
+    t0 = time.perf_counter()
+    fn(url)
+    return (time.perf_counter() - t0) * 1000
+
+
+def _report(label, samples, wall_ms):
+    print(f"{label:<22} n={len(samples):<4} mean={statistics.mean(samples):8.1f} ms  "
+          f"p50={statistics.median(samples):8.1f} ms  max={max(samples):8.1f} ms  wall={wall_ms:8.1f} ms")
+
+
+def main(n: int = 10) -> None:
+    server = StubServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    try:
+        t0 = time.perf_counter()
+        cold = [_timed(_cold_render, url) for _ in range(n)]
+        _report("cold launch (serial)", cold, (time.perf_counter() - t0) * 1000)
+
+        pool = BrowserPool(max_concurrency=4, recycle_after=max(n, 1) * 4)
+        pool.start()
+        try:
+            pool.render(url)  # first launch is paid once per process, not per request
+            t0 = time.perf_counter()
+            pooled = [_timed(pool.render, url) for _ in range(n)]
+            _report("pooled (serial)", pooled, (time.perf_counter() - t0) * 1000)
+
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=pool.max_concurrency) as ex:
+                concurrent = list(ex.map(lambda u: _timed(pool.render, u), [url] * n))
+            _report("pooled (4 concurrent)", concurrent, (time.perf_counter() - t0) * 1000)
+            print("pool stats:", pool.stats())
+        finally:
+            pool.stop()
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
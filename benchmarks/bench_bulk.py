@@ -0,0 +1,117 @@
+# benchmarks/bench_bulk.py
+"""
+Bulk audit scheduling (backend/bulk.py) on a skewed batch, plus a crash/resume check.
+
+The batch is one big domain with BIG URLs followed by SMALL domains with a few
+URLs each, as when an agency list starts with a client's whole site. Audits
+are simulated (AUDIT_MS each), so only scheduling is measured:
+- a runall.py-style loop, one URL after another
+- a plain thread pool in input order (the big domain takes every worker)
+- BulkRunner: per-domain round-robin, one or two audits per domain at a time
+For each it prints the total time and when the last small domain finished
+(the per-domain cap is politeness: it bounds how fast the big domain can go).
+Then a batch is stopped half way, as if the process died, and run again: the
+second run must audit exactly the URLs the first one did not finish.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_bulk [BIG] [SMALL]
+"""
+
+import sys, time, tempfile, pathlib, threading
+from concurrent.futures import ThreadPoolExecutor
+from backend.bulk import BulkRunner, _domain
+
+AUDIT_MS = 50
+WORKERS = 4
+URLS_PER_SMALL = 3
+
+
+def _batch(big: int, small: int):
+    urls = [f"https://big-client.test/page-{i}" for i in range(big)]
+    for d in range(small):
+        urls += [f"https://site-{d}.test/p{i}" for i in range(URLS_PER_SMALL)]
+    return urls
+
+
+def _audit(url: str):
+    time.sleep(AUDIT_MS / 1000)
+    return {"onpage": {"url": url}}, {"fetch_total": AUDIT_MS}
+
+
+def _report(label: str, urls, finished_at, elapsed: float):
+    small = [t for url, t in finished_at.items() if not url.startswith("https://big-client")]
+    print(f"{label:<22} total {elapsed:6.2f}s   small domains done after {max(small):6.2f}s")
+
+
+def _sequential(urls):
+    t0, finished_at = time.perf_counter(), {}
+    for url in urls:
+        _audit(url)
+        finished_at[url] = time.perf_counter() - t0
+    return finished_at, time.perf_counter() - t0
+
+
+def _pool(urls):
+    t0, finished_at, lock = time.perf_counter(), {}, threading.Lock()
+
+    def run(url):
+        _audit(url)
+        with lock:
+            finished_at[url] = time.perf_counter() - t0
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as ex:
+        list(ex.map(run, urls))
+    return finished_at, time.perf_counter() - t0
+
+
+def _fair(urls, directory, per_domain):
+    runner = BulkRunner(workers=WORKERS, per_domain=per_domain, directory=directory, audit=_audit)
+    t0, finished_at = time.perf_counter(), {}
+    for record in runner.run(urls, resume=False):
+        if record["type"] == "result":
+            finished_at[record["url"]] = time.perf_counter() - t0
+    return finished_at, time.perf_counter() - t0
+
+
+def _resume_check(urls, directory):
+    audited = []
+
+    def audit(url):
+        audited.append(url)
+        return _audit(url)
+
+    runner = BulkRunner(workers=WORKERS, per_domain=2, directory=directory, audit=audit)
+    records = runner.run(urls, batch_id="resume-check", resume=False)
+    first = set()
+    for record in records:
+        if record["type"] == "result":
+            first.add(record["url"])
+            if len(first) == len(urls) // 2:
+                break
+    records.close()  # the "crash": stop consuming half way
+    time.sleep(AUDIT_MS / 1000 * 2)  # let audits already running finish, like a dying process
+    audited.clear()
+    lines = list(runner.run(urls, batch_id="resume-check"))
+    second = {r["url"] for r in lines if r["type"] == "result"}
+    assert lines[0]["resumed"] == len(first), lines[0]
+    assert first.isdisjoint(second) and first | second == set(urls), "resume re-ran or lost URLs"
+    assert set(audited) == second
+    print(f"resume check: {len(first)} URLs before the stop, {len(second)} after, none twice or missing")
+
+
+def main():
+    big = int(sys.argv[1]) if len(sys.argv) > 1 else 80
+    small = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    urls = _batch(big, small)
+    print(f"{len(urls)} URLs: {big} on one domain + {small} domains x {URLS_PER_SMALL}; "
+          f"{AUDIT_MS} ms per audit, {WORKERS} workers; {len({_domain(u) for u in urls})} domains")
+    with tempfile.TemporaryDirectory() as tmp:
+        _report("one after another", urls, *_sequential(urls))
+        _report("pool, input order", urls, *_pool(urls))
+        for per_domain in (1, 2):
+            _report(f"round-robin, {per_domain}/domain", urls, *_fair(urls, pathlib.Path(tmp), per_domain))
+        _resume_check(urls, pathlib.Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+# benchmarks/bench_extractor.py
+"""
+Parity check + micro-benchmark: single-pass lxml extractor vs the original
+BeautifulSoup(html.parser) audit.
+
+- Asserts analyze_html() output is identical to the legacy implementation on a
+  set of hand-written edge-case pages and on generated large documents
+- Times both on 5 MB and 10 MB generated fixtures
+
+Usage (from the repo root):
+    python -m benchmarks.bench_extractor
+"""
+
+import re, sys, time, random
+from urllib.parse import urlparse, urljoin
+from bs4 import BeautifulSoup
+from backend.onpage import analyze_html
+
+BASE_URL = "https://www.example.com/page"
+
+
+def legacy_analyze_html(url: str, html: str, keyword: str = None) -> dict:
+    """The pre-extractor /onpage analysis, verbatim (reference for parity)."""
+    soup = BeautifulSoup(html, "html.parser")
+
+    title = soup.title.string.strip() if soup.title else None
+    title_status = None
+    if title:
+        if len(title) < 30:
+            title_status = "Too short"
+        elif len(title) > 60:
+            title_status = "Too long"
+        else:
+            title_status = "Good length"
+
+    meta_desc_tag = soup.find("meta", attrs={"name": lambda v: v and v.lower() == "description"})
+    meta_description = meta_desc_tag["content"].strip() if meta_desc_tag and meta_desc_tag.get("content") else None
+
+    headings = {
+        "h1": list(dict.fromkeys([h.get_text(strip=True) for h in soup.find_all("h1")])),
+        "h2": list(dict.fromkeys([h.get_text(strip=True) for h in soup.find_all("h2")])),
+        "h3": list(dict.fromkeys([h.get_text(strip=True) for h in soup.find_all("h3")]))
+    }
+
+    canonical_tag = soup.find("link", attrs={"rel": "canonical"})
+    canonical = canonical_tag["href"] if canonical_tag and canonical_tag.get("href") else None
+
+    robots_meta_tag = soup.find("meta", attrs={"name": lambda v: v and v.lower() == "robots"})
+    robots_meta = robots_meta_tag["content"] if robots_meta_tag and robots_meta_tag.get("content") else "index, follow"
+
+    all_imgs = soup.find_all("img")
+    missing_alt = [img.get("src") for img in all_imgs if not img.get("alt") and img.get("src")]
+    alt_stats = {
+        "total_images": len(all_imgs),
+        "missing_alt_count": len(missing_alt),
+        "missing_alt_percent": round((len(missing_alt) / len(all_imgs) * 100), 2) if all_imgs else 0
+    }
+
+    for tag in soup(["script", "style", "noscript"]):
+        tag.extract()
+    body_text = soup.get_text(" ", strip=True)
+    words = re.findall(r"\b\w+\b", body_text.lower())
+    word_count = len(words)
+
+    domain = urlparse(url).netloc
+    internal_links, external_links = [], []
+    for link in soup.find_all("a", href=True):
+        href = urljoin(url, link["href"].strip())
+        if domain in urlparse(href).netloc:
+            internal_links.append(href)
+        else:
+            external_links.append(href)
+
+    if keyword:
+        kw = keyword.lower()
+        keyword_analysis = {
+            "keyword": keyword,
+            "in_title": bool(title and kw in title.lower()),
+            "in_meta_desc": bool(meta_description and kw in meta_description.lower()),
+            "in_headings": any(kw in h.lower() for h in headings["h1"] + headings["h2"] + headings["h3"]),
+            "count_in_body": body_text.lower().count(kw),
+            "density_percent": round((body_text.lower().count(kw) / word_count * 100), 2) if word_count else 0
+        }
+    else:
+        stopwords = {"the","and","or","for","of","a","an","to","in","on","at","by","with","is","are","was","were"}
+        freq = {}
+        for w in words:
+            if w not in stopwords and len(w) > 2:
+                freq[w] = freq.get(w, 0) + 1
+        common_terms = sorted(freq.items(), key=lambda x: x[1], reverse=True)[:10]
+        keyword_analysis = {
+            "top_terms": [
+                {
+                    "term": term,
+                    "count": count,
+                    "in_title": bool(title and term in title.lower()),
+                    "in_meta_desc": bool(meta_description and term in meta_description.lower()),
+                    "in_headings": any(term in h.lower() for h in headings["h1"] + headings["h2"] + headings["h3"])
+                }
+                for term, count in common_terms
+            ]
+        }
+
+    return {
+        "onpage": {
+            "url": url,
+            "title": title,
+            "title_status": title_status,
+            "meta_description": meta_description,
+            "headings": headings,
+            "canonical": canonical,
+            "robots_meta": robots_meta,
+            "alt_audit": alt_stats,
+            "word_count": word_count,
+            "internal_links": len(internal_links),
+            "external_links": len(external_links),
+            "keyword_analysis": keyword_analysis
+        }
+    }
+
+
+EDGE_CASES = {
+    "minimal": "<html><head><title>Short</title></head><body><p>Hello world</p></body></html>",
+    "meta_and_links": """<!DOCTYPE html><html><head>
+        <title>  A reasonably sized page title for testing  </title>
+        <meta name="Description" content="  Described here  ">
+        <meta name="description" content="second one is ignored">
+        <meta name="ROBOTS" content="noindex, nofollow">
+        <link rel="alternate canonical" href="https://www.example.com/canon">
+        <link rel="canonical" href="https://www.example.com/other">
+        </head><body>
+        <a href=" /relative ">rel</a><a href="">empty</a><a>no href</a>
+        <a href="https://other.org/x">ext</a><a href="//www.example.com/proto">proto</a>
+        </body></html>""",
+    "headings_nested": """<html><head><title>Headings and nested inline markup ok</title></head><body>
+        <h1>Main <b>bold</b> <!-- hidden --> title<script>var x = 1;</script></h1>
+        <h1>Main <b>bold</b> title</h1>
+        <h2>Sub<noscript>ns</noscript> heading</h2><h2><span>  </span></h2>
+        <h3>Third &amp; final</h3><h3>Caf&eacute; &#8212; d&eacute;j&agrave; vu</h3>
+        </body></html>""",
+    "images": """<html><head><title>Images</title></head><body>
+        <img src="/a.png" alt="A"><img src="/b.png"><img src="/c.png" alt="">
+        <img alt="no src"><img><img src="" alt=""></body></html>""",
+    "hidden_text": """<html><head><title>Text handling</title><style>body{color:red}</style></head><body>
+        <script>document.write("nope")</script><noscript>Please enable JavaScript</noscript>
+        <template><p>template text</p></template><textarea>typed text</textarea>
+        <p>Visible&nbsp;text with   spaces</p><div>more<br>lines</div></body></html>""",
+    "no_meta": "<html><body><h2>No title at all</h2><p>the and for of words words words</p></body></html>",
+}
+
+
+def generate_large_html(target_bytes: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    vocab = [w for w in (
+        "seo audit crawl index canonical sitemap robots performance mobile desktop content keyword "
+        "ranking search engine page speed layout shift paint interaction link image alt heading "
+        "meta description title structured data schema markup visibility traffic conversion"
+    ).split()]
+    parts = ["<!DOCTYPE html><html><head><title>Generated fixture page for extractor benchmark</title>",
+             '<meta name="description" content="Large generated document">',
+             '<link rel="canonical" href="https://www.example.com/page"><style>p{margin:0}</style></head><body>']
+    size = sum(map(len, parts))
+    i = 0
+    while size < target_bytes:
+        words = " ".join(rng.choice(vocab) for _ in range(rng.randint(20, 80)))
+        alt = ' alt="pic"' if i % 4 else ""
+        block = (
+            f"<section id=s{i}><h{1 + i % 3}>Section {i} {rng.choice(vocab)}</h{1 + i % 3}>"
+            f"<p>{words} <b>{rng.choice(vocab)}</b> &amp; {rng.choice(vocab)}</p>"
+            f'<img src="/img/{i}.png"{alt}>'
+            f'<a href="/p/{i}">internal</a> <a href="https://ext{i % 7}.org/{i}">external</a>'
+            f"<!-- comment {i} --><script>var v{i} = {i};</script></section>\n"
+        )
+        parts.append(block)
+        size += len(block)
+        i += 1
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def _legacy_view(result: dict) -> dict:
+    """Drop keys added after the legacy implementation (n-grams, lang) before comparing."""
+    ka = result["onpage"]["keyword_analysis"]
+    for extra in ("top_bigrams", "top_trigrams", "lang"):
+        ka.pop(extra, None)
+    return result
+
+
+def _timed(fn, *args, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return out, best * 1000
+
+
+def main() -> int:
+    failures = 0
+    for name, html in EDGE_CASES.items():
+        for keyword in (None, "words", "title"):
+            expected = legacy_analyze_html(BASE_URL, html, keyword)
+            got = _legacy_view(analyze_html(BASE_URL, html, keyword))
+            if expected != got:
+                failures += 1
+                print(f"PARITY FAIL {name} keyword={keyword!r}\n  legacy: {expected}\n  new:    {got}")
+    print(f"edge-case parity: {len(EDGE_CASES) * 3 - failures}/{len(EDGE_CASES) * 3} identical")
+
+    for mb in (5, 10):
+        html = generate_large_html(mb * 1024 * 1024, seed=mb)
+        expected, legacy_ms = _timed(legacy_analyze_html, BASE_URL, html, None, repeat=1)
+        got, new_ms = _timed(analyze_html, BASE_URL, html, None)
+        same = expected == _legacy_view(got)
+        failures += not same
+        print(f"{mb:>2} MB fixture: legacy={legacy_ms:9.1f} ms  extractor={new_ms:8.1f} ms  "
+              f"speedup={legacy_ms / new_ms:5.1f}x  parity={'ok' if same else 'FAIL'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+# benchmarks/bench_gamma_poller.py
+"""
+Fixed-interval Gamma polling vs the shared adaptive poller (backend/gamma.py).
+
+Runs a local mock of the Gamma generations API (POST /generations,
+GET /generations/{id}); each generation completes after a random 5-15 s.
+N generations are then waited for the old way (one thread per job, a status
+request every 5 s) and through one GammaClient, and the wall time, status
+requests and threads are compared. Then a generation started by one client
+is picked up by a fresh client from its generationId, as after a restart, and
+a report job whose worker died mid-presentation is requeued through the job
+store: the next run must resume polling that generation, not fetch, prompt or
+start a second (paid) one. Last, the mock answers a poll with a non-JSON 200:
+the poller must shrug it off and still finish every generation.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_gamma_poller [N]
+"""
+
+import sys, json, time, uuid, random, pathlib, tempfile, threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+import requests
+from backend import workflow
+from backend.gamma import GammaClient
+from backend.jobs import SQLiteJobStore, StatusView
+from benchmarks._server import StubServer
+
+MIN_SECONDS, MAX_SECONDS = 5.0, 15.0
+
+
+class MockGamma:
+    """In-memory generations API; generations finish after a random duration."""
+
+    def __init__(self):
+        self.done_at = {}
+        self.status_requests = 0
+        self.garbage = 0  # next status requests answered with an HTML page
+        self.lock = threading.Lock()
+
+    def handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _json(self, code, body):
+                raw = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                generation_id = uuid.uuid4().hex
+                with mock.lock:
+                    mock.done_at[generation_id] = time.monotonic() + random.uniform(MIN_SECONDS, MAX_SECONDS)
+                self._json(200, {"generationId": generation_id})
+
+            def do_GET(self):
+                generation_id = self.path.rsplit("/", 1)[-1]
+                with mock.lock:
+                    mock.status_requests += 1
+                    done_at = mock.done_at.get(generation_id)
+                    garbage, mock.garbage = mock.garbage > 0, max(mock.garbage - 1, 0)
+                if garbage:
+                    raw = b"<html>502 Bad Gateway</html>"
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html")
+                    self.send_header("Content-Length", str(len(raw)))
+                    self.end_headers()
+                    self.wfile.write(raw)
+                elif done_at is None:
+                    self._json(404, {"message": "not found"})
+                elif time.monotonic() < done_at:
+                    self._json(200, {"generationId": generation_id, "status": "pending"})
+                else:
+                    self._json(200, {"generationId": generation_id, "status": "completed",
+                                     "gammaUrl": f"https://gamma.app/docs/{generation_id}"})
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def serve(mock: MockGamma):
+    server = StubServer(("127.0.0.1", 0), mock.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _fixed_poll(base: str, slides: str) -> str:
+    """The old upload_slides(): POST, then a status request every 5 s on this thread."""
+    generation_id = requests.post(f"{base}/generations", json={"inputText": slides}, timeout=30).json()["generationId"]
+    for _ in range(20):
+        time.sleep(5)
+        data = requests.get(f"{base}/generations/{generation_id}", timeout=30).json()
+        if data.get("status") == "completed":
+            return data.get("gammaUrl")
+    return None
+
+
+def _run(label: str, mock: MockGamma, n: int, fn):
+    mock.status_requests = 0
+    threads = threading.active_count()
+    t0 = time.perf_counter()
+    urls, peak = fn(n)
+    elapsed = time.perf_counter() - t0
+    ok = sum(1 for u in urls if u)
+    print(f"{label:<16} {ok}/{n} decks in {elapsed:6.2f}s  status requests {mock.status_requests:5d}  "
+          f"extra threads {peak - threads:4d}")
+
+
+def _resume_check(mock: MockGamma, base: str, slides: str):
+    """Worker dies while Gamma generates; the requeued job must resume, not start over."""
+    client = GammaClient(base_url=base, api_key="mock")
+    fetched = []
+    workflow.gamma_client = client
+    workflow.fetch_all = lambda *args, **kwargs: fetched.append(args) or None
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteJobStore(pathlib.Path(tmp) / "jobs.sqlite3")
+        statuses = StatusView(store)
+        job_id, _ = store.submit("https://example.com/")
+        store.claim("dead-worker")
+        generation_id = client.start(slides)
+        statuses[job_id] = {"status": "creating_presentation", "result": None, "sections": {"slides": slides},
+                            "presentation": {"renderer": "gamma", "generation_id": generation_id,
+                                             "started_at": time.time()}}
+        assert store.requeue_stale(stale_after=0, max_attempts=5) == 1
+        assert store.claim("new-worker")["job_id"] == job_id
+        assert store.get(job_id)["status"] == "claimed"
+        created = len(mock.done_at)
+        workflow.run_full_workflow(job_id, "https://example.com/", statuses)
+        deadline = time.monotonic() + MAX_SECONDS + 30
+        while store.get(job_id)["status"] != "complete" and time.monotonic() < deadline:
+            time.sleep(0.5)
+        job = store.get(job_id)
+    client.close()
+    assert job["status"] == "complete" and job["result"].endswith(generation_id), job
+    assert not fetched and len(mock.done_at) == created, "resumed job fetched again or started a new generation"
+    print(f"resume check: requeued job ('claimed') resumed generation {generation_id[:8]}, "
+          f"no fetch, no second generation")
+
+
+def _garbage_check(mock: MockGamma, base: str, slides: str):
+    """A non-JSON 200 is retried with backoff; it must not stop the shared poller."""
+    client = GammaClient(base_url=base, api_key="mock", poll_min=0.2, poll_max=0.5)
+    ids = [client.start(slides) for _ in range(3)]
+    mock.garbage = 3
+    urls = [client.wait(generation_id, timeout=60) for generation_id in ids]
+    stats = client.stats()
+    client.close()
+    assert all(urls) and stats["poll_errors"] >= 1 and stats["in_flight"] == 0, stats
+    print(f"garbage check: {stats['poll_errors']} malformed answers retried, all {len(urls)} generations finished")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    mock = MockGamma()
+    server, base = serve(mock)
+    slides = "## Slide 1: Summary\n- point"
+
+    def fixed(n):
+        with ThreadPoolExecutor(max_workers=n) as ex:
+            futures = [ex.submit(_fixed_poll, base, slides) for _ in range(n)]
+            peak = threading.active_count()
+            return [f.result() for f in futures], peak
+
+    def adaptive(n):
+        client = GammaClient(base_url=base, api_key="mock")
+        done = threading.Semaphore(0)
+        urls = []
+
+        def on_done(url, error):
+            urls.append(url)
+            done.release()
+
+        for _ in range(n):
+            client.watch(client.start(slides), on_done)
+        peak = threading.active_count()
+        for _ in range(n):
+            done.acquire()
+        client.close()
+        return urls, peak
+
+    print(f"{n} generations, each ready after {MIN_SECONDS:.0f}-{MAX_SECONDS:.0f}s")
+    _run("fixed 5s polling", mock, n, fixed)
+    _run("shared poller", mock, n, adaptive)
+
+    # restart: the generationId outlives the client that started it
+    first = GammaClient(base_url=base, api_key="mock")
+    started_at, generation_id = time.time(), first.start(slides)
+    first.close()
+    time.sleep(MIN_SECONDS)
+    second = GammaClient(base_url=base, api_key="mock")
+    url = second.wait(generation_id, timeout=60, started_at=started_at)
+    print(f"resumed after restart: {url} ({time.time() - started_at:.1f}s after it started)")
+    second.close()
+    _resume_check(mock, base, slides)
+    _garbage_check(mock, base, slides)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# benchmarks/bench_http_cache.py
+"""
+Conditional GETs (backend/http_cache.py) on a re-audit, vs plain GETs.
+
+A local server (LATENCY_MS per response, bodies sent at MBPS) serves a
+robots.txt, a sitemap index with N child sitemaps (half of them .xml.gz) and an
+HTML page, with ETag and Last-Modified, answering If-None-Match /
+If-Modified-Since with 304. The crawlability inputs (robots.txt, every sitemap)
+and the static HTML are fetched three times:
+- with the layer off: every audit downloads everything
+- cold: bodies downloaded and stored with their validators
+- re-audit after one child sitemap changed: 304s for the rest
+Reports bytes sent by the server and wall time per run, checks the re-audit
+finds the same URLs (plus the changed file's new ones) and prints the stats.
+Parsing 100k sitemap URLs costs the same either way, so the fetches alone
+(bodies read, not parsed) are timed too, plain vs revalidated.
+Last, a race check: RACE_THREADS threads keep fetching one URL through a fresh
+cache while its body changes every 150 ms, so 304s are served while other
+threads store new copies; no fetch may fail or see a partial body, and the
+cache must end with one body file for the URL and a stored_bytes that matches
+the disk.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_http_cache [N]
+"""
+
+import os, sys, gzip, time, pathlib, tempfile, threading
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["HTTP_CACHE_DIR"] = _tmp.name  # before the backend modules create the shared cache
+
+from backend.http_cache import http_cache, ConditionalCache
+from backend.robots import robots
+from backend.sitemaps import SitemapFetcher
+from backend.onpage import fetch_html_static
+from benchmarks._server import StubServer
+
+LATENCY_MS = 50
+MBPS = 2
+URLS_PER_SITEMAP = 5000
+RACE_THREADS, RACE_FETCHES = 8, 40
+
+
+def _sitemap(port: int, n: int, version: int = 0) -> bytes:
+    rows = "".join(f"<url><loc>http://127.0.0.1:{port}/p/{n}/{i}/v{version}</loc>"
+                   f"<lastmod>2024-05-{1 + i % 28:02d}</lastmod></url>" for i in range(URLS_PER_SITEMAP))
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{rows}</urlset>').encode()
+
+
+def _server(n: int):
+    files, sent, lock = {}, [0], threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(LATENCY_MS / 1000)
+            item = files.get(self.path)
+            if item is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body, ctype, version = item
+            etag, modified = f'"{hash(body) & 0xffffffff:x}-{version}"', formatdate(1700000000 + version, usegmt=True)
+            if self.headers.get("If-None-Match") == etag or (
+                    "If-None-Match" not in self.headers and self.headers.get("If-Modified-Since") == modified):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", modified)
+            self.end_headers()
+            with lock:
+                sent[0] += len(body)
+            step = 64 * 1024
+            for i in range(0, len(body), step):  # bandwidth-limited body
+                self.wfile.write(body[i:i + step])
+                time.sleep(step / (MBPS * 1024 * 1024))
+
+        def log_message(self, *args):
+            pass
+
+    server = StubServer(("127.0.0.1", 0), Handler)
+    port = server.server_address[1]
+    base = f"http://127.0.0.1:{port}"
+    children = [f"/sm-{i}.xml.gz" if i % 2 else f"/sm-{i}.xml" for i in range(n)]
+    for i, path in enumerate(children):
+        xml = _sitemap(port, i)
+        files[path] = (gzip.compress(xml, 6) if path.endswith(".gz") else xml, "application/xml", 0)
+    index = "".join(f"<sitemap><loc>{base}{p}</loc></sitemap>" for p in children)
+    files["/sitemap_index.xml"] = (('<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                                    f"{index}</sitemapindex>").encode(), "application/xml", 0)
+    files["/robots.txt"] = (("User-agent: *\nDisallow: /private/\n" +
+                             "".join(f"Disallow: /archive/{i}/\n" for i in range(50)) +
+                             f"Sitemap: {base}/sitemap_index.xml\n").encode(), "text/plain", 0)
+    files["/"] = (b"<html><head><title>Home</title></head><body>" + b"<p>text</p>" * 5000 + b"</body></html>",
+                  "text/html", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, base, files, sent
+
+
+def _audit(base: str, fetcher: SitemapFetcher):
+    robots._entries.clear()  # as if ROBOTS_TTL had run out
+    summary = fetcher.summarize(f"{base}/")
+    html = fetch_html_static(f"{base}/")
+    return summary, html
+
+
+def _transfer(urls, session):
+    def one(url):
+        with http_cache.get(session, url, timeout=30) as r:
+            while r.body.read(1 << 16):
+                pass
+
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        list(ex.map(one, urls))
+
+
+def _race(base: str, files, session) -> int:
+    files["/race.txt"] = (b"v0 " * 20000, "text/plain", 0)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ConditionalCache(tmp, max_bytes=1 << 30, enabled=True)
+        bodies, stop = {0}, threading.Event()
+
+        def change():
+            version = 0
+            while not stop.is_set():
+                version += 1
+                bodies.add(version)
+                files["/race.txt"] = (f"v{version} ".encode() * 20000, "text/plain", version)
+                time.sleep(0.15)
+
+        def fetch(_):
+            seen = []
+            for _ in range(RACE_FETCHES):
+                with cache.get(session, f"{base}/race.txt", timeout=30) as r:
+                    body = r.body.read()
+                version = int(body[1:body.index(b" ")])
+                assert r.status == 200 and version in bodies and body == f"v{version} ".encode() * 20000
+                seen.append(r.revalidated)
+            return sum(seen)
+
+        changer = threading.Thread(target=change)
+        changer.start()
+        try:
+            with ThreadPoolExecutor(max_workers=RACE_THREADS) as ex:
+                revalidated = sum(ex.map(fetch, range(RACE_THREADS)))
+        finally:
+            stop.set()
+            changer.join()
+        on_disk = list(pathlib.Path(tmp).glob("*.body"))
+        assert len(on_disk) == 1, f"{len(on_disk)} body files for one URL"
+        assert cache.stats()["stored_bytes"] == sum(p.stat().st_size for p in on_disk), cache.stats()
+    return revalidated
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    server, base, files, sent = _server(n)
+    fetcher = SitemapFetcher()
+    total = sum(len(body) for body, _, _ in files.values())
+    print(f"robots.txt + index + {n} sitemaps ({URLS_PER_SITEMAP} URLs each) + 1 page, "
+          f"{total / 1e6:.1f} MB on the wire, {LATENCY_MS} ms per response, {MBPS} MB/s")
+
+    runs = {}
+    for label, enabled in (("plain GETs", False), ("cold, storing", True), ("re-audit, 1 changed", True)):
+        if label.startswith("re-audit"):
+            body, ctype, version = files["/sm-0.xml"]
+            files["/sm-0.xml"] = (_sitemap(int(base.rsplit(":", 1)[1]), 0, version=1), ctype, 1)
+        http_cache.enabled = enabled
+        sent[0] = 0
+        t0 = time.perf_counter()
+        runs[label] = _audit(base, fetcher)
+        print(f"{label:<20} {time.perf_counter() - t0:6.2f}s  {sent[0] / 1e6:7.2f} MB sent")
+
+    urls = [f"{base}{path}" for path in files]
+    for label, enabled in (("fetches only, plain", False), ("fetches only, 304s", True)):
+        http_cache.enabled = enabled
+        sent[0] = 0
+        t0 = time.perf_counter()
+        _transfer(urls, fetcher.session)
+        print(f"{label:<20} {time.perf_counter() - t0:6.2f}s  {sent[0] / 1e6:7.2f} MB sent")
+
+    cold, warm = runs["cold, storing"], runs["re-audit, 1 changed"]
+    assert not cold[0]["errors"] and not warm[0]["errors"], (cold[0]["errors"], warm[0]["errors"])
+    assert cold[0]["total_urls"] == warm[0]["total_urls"] == n * URLS_PER_SITEMAP
+    assert cold[0]["sitemap_urls_sample"] != warm[0]["sitemap_urls_sample"]  # sm-0 changed: its new URLs are seen
+    assert cold[1] == warm[1] == runs["plain GETs"][1]
+    stats = http_cache.stats()
+    assert stats["not_modified"] == 2 * (n + 3) - 1 and stats["modified"] == 1, stats
+    print(f"checks: same URL counts, changed sitemap re-read, HTML identical; {stats['not_modified']} x 304, "
+          f"{stats['bytes_saved'] / 1e6:.2f} MB and ~{stats['ms_saved']} ms saved (stats)")
+    revalidated = _race(base, files, fetcher.session)
+    print(f"race: {RACE_THREADS} threads x {RACE_FETCHES} fetches while the body changes, {revalidated} x 304, "
+          f"no failed fetch, one body file, stored_bytes matches the disk")
+    server.shutdown()
+    _tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
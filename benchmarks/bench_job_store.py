@@ -0,0 +1,134 @@
+# benchmarks/bench_job_store.py
+"""
+Job stores (backend/jobs.py): lifecycle checks and concurrent change delivery.
+
+Runs against SQLiteJobStore (temp file) and RedisJobStore on fakeredis, the
+local stand-in for a Redis server (skipped when fakeredis is not installed):
+- submit / dedup: a second submit of the same URL (other spelling) returns the
+  unfinished job; once it finishes, a new job is created
+- claim / heartbeat / requeue: a heartbeated job stays claimed, a stale one goes
+  back to the queue and is claimed again; after max attempts it fails and keeps
+  the sections it had published
+- worker failure: a job whose workflow raises after fetch_all (here in the fact
+  summary) is failed by the worker with its fetched sections intact
+- change feed: WRITERS threads update JOBS jobs concurrently while a poller
+  follows changes_since(cursor) as backend/job_events.py does; the poller must
+  end up with every job's final version (no change skipped by the cursor)
+Prints writes per second for each store.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_job_store
+"""
+
+import time, pathlib, tempfile, threading
+from backend import workflow
+from backend.jobs import SQLiteJobStore, RedisJobStore
+from backend.worker import Worker
+
+JOBS = 40
+WRITERS = 8
+UPDATES = 25
+
+
+def _lifecycle(store) -> None:
+    job_id, deduped = store.submit("https://Example.com/?b=2&a=1")
+    again, deduped_again = store.submit("https://example.com/?a=1&b=2#top")
+    assert not deduped and deduped_again and again == job_id
+
+    claimed = store.claim("w1")
+    assert claimed["job_id"] == job_id and store.claim("w2") is None
+    store.update(job_id, {"status": "fetching_data", "result": None, "sections": {"onpage": {"title": "x"}}})
+    store.heartbeat([job_id])
+    assert store.requeue_stale(stale_after=60) == 0 and store.get(job_id)["status"] == "fetching_data"
+
+    assert store.requeue_stale(stale_after=-1, max_attempts=2) == 1  # stale: back to the queue
+    assert store.get(job_id)["status"] == "pending"
+    assert store.claim("w2")["job_id"] == job_id and store.get(job_id)["attempts"] == 2
+    assert store.requeue_stale(stale_after=-1, max_attempts=2) == 1  # out of attempts: failed
+    job = store.get(job_id)
+    assert job["status"] == "failed" and job["sections"] == {"onpage": {"title": "x"}}, job
+
+    new_id, deduped = store.submit("https://example.com/?a=1&b=2")
+    assert not deduped and new_id != job_id
+    assert store.claim("w3")["job_id"] == new_id
+    store.update(new_id, {"status": "complete", "result": None})
+
+
+def _worker_failure(store) -> None:
+    def fetch_all(url, timings=None, on_section=None, priority="interactive"):
+        for name in ("onpage", "crawlability", "performance"):
+            on_section(name, {"url": url})
+        return {"onpage": {"url": url}}
+
+    def summarize(summary):
+        raise ValueError("boom")
+
+    real = workflow.fetch_all, workflow.summarize
+    workflow.fetch_all, workflow.summarize = fetch_all, summarize
+    try:
+        job_id, _ = store.submit("https://failing.test/")
+        job = store.claim("w1")
+        assert job["job_id"] == job_id
+        Worker(store=store)._run(job_id, job["url"], job["options"])
+    finally:
+        workflow.fetch_all, workflow.summarize = real
+    job = store.get(job_id)
+    assert job["status"] == "failed" and job["result"] == "Worker error: boom", job
+    assert set(job["sections"]) == {"onpage", "crawlability", "performance"}, job["sections"]
+
+
+def _change_feed(store) -> float:
+    ids = [store.submit(f"https://site-{i}.test/")[0] for i in range(JOBS)]
+    cursor, seen, done = store.version(), {}, threading.Event()
+
+    def poll():
+        nonlocal cursor
+        while True:
+            finished = done.is_set()
+            for job in store.changes_since(cursor):
+                cursor = max(cursor, job["version"])
+                seen[job["job_id"]] = max(seen.get(job["job_id"], 0), job["version"])
+            if finished:
+                return
+
+    def write(k):
+        for n in range(UPDATES):
+            for job_id in ids[k::WRITERS]:
+                store.update(job_id, {"status": "fetching_data", "result": None, "step": n})
+
+    poller = threading.Thread(target=poll)
+    poller.start()
+    t0 = time.perf_counter()
+    writers = [threading.Thread(target=write, args=(k,)) for k in range(WRITERS)]
+    for t in writers:
+        t.start()
+    for t in writers:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    done.set()
+    poller.join()
+    missed = [j for j in ids if seen.get(j) != store.get(j)["version"]]
+    assert not missed, f"{len(missed)} jobs' last change never reached the poller"
+    return JOBS * UPDATES / elapsed
+
+
+def main():
+    stores = []
+    with tempfile.TemporaryDirectory() as tmp:
+        stores.append(SQLiteJobStore(pathlib.Path(tmp) / "jobs.sqlite3"))
+        try:
+            import fakeredis
+            stores.append(RedisJobStore(client=fakeredis.FakeRedis(decode_responses=True)))
+        except ImportError:
+            print("fakeredis not installed: Redis store skipped")
+        for store in stores:
+            name = type(store).__name__
+            _lifecycle(store)
+            _worker_failure(store)
+            rate = _change_feed(store)
+            print(f"{name:<15} lifecycle and worker failure ok; {JOBS * UPDATES} concurrent updates "
+                  f"from {WRITERS} threads, {rate:7.0f}/s, every final version delivered")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_keywords.py
+"""
+Keyword engine (backend/keywords.py): stopword language handling and timing.
+
+Checks:
+- lang: built-in and bundled (<STOPWORDS_DIR>/<lang>.txt) languages are used
+  and reported; unknown codes and values that are not 2-3 letter codes (a path
+  like ../../etc/passwd) fall back to en without touching the file system
+  outside STOPWORDS_DIR, and are not cached; /onpage and /crawl-site answer
+  422 to a lang that is not a 2-3 letter code
+Timing: keyword_analysis() on a WORDS-word page, unigrams vs the full
+uni/bi/trigram analysis, and with a keyword, in ms per page (best of RUNS).
+
+Usage (from the repo root):
+    python -m benchmarks.bench_keywords
+"""
+
+import os, random, tempfile, time, pathlib
+
+_tmp = tempfile.TemporaryDirectory()
+_dir = pathlib.Path(_tmp.name) / "stopwords"
+_dir.mkdir()
+os.environ["STOPWORDS_DIR"] = str(_dir)  # before backend.keywords reads it
+(_dir / "it.txt").write_text("il\nlo\nla\ndi\nche\n", encoding="utf-8")
+(_dir.parent / "secret.txt").write_text("leaked\n", encoding="utf-8")  # outside STOPWORDS_DIR
+
+from collections import Counter
+from fastapi.testclient import TestClient
+from backend import keywords
+from backend.keywords import keyword_analysis, tokenize, stopwords_lang, get_stopwords
+from backend.main import app
+
+WORDS = 50000
+RUNS = 5
+
+
+def _lang_checks() -> None:
+    assert stopwords_lang("es") == "es" and "los" in get_stopwords("ES")
+    assert stopwords_lang("it") == "it" and get_stopwords("it") == frozenset({"il", "lo", "la", "di", "che"})
+    before = set(keywords._STOPWORDS)
+    for bad in ("xx", "../secret", "../../etc/passwd", "e", "engl", "en/../it", "", None):
+        assert stopwords_lang(bad) == "en", bad
+        assert get_stopwords(bad) is keywords._STOPWORDS["en"]
+    assert set(keywords._STOPWORDS) == before, set(keywords._STOPWORDS) - before
+
+    tokens = tokenize("la casa di la casa")
+    report = keyword_analysis(tokens, "la casa di la casa", None, None, {}, lang="xx")
+    assert report["lang"] == "en"
+    assert keyword_analysis(tokens, "la casa di la casa", None, None, {}, lang="IT")["lang"] == "it"
+
+    client = TestClient(app)
+    assert client.get("/onpage", params={"url": "https://a.test/", "lang": "../../etc/passwd"}).status_code == 422
+    assert client.post("/crawl-site", json={"url": "https://a.test/", "lang": "../x"}).status_code == 422
+
+
+def _page(n: int):
+    rng = random.Random(7)
+    vocab = [f"term{i}" for i in range(3000)] + ["the", "and", "for", "of", "to", "in"] * 50
+    weights = [1 / (i + 1) for i in range(len(vocab))]
+    text = " ".join(rng.choices(vocab, weights, k=n))
+    return text, {"h1": ["term0 term1"], "h2": ["term2 and term3"]}
+
+
+def _best(fn) -> float:
+    best = float("inf")
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    _lang_checks()
+    print("lang: built-in and bundled lists used; unknown and path-like values -> en, not cached; API 422")
+
+    body, headings = _page(WORDS)
+    tokens = tokenize(body)
+    stop = get_stopwords("en")
+    print(f"{WORDS} words, {len(set(tokens))} distinct")
+    print(f"tokenize             {_best(lambda: tokenize(body)):6.1f} ms")
+    print(f"unigrams (Counter)   {_best(lambda: Counter(t for t in tokens if len(t) >= 3 and t not in stop)):6.1f} ms")
+    full = _best(lambda: keyword_analysis(tokens, body, "Term0 guide", "All about term1", headings))
+    print(f"uni/bi/trigrams      {full:6.1f} ms")
+    print(f"with a keyword       {_best(lambda: keyword_analysis(tokens, body, 'Term0', None, headings, 'term5')):6.1f} ms")
+    _tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# benchmarks/bench_link_checker.py
+"""
+Link checker (backend/links.py) against a local server, vs one GET per href.
+
+The "page" has N hrefs over two host names of a local server (every response
+delayed by LATENCY_MS): live pages, 404s, a 301 -> 302 -> 200 chain, pages
+that answer HEAD with 405, and every href repeated REPEAT times (fragments
+and query order included). Checked three ways:
+- one GET per href over a keep-alive session, one after another (a naive checker)
+- LinkChecker, cold: deduped, HEAD first, concurrent with per-host limits
+- LinkChecker again for a second page: statuses come from the shared cache
+Results are checked for correctness (statuses, redirect chain, GET fallback)
+and the server's peak concurrent requests per host is compared with the limit.
+Then a starvation case: SLOW_LINKS links to one host that takes SLOW_MS per
+response are being checked when a second page with FAST_LINKS links on the
+other host comes in; the second page must finish in about one response time,
+not wait behind the slow host's queue.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_link_checker [N]
+"""
+
+import sys, time, tempfile, pathlib, threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+import requests
+from backend.cache import ResultCache
+from backend.links import LinkChecker
+from benchmarks._server import StubServer
+
+LATENCY_MS = 30
+REPEAT = 3
+PER_HOST = 4
+SLOW_MS = 200
+SLOW_LINKS, FAST_LINKS = 120, 10
+
+
+def _server():
+    active, peak, lock = Counter(), Counter(), threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _answer(self, head: bool):
+            host = self.headers.get("Host", "")
+            with lock:
+                active[host] += 1
+                peak[host] = max(peak[host], active[host])
+            try:
+                path = self.path.split("?", 1)[0]
+                time.sleep((SLOW_MS if path.startswith("/slow/") else LATENCY_MS) / 1000)
+                if path.startswith("/no-head/") and head:
+                    code, location = 405, None
+                elif path == "/old":
+                    code, location = 301, "/moved"
+                elif path == "/moved":
+                    code, location = 302, "/new"
+                elif path.startswith(("/ok/", "/slow/", "/no-head/")) or path == "/new":
+                    code, location = 200, None
+                else:
+                    code, location = 404, None
+                body = b"<html><body>" + b"x" * 20000 + b"</body></html>"
+                self.send_response(code)
+                if location:
+                    self.send_header("Location", location)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if not head:
+                    self.wfile.write(body)
+            finally:
+                with lock:
+                    active[host] -= 1
+
+        def do_HEAD(self):
+            self._answer(head=True)
+
+        def do_GET(self):
+            self._answer(head=False)
+
+        def log_message(self, *args):
+            pass
+
+    server = StubServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1], peak
+
+
+def _hrefs(port: int, n: int):
+    bases = [f"http://127.0.0.1:{port}", f"http://localhost:{port}"]
+    unique = []
+    for i in range(n):
+        base = bases[i % 2]
+        kind = i % 10
+        if kind < 6:
+            unique.append(f"{base}/ok/{i}?a=1&b=2")
+        elif kind < 8:
+            unique.append(f"{base}/gone/{i}")
+        elif kind == 8:
+            unique.append(f"{base}/no-head/{i}")
+        else:
+            unique.append(f"{base}/old?i={i}")
+    hrefs = []
+    for _ in range(REPEAT):
+        hrefs += unique
+    hrefs += [u.replace("?a=1&b=2", "?b=2&a=1") + "#section" for u in unique if "/ok/" in u]
+    return hrefs, unique
+
+
+def _starvation(port: int, cache) -> float:
+    """Seconds a FAST_LINKS page takes while SLOW_LINKS links to another host are queued."""
+    checker = LinkChecker(concurrency=32, per_host=PER_HOST, cache=cache)
+    slow = [f"http://127.0.0.1:{port}/slow/{i}" for i in range(SLOW_LINKS)]
+    fast = [f"http://localhost:{port}/ok/fast-{i}" for i in range(FAST_LINKS)]
+    busy = threading.Thread(target=checker.check, args=(slow,), kwargs={"limit": SLOW_LINKS})
+    busy.start()
+    time.sleep(0.1)  # the slow host's links are all queued
+    t0 = time.perf_counter()
+    report = checker.check(fast, limit=FAST_LINKS)
+    elapsed = time.perf_counter() - t0
+    busy.join()
+    checker.close()
+    assert report["checked"] == FAST_LINKS and report["broken"] == 0, report
+    return elapsed
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    server, port, peak = _server()
+    hrefs, unique = _hrefs(port, n)
+    print(f"{len(hrefs)} hrefs ({len(unique)} distinct links, 2 hosts), {LATENCY_MS} ms per response")
+
+    t0 = time.perf_counter()
+    naive, session = {}, requests.Session()
+    for href in hrefs:
+        r = session.get(href, timeout=10)
+        naive[href] = r.status_code
+    print(f"GET per href         {time.perf_counter() - t0:6.2f}s  {len(hrefs)} requests")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(pathlib.Path(tmp) / "cache.sqlite3")
+        checker = LinkChecker(concurrency=32, per_host=PER_HOST, cache=cache)
+        peak.clear()
+        t0 = time.perf_counter()
+        report = checker.check(hrefs, limit=10 * n)
+        cold = time.perf_counter() - t0
+        stats = checker.stats()
+        print(f"LinkChecker, cold    {cold:6.2f}s  {stats['head']} HEAD + {stats['get']} GET  "
+              f"peak per host {dict(peak)} (limit {PER_HOST})")
+
+        t0 = time.perf_counter()
+        warm = checker.check(list(reversed(unique)), limit=10 * n)
+        print(f"LinkChecker, cached  {time.perf_counter() - t0:6.2f}s  "
+              f"{warm['from_cache']}/{warm['checked']} from cache")
+        checker.close()
+
+        starved = _starvation(port, cache)
+        print(f"starvation           {starved:6.2f}s  for {FAST_LINKS} links on one host while "
+              f"{SLOW_LINKS} links to a {SLOW_MS} ms host are queued")
+
+    by_url = {link["url"]: link for link in report["links"]}
+    assert report["checked"] == len(unique), report["checked"]
+    assert report["broken"] == sum(1 for u in unique if "/gone/" in u)
+    assert all(naive[u] == by_url[u]["status"] for u in unique)
+    chain = next(link for link in report["links"] if "/old" in link["url"])
+    assert [hop["status"] for hop in chain["redirects"]] == [301, 302] and chain["final_url"].endswith("/new")
+    assert all(link["method"] == "GET" and link["ok"] for link in report["links"] if "/no-head/" in link["url"])
+    assert all(link["occurrences"] == REPEAT + ("/ok/" in link["url"]) for link in report["links"])
+    assert max(peak.values()) <= PER_HOST
+    assert starved < 4 * SLOW_MS / 1000, f"second page waited {starved:.2f}s behind the slow host"
+    print(f"checks: statuses match GET, redirect chain 301 -> 302 -> 200, HEAD 405 -> GET, "
+          f"{report['broken']} broken, repeats counted once")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
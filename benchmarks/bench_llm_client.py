@@ -0,0 +1,127 @@
+# benchmarks/bench_llm_client.py
+"""
+Ollama client (backend/llm.py) against a local fake Ollama server.
+
+The fake /api/generate streams NDJSON chunks, one token every TOKEN_MS, for a
+reply of TOKENS tokens with "### SLIDES END" on its own line half way through
+(a model that keeps talking after the slides). The prompt picks a behaviour:
+- "slides": the client must return the text up to the marker and hang up
+  there; the server counts how many tokens it got to send
+- "echo": the marker also appears inside a sentence first; only the one at the
+  start of a line ends the stream
+- "stall": the server stops sending after a few tokens; the read timeout must
+  end the call with LLMError
+- "garbage" / "truncated": a non-JSON or cut-off line mid-stream must end the
+  call with LLMError, not a JSONDecodeError
+Prints the time to the marker vs the time for the whole reply.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_llm_client
+"""
+
+import json, time, threading
+from http.server import BaseHTTPRequestHandler
+from backend.llm import OllamaClient, LLMError, SLIDES_END
+from benchmarks._server import StubServer
+
+TOKEN_MS = 5
+TOKENS = 400
+READ_TIMEOUT = 0.5
+
+
+def _reply(prompt: str):
+    half = TOKENS // 2
+    words = [f"word{i} " for i in range(TOKENS)]
+    words[half] = f"\n{SLIDES_END}\n"
+    if "echo" in prompt:
+        words[10] = f"remember the `{SLIDES_END}` marker "
+    return words
+
+
+class FakeOllama:
+    def __init__(self):
+        self.sent = {}  # prompt -> tokens written before the client hung up
+        self.lock = threading.Lock()
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _line(self, raw: bytes):
+                self.wfile.write(f"{len(raw):x}\r\n".encode() + raw + b"\r\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                prompt = body.get("prompt", "")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                sent = 0
+                try:
+                    for i, token in enumerate(_reply(prompt)):
+                        if "stall" in prompt and i == 5:
+                            time.sleep(READ_TIMEOUT * 4)
+                            break
+                        if "garbage" in prompt and i == 5:
+                            self._line(b"<html>proxy error</html>\n")
+                        elif "truncated" in prompt and i == 5:
+                            self._line(b'{"response": "wor\n')
+                        else:
+                            self._line(json.dumps({"response": token, "done": False}).encode() + b"\n")
+                        sent += 1
+                        time.sleep(TOKEN_MS / 1000)
+                    self._line(json.dumps({"response": "", "done": True}).encode() + b"\n")
+                    self._line(b"")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client hung up at the marker
+                with fake.lock:
+                    fake.sent[prompt] = sent
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    fake = FakeOllama()
+    server = StubServer(("127.0.0.1", 0), fake.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = OllamaClient(host=f"http://127.0.0.1:{server.server_address[1]}", model="fake",
+                          read_timeout=READ_TIMEOUT, total_timeout=30)
+    full = TOKENS * TOKEN_MS / 1000
+
+    t0 = time.perf_counter()
+    tokens = []
+    text = client.generate("slides", on_token=tokens.append)
+    elapsed = time.perf_counter() - t0
+    assert text.endswith(SLIDES_END) and text == "".join(tokens)[:len(text)], text[-60:]
+    assert "word0 " in text and f"word{TOKENS // 2 + 1}" not in text
+    time.sleep(0.2)
+    assert fake.sent["slides"] < TOKENS // 2 + 20, fake.sent  # stopped streaming soon after the marker
+    print(f"stop marker          {elapsed:5.2f}s  (whole reply {full:.2f}s), "
+          f"server sent {fake.sent['slides']}/{TOKENS} tokens")
+
+    text = client.generate("echo")
+    assert text.endswith(SLIDES_END) and f"word{TOKENS // 2 - 1}" in text, text[-60:]
+    print("marker mid-line      ignored; stream ended at the marker on its own line")
+
+    for prompt, expect in (("stall", "timed out"), ("garbage", "malformed"), ("truncated", "malformed")):
+        t0 = time.perf_counter()
+        try:
+            client.generate(prompt)
+        except LLMError as e:
+            message = str(e)
+        else:
+            raise AssertionError(f"{prompt}: no LLMError")
+        assert expect in message.lower(), message
+        print(f"{prompt:<20} LLMError after {time.perf_counter() - t0:4.2f}s: {message[:70]}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
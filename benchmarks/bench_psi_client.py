@@ -0,0 +1,207 @@
+# benchmarks/bench_psi_client.py
+"""
+PSI client (backend/psi_client.py) against a local stub PageSpeed server.
+
+The stub answers runPagespeed after LATENCY_MS with a minimal Lighthouse
+result and logs when each request arrives. Three checks:
+- shared backoff: one caller gets a 503 without Retry-After; a second caller
+  that starts right after must not reach the server before the backoff is over
+- Retry-After: one caller gets a 429 with Retry-After: RETRY_AFTER s; neither
+  it nor any other caller is sent before the pause ends, and it is counted
+- priorities: with the token bucket empty, BATCH batch calls queue first and
+  INTERACTIVE interactive calls right after; the interactive ones must reach
+  the server first, the batch ones after them in the order they queued
+- shared budget: PROCESSES clients, each with its own connection to one job
+  store (SQLite, and Redis on fakeredis), as separate worker processes have,
+  make CALLS calls each against a daily quota of PER_DAY: exactly PER_DAY reach
+  the server, at no more than the shared rate; a Retry-After received by one
+  client pauses the others; without the store every call goes through, each
+  client having a quota of its own
+Prints when each request arrived relative to the throttling response.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_psi_client
+"""
+
+import json, time, pathlib, tempfile, threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler
+from backend.jobs import SQLiteJobStore, RedisJobStore
+from backend.psi_client import PSIClient, QuotaExceeded, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+from benchmarks._server import StubServer
+
+LATENCY_MS = 20
+RETRY_AFTER = 2
+BACKOFF = 1.0  # the client's first backoff without Retry-After
+TOLERANCE = 0.05
+BATCH, INTERACTIVE = 4, 4
+PROCESSES, CALLS, PER_DAY, SHARED_RATE = 3, 5, 8, 10
+
+
+class StubPSI:
+    """runPagespeed stub; /throttle-503 and /throttle-429 pages fail on their first request."""
+
+    def __init__(self):
+        self.arrivals = []  # (monotonic time, page url, status sent)
+        self.throttled_at = {}  # page url -> time its failure was sent
+        self.lock = threading.Lock()
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                arrived = time.monotonic()
+                page = parse_qs(urlsplit(self.path).query)["url"][0]
+                with stub.lock:
+                    first = page not in stub.throttled_at and "/throttle-" in page
+                    code = (429 if page.endswith("429") else 503) if first else 200
+                    stub.arrivals.append((arrived, page, code))
+                time.sleep(LATENCY_MS / 1000)
+                body = {"lighthouseResult": {"categories": {"performance": {"score": 0.9}}, "audits": {}}}
+                raw = json.dumps(body if code == 200 else {"error": {"code": code}}).encode()
+                self.send_response(code)
+                if code == 429:
+                    self.send_header("Retry-After", str(RETRY_AFTER))
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+                if first:
+                    with stub.lock:
+                        stub.throttled_at[page] = time.monotonic()
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def after(self, page: str):
+        """Arrival times after `page`'s throttling response, per page."""
+        t0 = self.throttled_at[page]
+        return [(round(t - t0, 2), url, code) for t, url, code in self.arrivals if t > t0]
+
+
+def serve(stub: StubPSI):
+    server = StubServer(("127.0.0.1", 0), stub.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/runPagespeed"
+
+
+def _call(client: PSIClient, url: str, priority: int = PRIORITY_INTERACTIVE) -> threading.Thread:
+    t = threading.Thread(target=client.run_pagespeed, args=(url, "mobile", ["performance"]),
+                         kwargs={"priority": priority}, daemon=True)
+    t.start()
+    return t
+
+
+def _throttle_check(base: str, kind: str, pause: float) -> PSIClient:
+    """Caller A is throttled; caller B, started right after, waits out the same pause."""
+    stub = StubPSI()
+    server, endpoint = serve(stub)
+    client = PSIClient(base_url=endpoint, api_key="stub", rate_per_sec=100, burst=100)
+    throttled = f"{base}/throttle-{kind}"
+    a = _call(client, throttled)
+    deadline = time.monotonic() + 10
+    while not client.stats()["paused_for_s"] and time.monotonic() < deadline:
+        time.sleep(0.005)  # A has its throttling answer and the client is paused
+    b = _call(client, f"{base}/other")
+    a.join(30)
+    b.join(30)
+    server.shutdown()
+    later = stub.after(throttled)
+    print(f"{kind}: requests after the throttling response (s, page, status): {later}")
+    assert sorted(url for _, url, _ in later) == [f"{base}/other", throttled], later
+    assert all(dt >= pause - TOLERANCE for dt, _, _ in later), f"a caller was sent during the {pause}s pause"
+    return client
+
+
+def _priority_check(base: str):
+    stub = StubPSI()
+    server, endpoint = serve(stub)
+    client = PSIClient(base_url=endpoint, api_key="stub", rate_per_sec=4, burst=1)
+    client.run_pagespeed(f"{base}/warmup", "mobile", ["performance"])  # bucket now empty
+    threads = []
+    for i in range(BATCH):
+        threads.append(_call(client, f"{base}/batch-{i}", PRIORITY_BATCH))
+        time.sleep(0.01)  # queue in a known order
+    for i in range(INTERACTIVE):
+        threads.append(_call(client, f"{base}/interactive-{i}", PRIORITY_INTERACTIVE))
+        time.sleep(0.01)
+    for t in threads:
+        t.join(30)
+    server.shutdown()
+    order = [url.rsplit("/", 1)[1] for _, url, _ in stub.arrivals[1:]]
+    print(f"priorities: arrival order {order}")
+    assert order == [f"interactive-{i}" for i in range(INTERACTIVE)] + [f"batch-{i}" for i in range(BATCH)], order
+
+
+def _shared_check(base: str, stores) -> int:
+    """PROCESSES clients on `stores` (None: no shared store); returns how many calls reached the server."""
+    stub = StubPSI()
+    server, endpoint = serve(stub)
+    clients = [PSIClient(base_url=endpoint, api_key="stub", rate_per_sec=SHARED_RATE, burst=2, per_day=PER_DAY,
+                         limits=store) for store in stores]
+    rejected = []
+
+    def run(k, pages):
+        for page in pages:
+            try:
+                clients[k].run_pagespeed(page, "mobile", ["performance"])
+            except QuotaExceeded:
+                rejected.append(page)
+
+    # one client gets a 429 with Retry-After first; the others start once it is paused
+    first = threading.Thread(target=run, args=(0, [f"{base}/throttle-429"]))
+    first.start()
+    deadline = time.monotonic() + 10
+    while not clients[-1].stats()["paused_for_s"] and time.monotonic() < deadline and stores[0] is not None:
+        time.sleep(0.005)
+    threads = [threading.Thread(target=run, args=(k, [f"{base}/p{k}-{i}" for i in range(CALLS)]))
+               for k in range(len(clients))]
+    for t in threads:
+        t.start()
+    for t in threads + [first]:
+        t.join(60)
+    server.shutdown()
+    arrivals = sorted(t for t, _, _ in stub.arrivals)
+    if stores[0] is not None:
+        later = stub.after(f"{base}/throttle-429")
+        assert all(dt >= RETRY_AFTER - TOLERANCE for dt, _, _ in later), f"sent during the pause: {later}"
+        span = arrivals[-1] - arrivals[0] - RETRY_AFTER
+        # the 429 spent one request of the quota: PER_DAY - 1 calls served, the rest rejected
+        assert len(arrivals) == PER_DAY and len(rejected) == PROCESSES * CALLS + 1 - (PER_DAY - 1), rejected
+        assert len(arrivals) <= 1 + 2 + SHARED_RATE * span + 1, f"{len(arrivals)} requests in {span:.2f}s"
+    return len(stub.arrivals)
+
+
+def main():
+    base = "https://site.test"
+    _throttle_check(base, "503", BACKOFF)
+    client = _throttle_check(base, "429", RETRY_AFTER)
+    stats = client.stats()
+    assert stats["retry_after_honored"] == 1 and stats["throttled"] == 1, stats
+    print(f"checks: backoff shared across callers, Retry-After: {RETRY_AFTER} honoured "
+          f"(retry_after_honored={stats['retry_after_honored']})")
+    _priority_check(base)
+    print("checks: interactive calls admitted before batch calls that queued earlier")
+
+    print(f"shared budget: {PROCESSES} clients x {CALLS} calls, daily quota {PER_DAY}, {SHARED_RATE}/s")
+    print(f"  per process (no store)  {_shared_check(base, [None] * PROCESSES):3d} requests reached the server")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = pathlib.Path(tmp) / "jobs.sqlite3"
+        sent = _shared_check(base, [SQLiteJobStore(db) for _ in range(PROCESSES)])
+        print(f"  shared, SQLite          {sent:3d} requests reached the server (the quota), none during the pause")
+    try:
+        import fakeredis
+    except ImportError:
+        print("  fakeredis not installed: Redis store skipped")
+    else:
+        fake = fakeredis.FakeServer()
+        sent = _shared_check(base, [RedisJobStore(client=fakeredis.FakeRedis(server=fake, decode_responses=True))
+                                    for _ in range(PROCESSES)])
+        print(f"  shared, Redis           {sent:3d} requests reached the server (the quota), none during the pause")
+
+
+if __name__ == "__main__":
+    main()
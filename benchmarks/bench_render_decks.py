@@ -0,0 +1,60 @@
+# benchmarks/bench_render_decks.py
+"""
+Local deck rendering throughput (core.logic.render_deck).
+
+Renders a typical 8-slide report plus the metrics chart N times with the
+template bytes cached in memory, then N times re-reading the template for
+every deck (what an uncached renderer would do), and checks the output once.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_render_decks [N]
+"""
+
+import io, sys, time, statistics
+from pptx import Presentation
+from core import logic
+from core.logic import parse_slides, render_deck
+
+SLIDES = "\n\n".join(
+    f"## Slide {i}: Section {i}\n"
+    + "\n".join(f"- Finding {i}.{j}: the **page** scores well on check {j}." for j in range(1, 5))
+    + f"\n*Key Takeaway*: One sentence about section {i}."
+    for i in range(1, 9)
+)
+METRICS = {
+    "mobile": {"performance": 54, "seo": 92, "accessibility": 88, "best_practices": 79},
+    "desktop": {"performance": 87, "seo": 92, "accessibility": 90, "best_practices": 83},
+}
+
+
+def _run(n: int, cached: bool):
+    times = []
+    for _ in range(n):
+        if not cached:
+            logic._template_bytes.cache_clear()
+        t0 = time.perf_counter()
+        render_deck(parse_slides(SLIDES), metrics=METRICS, title="SEO Audit: https://example.com")
+        times.append((time.perf_counter() - t0) * 1000)
+    return times
+
+
+def _report(label: str, times):
+    times = sorted(times)
+    p95 = times[int(len(times) * 0.95) - 1]
+    print(f"{label:<20} total {sum(times) / 1000:7.2f}s  mean {statistics.mean(times):6.2f}ms  "
+          f"p50 {statistics.median(times):6.2f}ms  p95 {p95:6.2f}ms")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    deck = Presentation(io.BytesIO(render_deck(parse_slides(SLIDES), metrics=METRICS)))
+    charts = sum(1 for s in deck.slides for sh in s.shapes if sh.has_chart)
+    print(f"deck: {len(deck.slides)} slides, {charts} chart(s); rendering {n} decks per mode")
+
+    _run(5, cached=True)  # warm imports and the template cache
+    _report("cached template", _run(n, cached=True))
+    _report("template per deck", _run(n, cached=False))
+
+
+if __name__ == "__main__":
+    main()
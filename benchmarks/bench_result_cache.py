@@ -0,0 +1,74 @@
+# benchmarks/bench_result_cache.py
+"""
+Result cache writes (backend/cache.py) on a large table.
+
+Fills a temp cache with ROWS entries (about ROW_BYTES each, half of them
+already expired), then times PUTS single put() calls:
+- sweeping on every put (sweep_interval=0, what put() used to do: a DELETE of
+  expired rows plus SUM(size) over the table each time)
+- with the running size total and a periodic sweep (the default)
+Checks that expired rows are still dropped once a sweep is due, that a write
+pushing the cache over max_bytes evicts it back under budget right away, and
+that evicted and fresh entries read back as expected.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_result_cache [ROWS]
+"""
+
+import sys, time, pathlib, tempfile
+from backend.cache import ResultCache
+
+ROW_BYTES = 500
+PUTS = 2000
+SWEEP_INTERVAL = 0.5
+
+
+def _fill(cache: ResultCache, rows: int) -> None:
+    value = "x" * ROW_BYTES
+    cache.put_many("onpage", {f"live-{i}": value for i in range(rows // 2)})
+    cache.put_many("onpage", {f"old-{i}": value for i in range(rows // 2)}, ttls={f"old-{i}": -1 for i in range(rows // 2)})
+
+
+def _time_puts(cache: ResultCache) -> float:
+    value = "y" * ROW_BYTES
+    t0 = time.perf_counter()
+    for i in range(PUTS):
+        cache.put("onpage", f"new-{i}", value)
+    return (time.perf_counter() - t0) / PUTS * 1e6
+
+
+def _count(cache: ResultCache, prefix: str) -> int:
+    return cache._db().execute("SELECT COUNT(*) FROM results WHERE key LIKE ?", (prefix + "%",)).fetchone()[0]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    print(f"{rows} rows of ~{ROW_BYTES} bytes (half expired), {PUTS} puts")
+    with tempfile.TemporaryDirectory() as tmp:
+        timings = {}
+        for label, interval in (("sweep on every put", 0), ("periodic sweep", SWEEP_INTERVAL)):
+            cache = ResultCache(pathlib.Path(tmp) / f"{interval}.sqlite3", max_bytes=1 << 30, sweep_interval=interval)
+            cache.sweep_interval = 3600  # no sweep while filling
+            _fill(cache, rows)
+            cache.sweep_interval = interval
+            cache._swept_at = time.monotonic()
+            timings[label] = _time_puts(cache)
+            print(f"{label:<20} {timings[label]:8.1f} us per put")
+
+        assert _count(cache, "old-") == rows // 2  # not swept yet: the interval has not passed
+        time.sleep(SWEEP_INTERVAL)
+        cache.put("onpage", "trigger", "z")
+        assert _count(cache, "old-") == 0 and cache.get("onpage", "live-0") == "x" * ROW_BYTES
+        print(f"expired rows swept once the {SWEEP_INTERVAL}s interval passed")
+
+        cache.max_bytes = (rows // 2 + PUTS) * ROW_BYTES  # about full
+        cache.put_many("onpage", {f"big-{i}": "b" * ROW_BYTES for i in range(rows // 10)})
+        total = cache.stats()["total_bytes"]
+        assert total <= cache.max_bytes and cache.get("onpage", f"big-{rows // 10 - 1}") is not None, total
+        assert cache.get("onpage", "live-1") is None  # least recently used, evicted
+        print(f"over budget: evicted {cache.stats()['evicted']} rows on the write, {total / 1e6:.1f} MB "
+              f"<= {cache.max_bytes / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# benchmarks/bench_site_crawler.py
+"""
+Fixture-site check + benchmark for the site crawler (backend/site_crawler.py).
+
+Generates an N-page site on a local HTTP server (every response delayed by
+LATENCY_MS): each page links to LINKS other pages, to itself with a fragment,
+to a /private/ page that robots.txt disallows, to a missing page, an image,
+an external host and a mailto: address. The crawl output is checked against
+a breadth-first walk of the same link graph (every reachable page exactly
+once, nothing disallowed or off-site fetched), then timed against the
+one-page-at-a-time loop the single-URL /onpage path implies.
+Finally the seen-URL set is sized at 100k URLs against a set of the
+normalized URL strings.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_site_crawler [N] [MAX_DEPTH]
+"""
+
+import sys, json, time, tempfile, pathlib, threading, tracemalloc
+from collections import deque
+from http.server import BaseHTTPRequestHandler
+import requests
+from backend.cache import normalize_url
+from backend.onpage import analyze_html
+from backend.site_crawler import SeenUrls, crawl_site
+from benchmarks._server import StubServer
+
+LATENCY_MS = 20
+LINKS = 8
+WORDS = ("crawler audit sitemap robots canonical heading content search ranking page "
+         "speed mobile desktop index follow link anchor title meta description").split()
+
+
+def _links(i: int, n: int):
+    return [(i * 7 + k * 13 + 1) % n for k in range(LINKS)]
+
+
+def _page(i: int, n: int) -> bytes:
+    body = " ".join(WORDS[(i + j) % len(WORDS)] for j in range(300))
+    links = "".join(f'<li><a href="/p/{j}">Page {j}</a></li>' for j in _links(i, n))
+    extras = (f'<a href="/p/{i}#top">top</a><a href="/private/{i}">private</a><a href="/missing/{i}">gone</a>'
+              f'<a href="/static/logo.png">logo</a><a href="https://external.test/{i}">ext</a>'
+              '<a href="mailto:team@example.test">mail</a>')
+    return (f"<!doctype html><html><head><title>Fixture page {i} of the generated crawl site</title>"
+            f'<meta name="description" content="Page {i}"></head><body><h1>Page {i}</h1>'
+            f"<p>{body}</p><ul>{links}</ul>{extras}</body></html>").encode()
+
+
+def _server(n: int):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like a real site
+
+        def do_GET(self):
+            time.sleep(LATENCY_MS / 1000)
+            ctype = "text/html; charset=utf-8"
+            if self.path == "/robots.txt":
+                body, ctype = b"User-agent: *\nDisallow: /private/\n", "text/plain"
+            elif self.path.startswith("/p/") and self.path[3:].isdigit() and int(self.path[3:]) < n:
+                body = _page(int(self.path[3:]), n)
+            elif self.path.startswith("/private/"):
+                body = b"<html><title>should never be fetched</title></html>"
+            elif self.path == "/static/logo.png":
+                body, ctype = b"\x89PNG\r\n\x1a\n", "image/png"
+            else:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = StubServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _expected(n: int, max_depth: int):
+    """Paths a correct crawl fetches: reachable pages plus the extras they link to."""
+    depth = {0: 0}
+    todo = deque([0])
+    while todo:
+        i = todo.popleft()
+        if depth[i] >= max_depth:
+            continue
+        for j in _links(i, n):
+            if j not in depth:
+                depth[j] = depth[i] + 1
+                todo.append(j)
+    paths = {f"/p/{i}" for i in depth}
+    for i, d in depth.items():
+        if d < max_depth:
+            paths |= {f"/missing/{i}", "/static/logo.png"}
+    return paths
+
+
+def _sequential(base: str, n: int, max_depth: int) -> int:
+    """One page at a time: fetch, analyze, follow the internal links."""
+    seen, todo, pages = {f"{base}/p/0"}, deque([(f"{base}/p/0", 0)]), 0
+    session = requests.Session()
+    while todo:
+        url, depth = todo.popleft()
+        r = session.get(url, timeout=15)
+        pages += 1
+        if not r.ok or "html" not in r.headers.get("Content-Type", ""):
+            continue
+        analyze_html(url, r.text)
+        if depth >= max_depth:
+            continue
+        for j in _links(int(url.rsplit("/", 1)[1]), n):
+            link = f"{base}/p/{j}"
+            if link not in seen:
+                seen.add(link)
+                todo.append((link, depth + 1))
+    return pages
+
+
+def _check(base: str, out: pathlib.Path, summary: dict, n: int, max_depth: int) -> None:
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+    paths = [r["url"][len(base):] for r in records]
+    expected = _expected(n, max_depth)
+    assert len(paths) == len(set(paths)), "a URL was crawled twice"
+    assert set(paths) == expected, f"missing {sorted(expected - set(paths))[:5]} extra {sorted(set(paths) - expected)[:5]}"
+    assert all(r.get("onpage") for r in records if r["url"].split("/")[-2] == "p"), "a page was not analyzed"
+    assert summary["skipped_robots"] > 0 and summary["statuses"].get("404")
+    print(f"fixture check: {len(paths)} URLs, each once; /private/ and off-site links never fetched")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    max_depth = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    server, base = _server(n)
+    print(f"{n}-page fixture site, {LINKS} links per page, {LATENCY_MS} ms per response")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = pathlib.Path(tmp) / "crawl.ndjson"
+        summary = crawl_site(f"{base}/p/0", out, max_pages=10 * n, max_depth=max_depth, concurrency=8,
+                             per_host=8, host_delay=0)
+        _check(base, out, summary, n, max_depth)
+        print(f"async crawler        {summary['pages']:6d} pages  {summary['elapsed_ms'] / 1000:6.2f}s  "
+              f"issues {summary['issues']}")
+
+    t0 = time.perf_counter()
+    pages = _sequential(base, n, max_depth)
+    print(f"one page at a time   {pages:6d} pages  {time.perf_counter() - t0:6.2f}s  (HTML pages only)")
+    server.shutdown()
+
+    urls = [f"https://www.example.com/category-{i % 97}/product-{i}?ref=nav&page={i % 7}" for i in range(100_000)]
+    for label, build in (("set of URL strings", lambda: {normalize_url(u) for u in urls}),
+                         ("SeenUrls (64-bit)", lambda: _seen(urls))):
+        tracemalloc.start()
+        kept = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{label:<20} {len(kept):7d} URLs  {size / 1e6:6.1f} MB")
+
+
+def _seen(urls):
+    seen = SeenUrls()
+    for u in urls:
+        seen.add(u)
+    return seen
+
+
+if __name__ == "__main__":
+    main()
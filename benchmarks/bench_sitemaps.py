@@ -0,0 +1,111 @@
+# benchmarks/bench_sitemaps.py
+"""
+Sequential whole-document sitemap parsing vs the streaming engine (backend/sitemaps.py).
+
+Serves a robots.txt, a sitemap index and N gzipped child sitemaps of M URLs
+each from a local HTTP server (every response delayed by LATENCY_MS to stand
+in for a remote host). Both sides count every URL: the old way fetches one
+file at a time and builds each tree with ET.fromstring; the engine streams
+and parses children concurrently. Prints wall time and, from a second
+traced run, peak Python memory.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_sitemaps [N] [M]
+"""
+
+import sys, gzip, time, threading, tracemalloc
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler
+import requests
+from backend.sitemaps import SitemapFetcher
+from benchmarks._server import StubServer
+
+LATENCY_MS = 50
+
+
+def _urlset(i: int, m: int) -> bytes:
+    rows = "".join(
+        f"<url><loc>https://example.test/s{i}/page-{j}</loc><lastmod>2024-{1 + j % 12:02d}-15</lastmod>"
+        f"<image:image><image:loc>https://example.test/img/{i}-{j}.jpg</image:loc></image:image></url>"
+        for j in range(m)
+    )
+    return gzip.compress(('<?xml version="1.0" encoding="UTF-8"?>'
+                          '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+                          'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">'
+                          f"{rows}</urlset>").encode())
+
+
+def _server(n: int, m: int):
+    files = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(LATENCY_MS / 1000)
+            base = f"http://127.0.0.1:{self.server.server_address[1]}"
+            if self.path == "/robots.txt":
+                body = f"User-agent: *\nDisallow:\nSitemap: {base}/sitemap_index.xml\n".encode()
+            elif self.path == "/sitemap_index.xml":
+                body = ('<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                        + "".join(f"<sitemap><loc>{base}/sitemap-{i}.xml.gz</loc></sitemap>" for i in range(n))
+                        + "</sitemapindex>").encode()
+            elif self.path.startswith("/sitemap-"):
+                body = files[self.path]
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    for i in range(n):
+        files[f"/sitemap-{i}.xml.gz"] = _urlset(i, m)
+    server = StubServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _sequential(url: str) -> int:
+    """The old fetch_sitemap() loop, without its 10-URL early exit."""
+    total = 0
+    robots = requests.get(f"{url}/robots.txt", timeout=10).text
+    for line in robots.splitlines():
+        if line.lower().startswith("sitemap:"):
+            root = ET.fromstring(requests.get(line.split(":", 1)[1].strip(), timeout=10).content)
+            for sitemap in root.findall(".//{*}sitemap/{*}loc"):
+                nested = requests.get(sitemap.text.strip(), timeout=10).content
+                nested_root = ET.fromstring(gzip.decompress(nested))
+                total += len(nested_root.findall(".//{*}url/{*}loc"))
+    return total
+
+
+def _measure(label: str, fn):
+    t0 = time.perf_counter()
+    total = fn()
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()  # separate run: tracing slows Python-level callbacks far more than C parsing
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<22} {total:8d} URLs  {elapsed:6.2f}s  peak {peak / 1e6:7.1f} MB")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    m = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    server, url = _server(n, m)
+    print(f"{n} child sitemaps x {m} URLs, {LATENCY_MS} ms per response")
+    _measure("sequential fromstring", lambda: _sequential(url))
+    fetcher = SitemapFetcher()
+    summary = {}
+    _measure("streaming engine", lambda: summary.update(fetcher.summarize(url)) or summary["total_urls"])
+    print("lastmod:", summary["lastmod"])
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,146 @@
+"""
+Local PPTX deck renderer (alternative to the Gamma upload)
+- parse_slides(): splits the LLM's `## Slide N: Title` markdown into slides
+  (bullets, optional *Key Takeaway*, anything else goes to the speaker notes)
+- render_deck(): title slide, one bullet slide per section and a metrics chart
+  slide built from the PSI scores; returns the .pptx bytes
+- The template (PPTX_TEMPLATE, else python-pptx's default) is read once and
+  kept in memory; each deck is opened from those bytes
+- generate_presentation() keeps its old signature: plain text with no slide
+  headings still gives the single title slide
+"""
+
+import io, os, re
+from functools import lru_cache
 from pptx import Presentation
+from pptx.chart.data import CategoryChartData
+from pptx.enum.chart import XL_CHART_TYPE, XL_LEGEND_POSITION
+from pptx.util import Inches, Pt
+
+TEMPLATE_PATH = os.getenv("PPTX_TEMPLATE")  # optional .pptx with the standard layouts
+TITLE_LAYOUT, BULLET_LAYOUT, TITLE_ONLY_LAYOUT = 0, 1, 5
+SCORE_LABELS = (("performance", "Performance"), ("seo", "SEO"),
+                ("accessibility", "Accessibility"), ("best_practices", "Best practices"))
+
+_SLIDE_RE = re.compile(r"^##\s*Slide\s*\d+\s*[:.\-]?\s*(.*)$", re.IGNORECASE | re.MULTILINE)
+_BULLET_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+(.*)$")
+_TAKEAWAY_RE = re.compile(r"^\s*\**\s*key takeaway\s*\**\s*:?\s*\**\s*(.*)$", re.IGNORECASE)
+
+
+def _strip_md(text: str) -> str:
+    return re.sub(r"(\*\*|__|`)", "", text).strip()
+
+
+def parse_slides(markdown: str) -> list:
+    """[{"title", "bullets", "takeaway", "notes"}] for every `## Slide N` section."""
+    matches = list(_SLIDE_RE.finditer(markdown or ""))
+    slides = []
+    for i, m in enumerate(matches):
+        body = markdown[m.end():matches[i + 1].start() if i + 1 < len(matches) else len(markdown)]
+        bullets, notes, takeaway = [], [], None
+        for line in body.splitlines():
+            if not line.strip() or line.strip().startswith("###"):
+                continue
+            t = _TAKEAWAY_RE.match(line)
+            if t:
+                takeaway = _strip_md(t.group(1).lstrip("*: "))
+                continue
+            b = _BULLET_RE.match(line)
+            if b:
+                bullets.append(_strip_md(b.group(1)))
+            else:
+                notes.append(_strip_md(line))
+        slides.append({"title": _strip_md(m.group(1)) or f"Slide {i + 1}",
+                       "bullets": bullets, "takeaway": takeaway, "notes": "\n".join(notes)})
+    return slides
+
+
+@lru_cache(maxsize=8)
+def _template_bytes(path: str = None) -> bytes:
+    """Template file contents, read once per process."""
+    if path:
+        with open(path, "rb") as f:
+            return f.read()
+    buf = io.BytesIO()
+    Presentation().save(buf)
+    return buf.getvalue()
+
+
+def _new_presentation(template: str = None):
+    return Presentation(io.BytesIO(_template_bytes(template or TEMPLATE_PATH)))
+
+
+def _add_bullet_slide(prs, slide: dict) -> None:
+    s = prs.slides.add_slide(prs.slide_layouts[BULLET_LAYOUT])
+    s.shapes.title.text = slide["title"]
+    frame = s.placeholders[1].text_frame
+    lines = slide["bullets"] or ([slide["notes"]] if slide["notes"] else [])
+    for j, text in enumerate(lines):
+        p = frame.paragraphs[0] if j == 0 else frame.add_paragraph()
+        p.text = text
+        p.font.size = Pt(18 if len(lines) <= 5 else 16)
+    if slide["takeaway"]:
+        p = frame.add_paragraph()
+        p.text = f"Key takeaway: {slide['takeaway']}"
+        p.font.bold = True
+        p.font.size = Pt(16)
+    if slide["notes"]:
+        s.notes_slide.notes_text_frame.text = slide["notes"]
+
+
+def _add_metrics_slide(prs, metrics: dict) -> None:
+    """Clustered column chart of the PSI category scores, one series per strategy."""
+    data = CategoryChartData()
+    data.categories = [label for _, label in SCORE_LABELS]
+    for strategy in ("mobile", "desktop"):
+        scores = metrics.get(strategy)
+        if scores:
+            data.add_series(strategy.capitalize(), [scores.get(key) or 0 for key, _ in SCORE_LABELS])
+    s = prs.slides.add_slide(prs.slide_layouts[TITLE_ONLY_LAYOUT])
+    s.shapes.title.text = "Lighthouse Scores"
+    chart = s.shapes.add_chart(XL_CHART_TYPE.COLUMN_CLUSTERED, Inches(0.7), Inches(1.6),
+                               prs.slide_width - Inches(1.4), prs.slide_height - Inches(2.2), data).chart
+    chart.has_legend = True
+    chart.legend.position = XL_LEGEND_POSITION.BOTTOM
+    chart.legend.include_in_layout = False
+    chart.value_axis.maximum_scale = 100
+    chart.value_axis.minimum_scale = 0
+    chart.plots[0].has_data_labels = True
+
+
+def render_deck(slides: list, metrics: dict = None, title: str = "SEO Audit",
+                subtitle: str = "", template: str = None) -> bytes:
+    """Build the deck and return it as .pptx bytes.
+
+    `metrics` is {"mobile": {"performance": int, ...}, "desktop": {...}} (PSI scores);
+    the chart slide goes right after the first content slide.
+    """
+    prs = _new_presentation(template)
+    cover = prs.slides.add_slide(prs.slide_layouts[TITLE_LAYOUT])
+    cover.shapes.title.text = title
+    cover.placeholders[1].text = subtitle
+
+    for i, slide in enumerate(slides):
+        _add_bullet_slide(prs, slide)
+        if i == 0 and metrics and any(metrics.values()):
+            _add_metrics_slide(prs, metrics)
+    if not slides and metrics and any(metrics.values()):
+        _add_metrics_slide(prs, metrics)
+
+    buf = io.BytesIO()
+    prs.save(buf)
+    return buf.getvalue()
 
-def generate_presentation(content: str, filename="output.pptx"):
-    prs = Presentation()
 
-    # Title slide
-    slide_layout = prs.slide_layouts[0]  # title layout
-    slide = prs.slides.add_slide(slide_layout)
-    title = slide.shapes.title
-    subtitle = slide.placeholders[1]
-    title.text = "Hackathon Demo"
-    subtitle.text = content
+def generate_presentation(content: str, filename="output.pptx", metrics: dict = None,
+                          title: str = "Hackathon Demo"):
+    slides = parse_slides(content)
+    if slides:
+        deck = render_deck(slides, metrics=metrics, title=title)
+    else:
+        deck = render_deck([], metrics=metrics, title=title, subtitle=content)
 
     # Save file
-    prs.save(filename)
+    with open(filename, "wb") as f:
+        f.write(deck)
     return filename
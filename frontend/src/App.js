@@ -33,57 +33,137 @@ function ResultCard({ url }) {
   );
 }
 
+// Sections arrive as each analyzer finishes, long before the presentation.
+function PartialResults({ sections }) {
+  const onpage = sections.onpage && sections.onpage.onpage;
+  const crawl = sections.crawlability && sections.crawlability.crawlability;
+  const pagespeed = sections.performance && sections.performance.pagespeed;
+  if (!onpage && !crawl && !pagespeed) return null;
+
+  return (
+    <div className="partial-results">
+      {pagespeed && (
+        <div className="partial-section">
+          <h3>⚡ Performance</h3>
+          {["mobile", "desktop"].map((strategy) =>
+            pagespeed[strategy] ? (
+              <p key={strategy}>
+                {strategy}: performance {pagespeed[strategy].scores.performance} · SEO{" "}
+                {pagespeed[strategy].scores.seo} · accessibility {pagespeed[strategy].scores.accessibility}
+              </p>
+            ) : null
+          )}
+        </div>
+      )}
+      {crawl && (
+        <div className="partial-section">
+          <h3>🕷️ Crawlability</h3>
+          <p>
+            {crawl.summary.status}: {crawl.summary.notes.join(", ")}
+          </p>
+        </div>
+      )}
+      {onpage && (
+        <div className="partial-section">
+          <h3>📄 On-page</h3>
+          <p>
+            {onpage.word_count} words · {onpage.internal_links} internal / {onpage.external_links} external
+            links · title {onpage.title_status || "missing"}
+          </p>
+        </div>
+      )}
+    </div>
+  );
+}
+
 function App() {
   const [url, setUrl] = useState("");
   const [status, setStatus] = useState("🔍 Analyze SEO of any site instantly");
   const [isLoading, setIsLoading] = useState(false);
   const [finalUrl, setFinalUrl] = useState("");
+  const [sections, setSections] = useState({});
 
-  const pollingIntervalRef = useRef();
+  const eventSourceRef = useRef();
+  const stoppedRef = useRef(false);
 
   useEffect(() => {
     return () => {
-      if (pollingIntervalRef.current) clearInterval(pollingIntervalRef.current);
+      stoppedRef.current = true;
+      if (eventSourceRef.current) eventSourceRef.current.close();
     };
   }, []);
 
-  const pollStatus = (jobId) => {
-    pollingIntervalRef.current = setInterval(async () => {
+  // Returns true once the job has finished (complete or failed).
+  const applyStatus = (data) => {
+    if (data.sections) setSections(data.sections);
+    switch (data.status) {
+      case "fetching_data":
+        setStatus("Step 1/3: 📡 Fetching SEO data...");
+        return false;
+      case "generating_text":
+        setStatus("Step 2/3: 🧠 Generating insights with AI...");
+        return false;
+      case "creating_presentation":
+        setStatus("Step 3/3: 🎨 Creating your presentation...");
+        return false;
+      case "complete":
+        setStatus("✅ Report complete!");
+        setFinalUrl(data.result);
+        setIsLoading(false);
+        return true;
+      case "failed":
+        setStatus(`❌ Report failed: ${data.result}`);
+        setIsLoading(false);
+        return true;
+      case "not_found":
+        setStatus("⚠️ Error: Report job not found.");
+        setIsLoading(false);
+        return true;
+      default:
+        setStatus("⏳ Waiting in queue...");
+        return false;
+    }
+  };
+
+  // Fallback when EventSource is unavailable or the stream breaks:
+  // long-poll, each request returns as soon as the job changes.
+  const longPoll = async (jobId, since = 0) => {
+    while (!stoppedRef.current) {
       try {
-        const response = await fetch(`http://127.0.0.1:8000/report-status/${jobId}`);
+        const response = await fetch(
+          `http://127.0.0.1:8000/report-status/${jobId}?wait=25&since=${since}`
+        );
         if (!response.ok) throw new Error("Status check failed");
 
         const data = await response.json();
-        switch (data.status) {
-          case "fetching_data":
-            setStatus("Step 1/3: 📡 Fetching SEO data...");
-            break;
-          case "generating_text":
-            setStatus("Step 2/3: 🧠 Generating insights with AI...");
-            break;
-          case "creating_presentation":
-            setStatus("Step 3/3: 🎨 Creating your presentation...");
-            break;
-          case "complete":
-            clearInterval(pollingIntervalRef.current);
-            setStatus("✅ Report complete!");
-            setFinalUrl(data.result);
-            setIsLoading(false);
-            break;
-          case "failed":
-            clearInterval(pollingIntervalRef.current);
-            setStatus(`❌ Report failed: ${data.result}`);
-            setIsLoading(false);
-            break;
-          default:
-            setStatus("⏳ Waiting in queue...");
-        }
+        if (applyStatus(data)) return;
+        since = data.version || since;
       } catch (error) {
-        clearInterval(pollingIntervalRef.current);
         setStatus("⚠️ Error: Could not connect to backend.");
         setIsLoading(false);
+        return;
       }
-    }, 5000);
+    }
+  };
+
+  const watchStatus = (jobId) => {
+    if (!window.EventSource) {
+      longPoll(jobId);
+      return;
+    }
+    let since = 0;
+    const source = new EventSource(`http://127.0.0.1:8000/report-events/${jobId}`);
+    eventSourceRef.current = source;
+    source.addEventListener("status", (event) => {
+      const data = JSON.parse(event.data);
+      since = data.version || since;
+      if (applyStatus(data)) source.close();
+    });
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) return;
+      source.close();
+      longPoll(jobId, since);
+    };
   };
 
   const handleSubmit = async (e) => {
@@ -92,6 +172,7 @@ function App() {
 
     setIsLoading(true);
     setFinalUrl("");
+    setSections({});
     setStatus("⏳ Submitting job to server...");
 
     try {
@@ -104,8 +185,8 @@ function App() {
       if (!response.ok) throw new Error("Job start failed.");
 
       const result = await response.json();
-      setStatus("📡 Job submitted, polling for results...");
-      pollStatus(result.job_id);
+      setStatus("📡 Job submitted, waiting for results...");
+      watchStatus(result.job_id);
     } catch (error) {
       console.error("Submit error:", error);
       setStatus("⚠️ Could not connect to backend.");
@@ -160,6 +241,7 @@ function App() {
           </div>
 
           <p className="footer">{status}</p>
+          <PartialResults sections={sections} />
         </>
       )}
     </div>